@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "book_management.settings")
+# Bajo ASGI los endpoints de libros y autenticación usan las vistas asíncronas (ASYNC_API=false para desactivarlas)
+os.environ.setdefault("ASYNC_API", "true")
 
 application = get_asgi_application()
+
+if os.environ["ASYNC_API"].lower() == "true":
+    # Reemplaza a WhiteNoise, que no es compatible con async (ver settings.ASYNC_API)
+    application = ASGIStaticFilesHandler(application)
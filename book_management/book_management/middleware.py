@@ -1,24 +1,97 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.http import JsonResponse
 import logging
 
+from books.metrics import RequestTiming, current_timing, is_enabled, registry
+
 logger = logging.getLogger(__name__)
 
 class Handle500Middleware:
     """
     Middleware para capturar errores 500 y retornar una respuesta personalizada.
+    Funciona tanto en WSGI como en ASGI (sin pasar las peticiones async por un hilo).
     """
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
         try:
             response = self.get_response(request)
         except Exception as exc:
-            # Loguear el error
-            logger.error(f"Error 500 no controlado: {exc}")
-            # Retornar una respuesta personalizada
-            return JsonResponse(
-                {"error": "Ocurrió un error interno. Por favor, inténtalo nuevamente más tarde."},
-                status=500
-            )
-        return response
\ No newline at end of file
+            return self.handle_error(exc)
+        return response
+
+    async def __acall__(self, request):
+        try:
+            response = await self.get_response(request)
+        except Exception as exc:
+            return self.handle_error(exc)
+        return response
+
+    def handle_error(self, exc):
+        # Loguear el error
+        logger.error(f"Error 500 no controlado: {exc}")
+        # Retornar una respuesta personalizada
+        return JsonResponse(
+            {"error": "Ocurrió un error interno. Por favor, inténtalo nuevamente más tarde."},
+            status=500
+        )
+
+
+class TimingMiddleware:
+    """
+    Mide cada petición (ver `books.metrics`): agrega `Server-Timing` y alimenta los
+    histogramas de `/metrics`. Debe ser el primer middleware para medir el tiempo total.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = is_enabled()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        return self.finish(request, response, timing)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        return self.finish(request, response, timing)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Los comandos de MongoDB se etiquetan con el endpoint desde que se conoce la ruta
+        timing = current_timing.get()
+        if timing is not None:
+            timing.endpoint = request.resolver_match.url_name or request.resolver_match.route
+
+    def finish(self, request, response, timing):
+        total = timing.elapsed()
+        response['Server-Timing'] = timing.server_timing(total)
+        endpoint = timing.endpoint or 'unmatched'
+        registry.observe_request(endpoint, request.method, response.status_code, timing, total)
+        return response
@@ -11,9 +11,10 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 import os
 from pathlib import Path
-from pymongo import MongoClient
 from datetime import timedelta
 from dotenv import load_dotenv
+from books.mongo import LazyDatabase
+from books.openapi import spec_url
 
 # Cargar variables de entorno desde el archivo .env
 load_dotenv()
@@ -48,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir el tiempo total de la petición (ver `books/metrics.py`)
+    "book_management.middleware.TimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -129,8 +132,26 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Configuración de MongoDB
 MONGO_URI = os.getenv('MONGO_URI')
-MONGO_CLIENT = MongoClient(MONGO_URI)
-MONGO_DB = MONGO_CLIENT['BookManagement']
+MONGO_DB_NAME = os.getenv('MONGO_DB_NAME', 'BookManagement')
+
+# Opciones del cliente de cada proceso (ver `books/mongo.py`). Las vacías usan el valor por defecto de pymongo.
+# MONGO_COMPRESSORS acepta "zstd", "snappy" y "zlib" separados por comas; zstd y snappy
+# necesitan los paquetes `zstandard` y `python-snappy`.
+MONGO_CLIENT_OPTIONS = {
+    'maxPoolSize': int(os.getenv('MONGO_MAX_POOL_SIZE', '100')),  # Conexiones por servidor y proceso
+    'minPoolSize': int(os.getenv('MONGO_MIN_POOL_SIZE', '0')),
+    'maxIdleTimeMS': int(os.getenv('MONGO_MAX_IDLE_TIME_MS', '0')) or None,
+    'waitQueueTimeoutMS': int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', '0')) or None,  # Espera por una conexión libre
+    'serverSelectionTimeoutMS': int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '30000')),
+    'connectTimeoutMS': int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', '20000')),
+    'socketTimeoutMS': int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', '0')) or None,
+    'compressors': os.getenv('MONGO_COMPRESSORS', ''),
+    'readPreference': os.getenv('MONGO_READ_PREFERENCE', 'primary'),
+    'appname': os.getenv('MONGO_APP_NAME', 'book_management'),
+}
+
+# El cliente se crea al primer uso en cada proceso (también después de un fork), no al importar la configuración
+MONGO_DB = LazyDatabase(MONGO_DB_NAME)
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -140,9 +161,69 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
     'EXCEPTION_HANDLER': 'book_management.exception_handler.custom_exception_handler',
+    # JSON con orjson y codificación nativa de ObjectId/Decimal128/datetime (ver `books/renderers.py`)
+    'DEFAULT_RENDERER_CLASSES': (
+        'books.renderers.MongoJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'books.renderers.MongoJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 REST_FRAMEWORK['DEFAULT_PAGINATION_CLASS'] = 'rest_framework.pagination.PageNumberPagination'
 
+# Estrategia de conteo para la paginación de libros: "exact", "estimated" o "none"
+BOOK_PAGINATION_COUNT = os.getenv('BOOK_PAGINATION_COUNT', 'exact')
+
+# Filtros y orden del listado sin un índice que los resuelva (ver `books/filters.py`):
+# "reject" (400 con los órdenes disponibles), "warn" (se ejecutan con `X-Query-Warning`) o "off"
+BOOK_QUERY_POLICY = os.getenv('BOOK_QUERY_POLICY', 'reject')
+
+# Formato de almacenamiento de los libros: "legacy" (fecha como texto, precio double)
+# o "typed" (fecha BSON, año derivado y precio Decimal128). Ver `manage.py migrate_book_types`.
+BOOK_STORAGE_MODE = os.getenv('BOOK_STORAGE_MODE', 'legacy')
+# Con "typed", activar cuando `migrate_book_types` haya convertido todos los documentos:
+# hasta entonces los filtros por fecha buscan también las fechas guardadas como texto.
+BOOK_STORAGE_MIGRATED = os.getenv('BOOK_STORAGE_MIGRATED', 'false').lower() == 'true'
+
+# Documentos por lote del cursor (y por bloque de respuesta) en `GET /api/books/export/`
+BOOK_EXPORT_BATCH_SIZE = int(os.getenv('BOOK_EXPORT_BATCH_SIZE', '1000'))
+
+# Búsqueda de texto de `GET /api/books/search/` (ver `books/search.py`): "mongo" (índice de
+# texto de MongoDB) o "memory" (índice invertido en memoria de cada proceso)
+BOOK_SEARCH = {
+    'BACKEND': os.getenv('BOOK_SEARCH_BACKEND', 'mongo'),
+    'RESYNC_INTERVAL': int(os.getenv('BOOK_SEARCH_RESYNC_INTERVAL', '5')),  # Segundos ("memory")
+    'REBUILD_INTERVAL': int(os.getenv('BOOK_SEARCH_REBUILD_INTERVAL', '3600')),  # Segundos ("memory")
+}
+
+# Caché en memoria de `GET /api/books/stats/` (ver `books/analytics.py`); CACHE_TTL 0 la desactiva
+BOOK_STATS = {
+    'CACHE_TTL': int(os.getenv('BOOK_STATS_CACHE_TTL', '60')),  # Segundos
+    'CACHE_MAX_SIZE': int(os.getenv('BOOK_STATS_CACHE_MAX_SIZE', '256')),  # Combinaciones de filtros por proceso
+    'MAX_BUCKETS': int(os.getenv('BOOK_STATS_MAX_BUCKETS', '1000')),  # Intervalos del histograma de precios
+}
+if BOOK_STATS['MAX_BUCKETS'] < 1:
+    raise ValueError(f"BOOK_STATS_MAX_BUCKETS debe ser al menos 1, no {BOOK_STATS['MAX_BUCKETS']}")
+
+# Caché de respuestas de las lecturas de libros (ver `books/response_cache.py`):
+# "lru" (memoria de cada proceso), "django" (backend de caché ALIAS de `CACHES`, compartido) o "none"
+RESPONSE_CACHE = {
+    'BACKEND': os.getenv('RESPONSE_CACHE_BACKEND', 'none'),
+    'ALIAS': os.getenv('RESPONSE_CACHE_ALIAS', 'default'),
+    'MAX_SIZE': int(os.getenv('RESPONSE_CACHE_MAX_SIZE', '2048')),  # Respuestas por proceso ("lru")
+    'GENERATION_REFRESH_INTERVAL': int(os.getenv('RESPONSE_CACHE_GENERATION_REFRESH_INTERVAL', '5')),  # Segundos ("lru")
+    'DEFAULT_TTL': 30,
+    'TTL': {  # Segundos por endpoint
+        'book-list': int(os.getenv('RESPONSE_CACHE_TTL_BOOK_LIST', '30')),
+        'book-detail': int(os.getenv('RESPONSE_CACHE_TTL_BOOK_DETAIL', '60')),
+        'average-price-by-year': int(os.getenv('RESPONSE_CACHE_TTL_AVERAGE_PRICE', '300')),
+        'book-search': int(os.getenv('RESPONSE_CACHE_TTL_BOOK_SEARCH', '30')),
+    },
+}
+
 # Configuración de JWT personalizada
 SIMPLE_JWT = {
     'USER_ID_FIELD': 'id', # Corresponde al atributo `id` en MongoDBUser
@@ -151,10 +232,74 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),    # Duración del refresh token
 }
 
+# Caché en memoria de los usuarios resueltos por `MongoDBJWTAuthentication`
+MONGO_USER_CACHE = {
+    'ENABLED': os.getenv('MONGO_USER_CACHE_ENABLED', 'true').lower() == 'true',
+    'MAX_SIZE': int(os.getenv('MONGO_USER_CACHE_MAX_SIZE', '10000')),  # Usuarios por proceso
+    'TTL': int(os.getenv('MONGO_USER_CACHE_TTL', '60')),  # Segundos
+}
+
+# Modo de `MongoDBJWTAuthentication`:
+# - "database": busca el usuario en MongoDB (con la caché de `MONGO_USER_CACHE`).
+# - "stateless": construye el usuario con los claims del token sin acceder a MongoDB; con
+#   CHECK_USER_VERSION compara la versión del token con una instantánea refrescada cada
+#   VERSION_REFRESH_INTERVAL segundos.
+MONGO_JWT_AUTH = {
+    'MODE': os.getenv('MONGO_JWT_AUTH_MODE', 'database'),
+    'CHECK_USER_VERSION': os.getenv('MONGO_JWT_CHECK_USER_VERSION', 'true').lower() == 'true',
+    'VERSION_REFRESH_INTERVAL': int(os.getenv('MONGO_JWT_VERSION_REFRESH_INTERVAL', '30')),
+}
+
+# Lista de revocación de tokens (logout y `manage.py revoke_tokens`, ver `books/revocation.py`).
+# Cada proceso la guarda en memoria y la refresca cada REFRESH_INTERVAL segundos: es el tiempo
+# máximo que otro worker puede seguir aceptando un token revocado.
+TOKEN_REVOCATION = {
+    'ENABLED': os.getenv('TOKEN_REVOCATION_ENABLED', 'true').lower() == 'true',
+    'REFRESH_INTERVAL': int(os.getenv('TOKEN_REVOCATION_REFRESH_INTERVAL', '5')),
+}
+
+# Hash de contraseñas en un pool acotado. METHOD acepta la sintaxis de werkzeug
+# (p. ej. "scrypt:32768:8:1" o "pbkdf2:sha256:600000"); los hashes con otro método se
+# regeneran en el siguiente login exitoso.
+PASSWORD_HASHING = {
+    'METHOD': os.getenv('PASSWORD_HASH_METHOD', 'scrypt'),
+    'MAX_CONCURRENCY': int(os.getenv('PASSWORD_HASH_MAX_CONCURRENCY', '2')),  # Hashes simultáneos por proceso
+    'MAX_PENDING': int(os.getenv('PASSWORD_HASH_MAX_PENDING', '16')),  # En ejecución + en cola
+    'QUEUE_TIMEOUT': float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', '5')),  # Segundos esperando un lugar
+    'BULK_CONCURRENCY': int(os.getenv('PASSWORD_HASH_BULK_CONCURRENCY', '1')),  # Hashes simultáneos de altas masivas
+}
+
+# Tiempos por petición (`Server-Timing`) y métricas de Prometheus en `/metrics` (ver `books/metrics.py`).
+# MEASURE_BYTES cuenta los bytes BSON de cada comando y respuesta de MongoDB (los vuelve a codificar,
+# así que está desactivado por defecto). `/metrics` exige `Authorization: Bearer <TOKEN>`; sin TOKEN
+# solo responde con DEBUG.
+METRICS = {
+    'ENABLED': os.getenv('METRICS_ENABLED', 'true').lower() == 'true',
+    'MEASURE_BYTES': os.getenv('METRICS_MEASURE_BYTES', 'false').lower() == 'true',
+    'TOKEN': os.getenv('METRICS_TOKEN', ''),
+}
+
+# Registro de consultas lentas de MongoDB (ver `books/slow_queries.py`); THRESHOLD_MS 0 lo desactiva.
+# Se registran en el logger `books.slow_queries`, con un `explain` para EXPLAIN_SAMPLE_RATE de ellas,
+# cada forma de consulta a lo sumo una vez cada LOG_INTERVAL segundos.
+SLOW_QUERIES = {
+    'THRESHOLD_MS': float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '100')),
+    'EXPLAIN_SAMPLE_RATE': float(os.getenv('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', '1')),
+    'LOG_INTERVAL': int(os.getenv('SLOW_QUERY_LOG_INTERVAL', '300')),  # Segundos por forma de consulta
+    'MAX_PER_MINUTE': int(os.getenv('SLOW_QUERY_MAX_PER_MINUTE', '30')),  # Registros por proceso
+}
+
 TEST_RUNNER = "django.test.runner.DiscoverRunner"
 MIDDLEWARE += [
     "book_management.middleware.Handle500Middleware",
 ]
+
+# Vistas asíncronas (`books.async_views`) para libros, login y refresco de token. Lo activa
+# `asgi.py`; con WSGI se usan siempre las vistas síncronas de `books.views`.
+ASYNC_API = os.getenv('ASYNC_API', 'false').lower() == 'true'
+if ASYNC_API:
+    # WhiteNoise solo es síncrono y obligaría a pasar cada petición por un hilo; `asgi.py` sirve los estáticos
+    MIDDLEWARE.remove("whitenoise.middleware.WhiteNoiseMiddleware")
 LOGIN_URL = '/api/login/'  # Cambia esto a la URL de tu endpoint de login si usas DRF
 
 # Configuración de Swagger
@@ -172,4 +317,46 @@ SWAGGER_SETTINGS = {
         },
     },
     "USE_SESSION_AUTH": False,
-}
\ No newline at end of file
+    # El esquema pregenerado servido por WhiteNoise o `/swagger.json` (ver `books/openapi.py`)
+    "SPEC_URL": spec_url,
+}
+REDOC_SETTINGS = {
+    "SPEC_URL": spec_url,
+}
+
+# Esquema OpenAPI pregenerado con `manage.py generate_openapi_schema` (antes de `collectstatic`)
+OPENAPI_SCHEMA = {
+    'FILE': os.path.join(BASE_DIR, 'books', 'static', 'openapi', 'schema.json'),
+    'STATIC_PATH': 'openapi/schema.json',  # Ruta dentro de STATIC_URL
+    'MAX_AGE': int(os.getenv('OPENAPI_SCHEMA_MAX_AGE', '300')),  # Segundos de caché en el cliente
+}
+
+# Perfil de configuración: "full" (por defecto) o "api". El perfil "api" deja solo lo que usa la
+# API JSON con JWT: sin admin, sesiones ni mensajes (la autenticación es por token y las vistas de
+# DRF no usan CSRF), sin el renderer navegable de DRF y sin usuario anónimo de `django.contrib.auth`.
+# `auth` y `contenttypes` se mantienen porque simplejwt y DRF importan sus modelos.
+# `manage.py startup_report` compara el arranque y el costo por petición de los dos perfiles.
+SETTINGS_PROFILE = os.getenv('SETTINGS_PROFILE', 'full')
+if SETTINGS_PROFILE == 'api':
+    INSTALLED_APPS = [
+        app for app in INSTALLED_APPS
+        if app not in ("django.contrib.admin", "django.contrib.sessions", "django.contrib.messages", "drf_yasg")
+    ]
+    MIDDLEWARE = [
+        middleware for middleware in MIDDLEWARE
+        if middleware not in (
+            "django.contrib.sessions.middleware.SessionMiddleware",
+            "django.middleware.csrf.CsrfViewMiddleware",
+            "django.contrib.auth.middleware.AuthenticationMiddleware",
+            "django.contrib.messages.middleware.MessageMiddleware",
+            "django.middleware.clickjacking.XFrameOptionsMiddleware",
+        )
+    ]
+    TEMPLATES[0]["OPTIONS"]["context_processors"] = [
+        "django.template.context_processors.debug",
+        "django.template.context_processors.request",
+    ]
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = ('books.renderers.MongoJSONRenderer',)
+    REST_FRAMEWORK['UNAUTHENTICATED_USER'] = None
+elif SETTINGS_PROFILE != 'full':
+    raise ValueError(f"SETTINGS_PROFILE debe ser 'full' o 'api', no {SETTINGS_PROFILE!r}")
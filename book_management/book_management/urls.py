@@ -15,33 +15,28 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
-from django.contrib import admin
+from django.apps import apps
 from django.urls import path, include
 from rest_framework_simplejwt.views import TokenRefreshView
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Book Management API",
-        default_version='v1',
-        description="API para gestionar libros con operaciones CRUD",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="support@example.com"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from books.openapi import docs_view, schema_view
+from books.views import MetricsView
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('api/', include('books.urls')),  # Ruta para la API de libros
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    # Esquema y documentación sin regenerar el esquema en cada visita (ver `books/openapi.py`)
+    path('swagger.json', schema_view, name='schema-json'),
+    path('metrics', MetricsView.as_view(), name='metrics'),  # Prometheus (ver `books/metrics.py`)
 ]
 
+# El perfil "api" de la configuración no instala el admin ni las páginas de Swagger UI y ReDoc
+if apps.is_installed('drf_yasg'):
+    urlpatterns += [
+        path('swagger/', docs_view('swagger'), name='schema-swagger-ui'),
+        path('redoc/', docs_view('redoc'), name='schema-redoc'),
+    ]
 
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
 
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
@@ -0,0 +1,244 @@
+"""
+Estadísticas del catálogo para tableros (`GET /api/books/stats/`).
+
+Las facetas pedidas se calculan en una sola agregación: un `$match` con los filtros del
+listado (acotado por un índice, ver `books.filters`), un `$project` con los campos que
+usan las facetas y un `$facet` con una subetapa por faceta. El resultado se guarda en una
+caché en memoria del proceso durante `BOOK_STATS['CACHE_TTL']` segundos, así que un
+tablero ve las escrituras con ese retraso como máximo.
+
+El histograma de precios tiene a lo sumo `BOOK_STATS['MAX_BUCKETS']` intervalos: con un
+`bucket_size` demasiado pequeño para el rango de precios se responde 400 con el mínimo
+aceptable, en lugar de acercarse al límite de 16 MB del documento de `$facet`.
+"""
+import json
+import math
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .cache import MISSING, LRUCache
+from .stats import YEAR_EXPRESSION
+from .storage import to_float
+
+# Facetas disponibles, en el orden en que se devuelven
+FACETS = ('summary', 'by_genre', 'by_year', 'by_author', 'top_authors', 'price_histogram')
+
+PRICE_FIELDS = ('average_price', 'min_price', 'max_price')
+
+# Subetapa interna con el rango de precios, para sugerir un `bucket_size` válido
+PRICE_RANGE = '_price_range'
+
+DEFAULT_MAX_BUCKETS = 1000
+
+_cache = None
+_lock = threading.Lock()
+
+
+def get_config():
+    return getattr(settings, 'BOOK_STATS', {})
+
+
+def get_max_buckets():
+    return get_config().get('MAX_BUCKETS', DEFAULT_MAX_BUCKETS)
+
+
+class BookStatsSerializer(serializers.Serializer):
+    facets = serializers.CharField(required=False)
+    top = serializers.IntegerField(min_value=1, max_value=100, default=10)
+    bucket_size = serializers.FloatField(min_value=0.01, default=10.0)
+
+    def validate_facets(self, value):
+        facets = [facet.strip() for facet in value.split(',') if facet.strip()]
+        unknown = [facet for facet in facets if facet not in FACETS]
+        if unknown:
+            raise serializers.ValidationError(f"Facetas no válidas: {', '.join(unknown)}.")
+        return facets
+
+
+def _price_group(key):
+    return {"$group": {
+        "_id": key,
+        "count": {"$sum": 1},
+        "average_price": {"$avg": "$price"},
+        "min_price": {"$min": "$price"},
+        "max_price": {"$max": "$price"},
+    }}
+
+
+def facet_pipelines(top=10, bucket_size=10.0, max_buckets=DEFAULT_MAX_BUCKETS):
+    """Subetapas de `$facet` por faceta."""
+    return {
+        'summary': [_price_group(None)],
+        'by_genre': [_price_group("$genre"), {"$sort": {"_id": 1}}],
+        'by_year': [
+            {"$match": {"year": {"$ne": None}}},
+            _price_group("$year"),
+            {"$sort": {"_id": 1}},
+        ],
+        # Acotadas a los `top` autores con más libros: el resultado de `$facet` es un solo documento (16 MB)
+        'by_author': [_price_group("$author"), {"$sort": {"count": -1, "_id": 1}}, {"$limit": top}],
+        'top_authors': [
+            {"$group": {"_id": "$author", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": top},
+        ],
+        'price_histogram': [
+            {"$match": {"price": {"$ne": None}}},
+            {"$group": {
+                "_id": {"$multiply": [{"$floor": {"$divide": ["$price", bucket_size]}}, bucket_size]},
+                "count": {"$sum": 1},
+            }},
+            {"$sort": {"_id": 1}},
+            # Un intervalo de más basta para saber que `bucket_size` es demasiado pequeño
+            {"$limit": max_buckets + 1},
+        ],
+        PRICE_RANGE: [
+            {"$match": {"price": {"$ne": None}}},
+            {"$group": {"_id": None, "min_price": {"$min": "$price"}, "max_price": {"$max": "$price"}}},
+        ],
+    }
+
+
+def build_pipeline(match, facets, top=10, bucket_size=10.0, max_buckets=DEFAULT_MAX_BUCKETS):
+    pipelines = facet_pipelines(top, bucket_size, max_buckets)
+    if 'price_histogram' in facets:
+        facets = [*facets, PRICE_RANGE]
+    pipeline = [{"$match": match}] if match else []
+    pipeline += [
+        # Solo los campos que usan las facetas, con el año ya resuelto para los dos formatos de almacenamiento
+        {"$project": {"_id": 0, "author": 1, "genre": 1, "price": 1, "year": YEAR_EXPRESSION}},
+        {"$facet": {facet: pipelines[facet] for facet in facets}},
+    ]
+    return pipeline
+
+
+def _price_stats(document, key_name=None):
+    result = {key_name: document["_id"]} if key_name else {}
+    result["count"] = document["count"]
+    for field in PRICE_FIELDS:
+        value = document.get(field)
+        result[field] = None if value is None else float(to_float(value))
+    return result
+
+
+def format_facets(result, bucket_size=10.0):
+    """Convierte el documento de `$facet` al formato de la API."""
+    formatted = {}
+    for facet, documents in result.items():
+        if facet == PRICE_RANGE:
+            continue
+        if facet == 'summary':
+            formatted[facet] = (
+                _price_stats(documents[0]) if documents
+                else {"count": 0, **{field: None for field in PRICE_FIELDS}}
+            )
+        elif facet == 'top_authors':
+            formatted[facet] = [{"author": document["_id"], "count": document["count"]} for document in documents]
+        elif facet == 'price_histogram':
+            formatted[facet] = [
+                {
+                    "price_from": float(to_float(document["_id"])),
+                    "price_to": float(to_float(document["_id"])) + bucket_size,
+                    "count": document["count"],
+                }
+                for document in documents
+            ]
+        else:
+            key_name = facet[len('by_'):]
+            formatted[facet] = [_price_stats(document, key_name) for document in documents]
+    return formatted
+
+
+def check_histogram(result, max_buckets):
+    """Lanza `ValidationError` (400) si el histograma superó `max_buckets` intervalos."""
+    if len(result.get('price_histogram', ())) <= max_buckets:
+        return
+    price_range = result[PRICE_RANGE][0]
+    span = float(to_float(price_range["max_price"])) - float(to_float(price_range["min_price"]))
+    if max_buckets > 1:
+        # `floor(max / size) - floor(min / size) + 1` intervalos: con `span / (max_buckets - 1)` no se pasa
+        min_bucket_size = math.ceil(span / (max_buckets - 1) * 100) / 100
+    else:
+        # Un solo intervalo, el que empieza en 0: `size` tiene que superar el precio máximo
+        max_price = float(to_float(price_range["max_price"]))
+        min_bucket_size = (math.floor(max_price * 100) + 1) / 100
+    raise ValidationError({"bucket_size": [
+        f"Genera más de {max_buckets} intervalos para el rango de precios. "
+        f"Use un valor mayor o igual que {min_bucket_size}."
+    ]})
+
+
+def compute_stats(collection, match, facets, top=10, bucket_size=10.0):
+    """Ejecuta la agregación (un solo viaje a MongoDB) y devuelve las facetas formateadas."""
+    max_buckets = get_max_buckets()
+    pipeline = build_pipeline(match, facets, top, bucket_size, max_buckets)
+    result = next(collection.aggregate(pipeline, allowDiskUse=True), {})
+    check_histogram(result, max_buckets)
+    return format_facets(result, bucket_size)
+
+
+class StatsCache:
+    """Resultados por combinación de filtros y opciones, con TTL. Una sola agregación por clave a la vez."""
+
+    def __init__(self, max_size=256, ttl=60):
+        self.entries = LRUCache(max_size=max_size, ttl=ttl)
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def make_key(self, match, facets, top, bucket_size):
+        return json.dumps([match, facets, top, bucket_size], sort_keys=True, default=repr)
+
+    def get_or_compute(self, key, compute):
+        """Devuelve `(resultado, acierto)`."""
+        value = self.entries.get_or_missing(key)
+        if value is not MISSING:
+            return value, True
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        # Las peticiones simultáneas de la misma clave esperan a la primera en lugar de repetir la agregación
+        try:
+            with key_lock:
+                value = self.entries.get_or_missing(key)
+                if value is not MISSING:
+                    return value, True
+                value = compute()
+                self.entries.set(key, value)
+        finally:
+            with self._lock:
+                self._locks.pop(key, None)
+        return value, False
+
+
+def get_stats_cache():
+    """Caché de este proceso según `BOOK_STATS`, o None si CACHE_TTL es 0."""
+    global _cache
+    if _cache is None:
+        config = get_config()
+        if not config.get('CACHE_TTL', 60):
+            return None
+        with _lock:
+            if _cache is None:
+                _cache = StatsCache(config.get('CACHE_MAX_SIZE', 256), config.get('CACHE_TTL', 60))
+    return _cache
+
+
+@receiver(setting_changed)
+def reset_stats_cache(setting, **kwargs):
+    global _cache
+    if setting == 'BOOK_STATS':
+        _cache = None
+
+
+def get_catalog_stats(collection, match, facets=FACETS, top=10, bucket_size=10.0):
+    """Devuelve `(facetas, acierto)`, desde la caché si hay una entrada vigente."""
+    facets = [facet for facet in FACETS if facet in facets]
+    cache = get_stats_cache()
+    if cache is None:
+        return compute_stats(collection, match, facets, top, bucket_size), False
+    key = cache.make_key(match, facets, top, bucket_size)
+    return cache.get_or_compute(key, lambda: compute_stats(collection, match, facets, top, bucket_size))
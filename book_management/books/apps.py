@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BooksConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "books"
+
+    def ready(self):
+        # Conectar los receptores de `books_changed`
+        from . import response_cache, revisions, search, stats  # noqa: F401
@@ -0,0 +1,251 @@
+"""
+Vistas asíncronas para los endpoints más usados (libros, exportación, login y refresco de token).
+
+Bajo ASGI (`ASYNC_API`, ver `book_management/asgi.py`) reemplazan a las vistas de
+`books.views` en las mismas rutas: mientras esperan a MongoDB (`AsyncMongoClient`)
+el proceso atiende otras peticiones en lugar de ocupar un hilo por petición. Las
+respuestas, la autenticación y los errores son los mismos que en las vistas de DRF.
+"""
+from bson import ObjectId
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from pymongo import ReturnDocument
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken, TokenError
+
+from .authentication import MongoDBJWTAuthentication
+from .mongo import get_async_db
+from .pagination import BookCursorPagination, BookPagination
+from .renderers import MongoJSONRenderer
+from .projections import VALIDATOR_FIELDS, get_field_selection
+from .passwords import PasswordHasherBusy, averify_password, needs_rehash, rehash_in_background
+from .serializers import BookSerializer, UserLoginSerializer
+from .signals import books_changed
+from .filters import get_book_query, set_query_warning
+from .export import EXPORT_FIELDS, aiter_csv, aiter_ndjson, export_query
+from .conditional import book_validators, is_conditional, list_validators, not_modified, set_validators
+from .response_cache import cache_response
+from .revisions import aget_revision
+from .revocation import ais_token_revoked
+from .storage import apply_update, book_update, new_book, to_representation
+from .utils import create_tokens_for_user
+
+
+class AsyncAPIView(View):
+    """
+    Vista asíncrona con la autenticación JWT, el parseo del cuerpo y el formato de errores de DRF.
+
+    Los métodos reciben un `Request` de DRF (`query_params`, `data`) y devuelven
+    `self.render(data, status_code)`.
+    """
+    authentication = MongoDBJWTAuthentication()
+    renderer = MongoJSONRenderer()
+    authentication_required = True
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Igual que en DRF: la autenticación es por token, no por sesión
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(request, parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES])
+        try:
+            if self.authentication_required:
+                await self.authenticate(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return self.handle_exception(request, exc)
+
+    async def authenticate(self, request):
+        result = await self.authentication.aauthenticate(request)
+        if result is None:
+            raise NotAuthenticated()
+        request.user, request.auth = result
+
+    def handle_exception(self, request, exc):
+        headers = {}
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            headers['WWW-Authenticate'] = self.authentication.authenticate_header(request)
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        return self.render(data, exc.status_code, headers)
+
+    def render(self, data, status_code=status.HTTP_200_OK, headers=None):
+        response = HttpResponse(self.renderer.render(data), status=status_code, content_type='application/json')
+        response.data = data  # Para `books.response_cache`, igual que en las respuestas de DRF
+        for name, value in (headers or {}).items():
+            response[name] = value
+        return response
+
+
+class AsyncUserLoginView(AsyncAPIView):
+    authentication_required = False
+
+    async def post(self, request):
+        serializer = UserLoginSerializer(data=request.data)
+        if not serializer.is_valid():
+            return self.render(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+        email = serializer.validated_data['email']
+        password = serializer.validated_data['password']
+        user = await get_async_db()['User'].find_one({"email": email}, {"email": 1, "password": 1, "version": 1})
+
+        try:
+            valid = bool(user) and await averify_password(user["password"], password)
+        except PasswordHasherBusy:
+            return self.render(
+                {"error": "Demasiados inicios de sesión simultáneos. Inténtalo nuevamente."},
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"},
+            )
+
+        if not valid:
+            return self.render({"error": "Credenciales inválidas."}, status.HTTP_401_UNAUTHORIZED)
+
+        if needs_rehash(user["password"]):
+            # El nuevo hash se guarda desde el pool de hilos, con el cliente síncrono
+            rehash_in_background(settings.MONGO_DB['User'], user["_id"], user["password"], password)
+
+        refresh, access_token = create_tokens_for_user(user)
+        return self.render({"refresh": str(refresh), "access": str(access_token)})
+
+
+class AsyncTokenRefreshView(AsyncAPIView):
+    authentication_required = False
+
+    async def post(self, request):
+        refresh_token = request.data.get("refresh")
+        if not refresh_token:
+            return self.render({"error": "Refresh token requerido"}, status.HTTP_400_BAD_REQUEST)
+
+        try:
+            refresh = RefreshToken(refresh_token)
+        except TokenError:
+            return self.render({"error": "Token inválido o expirado"}, status.HTTP_401_UNAUTHORIZED)
+
+        if await ais_token_revoked(refresh):
+            return self.render({"error": "Token revocado"}, status.HTTP_401_UNAUTHORIZED)
+        return self.render({"access": str(refresh.access_token)})
+
+
+class AsyncBookList(AsyncAPIView):
+    @cache_response('book-list')
+    async def get(self, request):
+        selection = get_field_selection(request)
+        book_query = get_book_query(request)
+        validators = list_validators(request, await aget_revision())
+        response = not_modified(request, *validators)
+        if response is not None:
+            return response
+
+        book_collection = get_async_db()['Book']
+        if 'cursor' in request.query_params:
+            paginator = BookCursorPagination()
+            books = await paginator.apaginate_collection(
+                book_collection, request, query=book_query.query,
+                projection=selection.projection(), ordering=book_query.ordering,
+            )
+            for book in books:
+                selection.trim(to_representation(book))
+            response = self.render(paginator.get_paginated_data(books))
+        else:
+            paginator = BookPagination()
+            books = await paginator.apaginate_collection(
+                book_collection, request, query=book_query.query, sort=book_query.sort, projection=selection.projection()
+            )
+            for book in books:
+                selection.trim(to_representation(book))
+            response = self.render(books, headers=paginator.get_headers())
+        return set_query_warning(set_validators(response, *validators), book_query)
+
+    async def post(self, request):
+        serializer = BookSerializer(data=request.data)
+        if not serializer.is_valid():
+            return self.render(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+        book = new_book(serializer.data)
+        await get_async_db()['Book'].insert_one(book)
+        await books_changed.asend(sender=self.__class__, removed=[], added=[book])
+        return self.render(serializer.data, status.HTTP_201_CREATED)
+
+
+class AsyncBookDetail(AsyncAPIView):
+    @cache_response('book-detail')
+    async def get(self, request, pk):
+        if not ObjectId.is_valid(pk):
+            return self.render({"error": "Invalid ID format"}, status.HTTP_400_BAD_REQUEST)
+        selection = get_field_selection(request)
+        book_collection = get_async_db()['Book']
+        if is_conditional(request):
+            current = await book_collection.find_one({"_id": ObjectId(pk)}, {field: 1 for field in VALIDATOR_FIELDS})
+            response = not_modified(request, *book_validators(request, current)) if current else None
+            if response is not None:
+                return response
+
+        book = await book_collection.find_one({"_id": ObjectId(pk)}, selection.projection(extra=VALIDATOR_FIELDS))
+        if not book:
+            return self.render({"error": "Book not found"}, status.HTTP_404_NOT_FOUND)
+        validators = book_validators(request, book)
+        selection.trim(to_representation(book))
+        return set_validators(self.render(book), *validators)
+
+    async def put(self, request, pk):
+        if not ObjectId.is_valid(pk):
+            return self.render({"error": "Invalid ID format"}, status.HTTP_400_BAD_REQUEST)
+        serializer = BookSerializer(data=request.data)
+        if not serializer.is_valid():
+            return self.render(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+        try:
+            update = book_update(serializer.data)
+            previous = await get_async_db()['Book'].find_one_and_update(
+                {"_id": ObjectId(pk)}, update, return_document=ReturnDocument.BEFORE
+            )
+        except Exception as e:
+            return self.render({"error": str(e)}, status.HTTP_400_BAD_REQUEST)
+        if not previous:
+            return self.render({"error": "Book not found"}, status.HTTP_404_NOT_FOUND)
+
+        await books_changed.asend(sender=self.__class__, removed=[previous], added=[apply_update(previous, update)])
+        return self.render(serializer.data)
+
+    async def delete(self, request, pk):
+        if not ObjectId.is_valid(pk):
+            return self.render({"error": "Invalid ID format"}, status.HTTP_400_BAD_REQUEST)
+        book = await get_async_db()['Book'].find_one_and_delete({"_id": ObjectId(pk)})
+        if not book:
+            return self.render({"error": "Book not found"}, status.HTTP_404_NOT_FOUND)
+        await books_changed.asend(sender=self.__class__, removed=[book], added=[])
+        return self.render({"message": "Book deleted successfully"}, status.HTTP_204_NO_CONTENT)
+
+
+class AsyncBookExport(AsyncAPIView):
+    """Exportación en streaming con un generador asíncrono: Django la envía por bloques bajo ASGI."""
+    formats = {
+        'ndjson': ('application/x-ndjson', aiter_ndjson),
+        'csv': ('text/csv', aiter_csv),
+    }
+
+    async def get(self, request):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in self.formats:
+            return self.render({"error": "Formato no válido. Use 'ndjson' o 'csv'."}, status.HTTP_400_BAD_REQUEST)
+
+        try:
+            query = export_query(request.query_params)
+        except ValueError:
+            return self.render({"error": "El año debe ser un número."}, status.HTTP_400_BAD_REQUEST)
+
+        batch_size = getattr(settings, 'BOOK_EXPORT_BATCH_SIZE', 1000)
+        projection = {field: 1 for field in EXPORT_FIELDS}
+        cursor = get_async_db()['Book'].find(query, projection, batch_size=batch_size)
+
+        content_type, generator = self.formats[output]
+        response = StreamingHttpResponse(generator(cursor, chunk_size=batch_size), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="books.{output}"'
+        return response
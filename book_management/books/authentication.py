@@ -1,13 +1,169 @@
+from asgiref.sync import sync_to_async
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
 from bson import ObjectId
 from django.conf import settings
-from .utils import MongoDBUser
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from .cache import LRUCache
+from .metrics import measure
+from .mongo import get_async_db
+from .revocation import aget_revocations, get_revocations
+from .snapshot import PollingSnapshot
+from .utils import MongoDBUser, USER_EMAIL_CLAIM, USER_VERSION_CLAIM
+
+_user_cache = None
+_user_versions = None
+
+class UserVersionSnapshot(PollingSnapshot):
+    """
+    Versiones de los usuarios que cambiaron alguna vez (tienen `updated_at`), por `user_id`.
+    """
+    collection_name = 'User'
+    projection = {"version": 1, "updated_at": 1}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.versions = {}
+
+    def apply(self, document):
+        self.versions[str(document["_id"])] = document.get("version", 0)
+
+    def get(self, user_id):
+        return self.versions.get(str(user_id), 0)
+
+def get_auth_config():
+    return getattr(settings, 'MONGO_JWT_AUTH', {})
+
+def get_user_versions(refresh=True):
+    """Instantánea de versiones de usuario de este proceso, refrescada según `VERSION_REFRESH_INTERVAL`."""
+    global _user_versions
+    if _user_versions is None:
+        _user_versions = UserVersionSnapshot(interval=get_auth_config().get('VERSION_REFRESH_INTERVAL', 30))
+    if refresh:
+        _user_versions.refresh_if_due()
+    return _user_versions
+
+async def aget_user_versions():
+    """Como `get_user_versions`, pero el refresco (una consulta bloqueante) se hace fuera del event loop."""
+    versions = get_user_versions(refresh=False)
+    if versions.is_due():
+        await sync_to_async(versions.refresh_if_due, thread_sensitive=False)()
+    return versions
+
+def get_user_cache():
+    """
+    Devuelve la caché de usuarios resueltos configurada en `MONGO_USER_CACHE`, o None si está desactivada.
+    """
+    global _user_cache
+    if _user_cache is None:
+        config = getattr(settings, 'MONGO_USER_CACHE', {})
+        if not config.get('ENABLED', True):
+            return None
+        _user_cache = LRUCache(max_size=config.get('MAX_SIZE', 10000), ttl=config.get('TTL', 60))
+    return _user_cache
+
+def invalidate_cached_user(user_id):
+    """
+    Elimina un usuario de la caché de este proceso. Se llama en cada escritura de usuarios
+    (`bump_user_version`, `rehash_in_background`); los demás procesos ven el cambio cuando
+    vence la entrada (`MONGO_USER_CACHE['TTL']`).
+    """
+    cache = get_user_cache()
+    if cache is not None:
+        cache.delete(str(user_id))
+
+def bump_user_version(user_id):
+    """
+    Incrementa la versión del usuario para que dejen de aceptarse los tokens emitidos antes.
+    """
+    user_collection = settings.MONGO_DB['User']
+    user_collection.update_one(
+        {"_id": ObjectId(user_id)},
+        {"$inc": {"version": 1}, "$currentDate": {"updated_at": True}},
+    )
+    invalidate_cached_user(user_id)
+
+@receiver(setting_changed)
+def reset_user_cache(setting, **kwargs):
+    global _user_cache, _user_versions
+    if setting == 'MONGO_USER_CACHE':
+        _user_cache = None
+    if setting == 'MONGO_JWT_AUTH':
+        _user_versions = None
 
 class MongoDBJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        with measure('auth'):
+            return super().authenticate(request)
+
     def get_user(self, validated_token):
         """
         Busca al usuario en MongoDB usando el `user_id` del token JWT.
         """
+        user_id = self.get_user_id(validated_token)
+        self.check_revoked(validated_token, get_revocations())
+
+        # Modo sin estado: construir el usuario con los claims del token, sin consultar MongoDB
+        if get_auth_config().get('MODE') == 'stateless':
+            mongo_user = self.get_stateless_user(validated_token, user_id)
+            if mongo_user is not None:
+                return mongo_user
+
+        # Consultar primero la caché del proceso
+        cache = get_user_cache()
+        mongo_user = cache.get(str(user_id)) if cache is not None else None
+
+        if mongo_user is None:
+            # Buscar el usuario en MongoDB
+            user_collection = settings.MONGO_DB['User']
+            user = user_collection.find_one({"_id": ObjectId(user_id)}, {"email": 1, "version": 1})
+            mongo_user = self.build_user(user, cache)
+
+        self.check_user_version(validated_token, mongo_user.version)
+        return mongo_user
+
+    async def aauthenticate(self, request):
+        """
+        Versión asíncrona de `authenticate` para `books.async_views`. Solo la búsqueda del
+        usuario es de E/S; la validación del token se hace en el propio loop.
+        """
+        with measure('auth'):
+            header = self.get_header(request)
+            if header is None:
+                return None
+
+            raw_token = self.get_raw_token(header)
+            if raw_token is None:
+                return None
+
+            validated_token = self.get_validated_token(raw_token)
+            return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        """Versión asíncrona de `get_user`, con el cliente de `books.mongo`."""
+        user_id = self.get_user_id(validated_token)
+        self.check_revoked(validated_token, await aget_revocations())
+
+        if get_auth_config().get('MODE') == 'stateless':
+            versions = None
+            if get_auth_config().get('CHECK_USER_VERSION', True):
+                versions = await aget_user_versions()
+            mongo_user = self.get_stateless_user(validated_token, user_id, versions)
+            if mongo_user is not None:
+                return mongo_user
+
+        cache = get_user_cache()
+        mongo_user = cache.get(str(user_id)) if cache is not None else None
+
+        if mongo_user is None:
+            user = await get_async_db()['User'].find_one({"_id": ObjectId(user_id)}, {"email": 1, "version": 1})
+            mongo_user = self.build_user(user, cache)
+
+        self.check_user_version(validated_token, mongo_user.version)
+        return mongo_user
+
+    def get_user_id(self, validated_token):
         user_id = validated_token.get("user_id")
         if not user_id:
             raise ValueError("El token JWT no contiene 'user_id'.")
@@ -15,13 +171,40 @@ class MongoDBJWTAuthentication(JWTAuthentication):
         # Verificar si el user_id es un ObjectId válido
         if not ObjectId.is_valid(user_id):
             raise ValueError("El 'user_id' no es un ObjectId válido.")
+        return user_id
 
-        # Buscar el usuario en MongoDB
-        user_collection = settings.MONGO_DB['User']
-        user = user_collection.find_one({"_id": ObjectId(user_id)})
-
+    def build_user(self, user, cache=None):
+        """Crea el `MongoDBUser` a partir del documento leído y lo guarda en la caché."""
         if not user:
             raise ValueError("Usuario no encontrado en la base de datos.")
 
-        # Devolver una instancia de MongoDBUser
-        return MongoDBUser(email=user["email"], user_id=user["_id"])
\ No newline at end of file
+        # Crear una instancia de MongoDBUser
+        mongo_user = MongoDBUser(email=user["email"], user_id=user["_id"], version=user.get("version", 0))
+        if cache is not None:
+            cache.set(mongo_user.id, mongo_user)
+        return mongo_user
+
+    def get_stateless_user(self, validated_token, user_id, versions=None):
+        """
+        Devuelve el usuario a partir de los claims, o None si el token es anterior a los claims embebidos.
+        """
+        email = validated_token.get(USER_EMAIL_CLAIM)
+        version = validated_token.get(USER_VERSION_CLAIM)
+        if email is None or version is None:
+            return None
+
+        if get_auth_config().get('CHECK_USER_VERSION', True):
+            versions = versions if versions is not None else get_user_versions()
+            self.check_user_version(validated_token, versions.get(user_id))
+        return MongoDBUser(email=email, user_id=user_id, version=version)
+
+    def check_user_version(self, validated_token, current_version):
+        """Rechaza los tokens emitidos antes del último cambio de versión del usuario."""
+        token_version = validated_token.get(USER_VERSION_CLAIM)
+        if token_version is not None and token_version < current_version:
+            raise AuthenticationFailed("El token ya no es válido para este usuario.", code="user_version_mismatch")
+
+    def check_revoked(self, validated_token, revocations):
+        """Rechaza los tokens revocados (`books.revocation`), con la copia en memoria del proceso."""
+        if revocations is not None and revocations.is_revoked(validated_token):
+            raise AuthenticationFailed("El token fue revocado.", code="token_revoked")
@@ -0,0 +1,67 @@
+"""
+Validadores HTTP (ETag y Last-Modified) para las lecturas de libros.
+
+El detalle usa la `version` y el `updated_at` que mantienen las escrituras; el listado
+usa la revisión de la colección (`books.revisions`). Si el `If-None-Match` o el
+`If-Modified-Since` del cliente siguen vigentes se responde 304 sin serializar nada.
+"""
+import calendar
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts, weak=False):
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode('utf-8')).hexdigest()[:24]
+    return ('W/' if weak else '') + quote_etag(digest)
+
+
+def to_timestamp(value):
+    return calendar.timegm(value.utctimetuple()) if value is not None else None
+
+
+def get_media_format(request):
+    # La misma versión se representa distinto en JSON y en la API navegable de DRF
+    renderer = getattr(request, 'accepted_renderer', None)
+    return renderer.format if renderer is not None else 'json'
+
+
+def is_conditional(request):
+    return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+
+def book_validators(request, book):
+    """
+    `(ETag fuerte, Last-Modified)` de un libro a partir de su `version` y `updated_at`. El ETag
+    depende también de los parámetros, que eligen los campos de la representación (`?fields=`).
+    """
+    etag = make_etag(book['_id'], book.get('version', 0), request.get_full_path(), get_media_format(request))
+    return etag, to_timestamp(book.get('updated_at'))
+
+
+def list_validators(request, revision):
+    """
+    `(ETag débil, Last-Modified)` de una página del listado para una revisión de la colección.
+    El cuerpo depende también de los parámetros (página, orden, cursor).
+    """
+    number, updated_at = revision
+    etag = make_etag('books', number, request.get_full_path(), get_media_format(request), weak=True)
+    return etag, to_timestamp(updated_at)
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Los clientes pueden guardar la respuesta pero deben revalidarla en cada uso
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def not_modified(request, etag, last_modified=None):
+    """Respuesta 304 si los validadores del cliente siguen vigentes; None en otro caso."""
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
@@ -0,0 +1,110 @@
+"""
+Generadores para exportar libros en streaming (NDJSON o CSV) desde un cursor de pymongo.
+
+Los documentos se leen por lotes del cursor y se emiten en bloques de texto, de modo
+que la memoria usada no depende del tamaño de la colección. Bajo ASGI se usan las
+variantes asíncronas (`aiter_ndjson`, `aiter_csv`): Django no admite un iterador
+síncrono en una respuesta ASGI sin leerlo entero antes de enviarlo.
+"""
+import csv
+import json
+
+from .storage import to_representation, year_filter
+
+EXPORT_FIELDS = ('_id', 'title', 'author', 'published_date', 'genre', 'price')
+
+
+class Echo:
+    """Objeto tipo archivo que devuelve lo escrito, para usar `csv.writer` sin búfer."""
+
+    def write(self, value):
+        return value
+
+
+def export_query(params):
+    """Filtro de MongoDB para `author`, `genre` y `year`. Lanza ValueError si el año no es un número."""
+    query = {}
+    for field in ('author', 'genre'):
+        if params.get(field):
+            query[field] = params[field]
+    if params.get('year'):
+        query.update(year_filter([int(params['year'])]))
+    return query
+
+
+def _row(book):
+    to_representation(book)
+    book['_id'] = str(book['_id'])
+    return book
+
+
+def _rows(cursor):
+    try:
+        for book in cursor:
+            yield _row(book)
+    finally:
+        cursor.close()
+
+
+async def _arows(cursor):
+    """Como `_rows`, sobre un cursor de `AsyncMongoClient`."""
+    try:
+        async for book in cursor:
+            yield _row(book)
+    finally:
+        await cursor.close()
+
+
+def ndjson_encoder():
+    """Encabezado (ninguno) y función que convierte un libro en una línea JSON."""
+    return '', lambda book: json.dumps(book, ensure_ascii=False) + '\n'
+
+
+def csv_encoder():
+    """Encabezado y función que convierte un libro en una fila CSV."""
+    writer = csv.writer(Echo())
+    return writer.writerow(EXPORT_FIELDS), lambda book: writer.writerow([book.get(field, '') for field in EXPORT_FIELDS])
+
+
+def _iter_chunks(encoder, cursor, chunk_size):
+    header, encode = encoder()
+    chunk = [header] if header else []
+    for book in _rows(cursor):
+        chunk.append(encode(book))
+        if len(chunk) >= chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+async def _aiter_chunks(encoder, cursor, chunk_size):
+    header, encode = encoder()
+    chunk = [header] if header else []
+    async for book in _arows(cursor):
+        chunk.append(encode(book))
+        if len(chunk) >= chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def iter_ndjson(cursor, chunk_size=500):
+    """Una línea JSON por libro, agrupadas en bloques de `chunk_size` líneas."""
+    return _iter_chunks(ndjson_encoder, cursor, chunk_size)
+
+
+def iter_csv(cursor, chunk_size=500):
+    """Encabezado y una fila CSV por libro, agrupadas en bloques de `chunk_size` filas."""
+    return _iter_chunks(csv_encoder, cursor, chunk_size)
+
+
+def aiter_ndjson(cursor, chunk_size=500):
+    """Como `iter_ndjson`, como generador asíncrono sobre un cursor de `AsyncMongoClient`."""
+    return _aiter_chunks(ndjson_encoder, cursor, chunk_size)
+
+
+def aiter_csv(cursor, chunk_size=500):
+    """Como `iter_csv`, como generador asíncrono sobre un cursor de `AsyncMongoClient`."""
+    return _aiter_chunks(csv_encoder, cursor, chunk_size)
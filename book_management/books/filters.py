@@ -0,0 +1,234 @@
+"""
+Filtros y orden del listado de libros (`GET /api/books/`).
+
+Los parámetros (`author`, `genre`, `title`, `price_min`/`price_max`,
+`published_after`/`published_before` y `ordering`) se traducen en un filtro y un orden
+de MongoDB. Antes de consultar se comprueba contra el registro de `books.indexes`
+que algún índice resuelva la combinación siguiendo la regla ESR (igualdad, orden,
+rango): las igualdades como prefijo, luego las claves del orden y los rangos después.
+Si no, la consulta terminaría ordenando en memoria o recorriendo la colección, y según
+`BOOK_QUERY_POLICY` se rechaza (400) o se responde con `X-Query-Warning`.
+"""
+import logging
+from datetime import datetime, time
+
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .indexes import INDEXES, IndexSpec
+from .pagination import BOOK_ORDERING_FIELDS, get_ordering, get_sort
+from .storage import DATE_FORMAT, is_typed_storage, may_have_legacy_documents, to_decimal128
+
+logger = logging.getLogger(__name__)
+
+# Filtros de igualdad exacta, por campo del documento
+EQUALITY_FILTERS = ('author', 'genre', 'title')
+
+# Filtros de rango (inclusivos): campo del documento -> (parámetro mínimo, parámetro máximo)
+RANGE_FILTERS = {
+    'price': ('price_min', 'price_max'),
+    'published_date': ('published_after', 'published_before'),
+}
+
+# MongoDB crea siempre este índice, aunque no esté en el registro
+ID_INDEX = IndexSpec([('_id', 1)], name='_id_')
+
+QUERY_WARNING_HEADER = 'X-Query-Warning'
+
+# Problemas que puede tener un plan
+IN_MEMORY_SORT = 'in_memory_sort'
+COLLSCAN = 'collscan'
+
+
+class BookFilterSerializer(serializers.Serializer):
+    author = serializers.CharField(max_length=255, required=False)
+    genre = serializers.CharField(max_length=100, required=False)
+    title = serializers.CharField(max_length=255, required=False)
+    price_min = serializers.FloatField(required=False)
+    price_max = serializers.FloatField(required=False)
+    published_after = serializers.DateField(input_formats=[DATE_FORMAT], required=False)
+    published_before = serializers.DateField(input_formats=[DATE_FORMAT], required=False)
+
+    def validate(self, attrs):
+        for low, high in RANGE_FILTERS.values():
+            if low in attrs and high in attrs and attrs[low] > attrs[high]:
+                raise serializers.ValidationError({low: [f"Debe ser menor o igual que `{high}`."]})
+        return attrs
+
+
+class QueryPlan:
+    """Resultado de comprobar una consulta contra el registro: índice elegido o problema."""
+
+    def __init__(self, index=None, problem=None):
+        self.index = index
+        self.problem = problem
+
+    def __bool__(self):
+        return self.problem is None
+
+
+def _range_bounds(field, low, high, typed=None):
+    typed = is_typed_storage() if typed is None else typed
+    if field == 'published_date':
+        if typed:
+            # Fechas BSON guardadas a medianoche (ver `storage.parse_published_date`)
+            low = low and datetime.combine(low, time.min)
+            high = high and datetime.combine(high, time.min)
+        else:
+            # Con texto "YYYY-MM-DD" el orden lexicográfico coincide con el cronológico
+            low = low and low.strftime(DATE_FORMAT)
+            high = high and high.strftime(DATE_FORMAT)
+    elif field == 'price' and typed:
+        # Comparar Decimal128 con Decimal128: 19.99 como double es menor que Decimal128("19.99").
+        # MongoDB compara números de distinto tipo, así que también acota los precios double sin migrar
+        low = low if low is None else to_decimal128(low)
+        high = high if high is None else to_decimal128(high)
+    bounds = {}
+    if low is not None:
+        bounds['$gte'] = low
+    if high is not None:
+        bounds['$lte'] = high
+    return bounds
+
+
+def _serves(spec, equality, ranges, sort):
+    """
+    Devuelve `(filtra, ordena)` para un índice: si su primera clave acota la consulta y si
+    entrega los documentos en el orden pedido sin una etapa SORT.
+    """
+    keys = spec.keys
+    position = 0
+    while position < len(keys) and keys[position][0] in equality:
+        position += 1
+    filters = position > 0 or keys[0][0] in ranges
+
+    # Un campo con igualdad es constante en el resultado: no cuenta para el orden
+    sort = [(field, direction) for field, direction in sort if field not in equality]
+    window = keys[position:position + len(sort)]
+    if [field for field, _ in window] != [field for field, _ in sort]:
+        return filters, False
+    # El índice se puede recorrer al revés: basta con que todas las direcciones coincidan o todas se inviertan
+    same = [index_direction == direction for (_, index_direction), (_, direction) in zip(window, sort)]
+    return filters, all(same) or not any(same)
+
+
+def plan_query(equality, ranges, sort, indexes=None):
+    """
+    Busca en el registro un índice para una consulta con igualdades en `equality`, rangos en
+    `ranges` y el orden `sort` de MongoDB. Devuelve un `QueryPlan`.
+    """
+    indexes = [ID_INDEX] + list(INDEXES['Book'] if indexes is None else indexes)
+    has_filters = bool(equality or ranges)
+    any_filter = False
+    for spec in indexes:
+        if spec.is_text:
+            continue
+        filters, sorts = _serves(spec, equality, ranges, sort)
+        if sorts and (filters or not has_filters):
+            return QueryPlan(index=spec.name)
+        any_filter = any_filter or filters
+    return QueryPlan(problem=IN_MEMORY_SORT if any_filter else COLLSCAN)
+
+
+class BookQuery:
+    """
+    Filtro y orden de MongoDB para una petición al listado de libros (`ordering` None: sin orden).
+
+    `legacy_ranges` son los rangos equivalentes para los documentos sin migrar: un texto no se
+    compara con una fecha BSON, así que el filtro acepta cualquiera de los dos con `$or`.
+    """
+
+    def __init__(self, equality=None, ranges=None, ordering=('_id', 1), legacy_ranges=None):
+        self.equality = equality or {}
+        self.ranges = ranges or {}
+        self.ordering = ordering
+        self.legacy_ranges = legacy_ranges or {}
+        self.warning = None
+
+    @property
+    def query(self):
+        query = dict(self.equality)
+        alternatives = []
+        for field, bounds in self.ranges.items():
+            if field in self.legacy_ranges:
+                alternatives.append({"$or": [{field: bounds}, {field: self.legacy_ranges[field]}]})
+            else:
+                query[field] = bounds
+        if len(alternatives) == 1:
+            query.update(alternatives[0])
+        elif alternatives:
+            query["$and"] = alternatives
+        return query
+
+    @property
+    def sort(self):
+        return get_sort(*self.ordering) if self.ordering else []
+
+    def plan(self):
+        return plan_query(self.equality, self.ranges, self.sort)
+
+    def suggested_orderings(self):
+        """Órdenes que sí resuelve un índice con los mismos filtros."""
+        if not self.ordering:
+            return []
+        field, direction = self.ordering
+        prefix = '-' if direction == -1 else ''
+        return [
+            prefix + candidate for candidate in BOOK_ORDERING_FIELDS
+            if plan_query(self.equality, self.ranges, get_sort(candidate, direction))
+        ]
+
+    def describe_problem(self, plan):
+        if plan.problem == IN_MEMORY_SORT:
+            message = "Ningún índice resuelve este orden con estos filtros: MongoDB tendría que ordenar en memoria."
+        else:
+            message = "Ningún índice acota estos filtros: MongoDB tendría que recorrer toda la colección."
+        suggestions = self.suggested_orderings()
+        if suggestions:
+            message += " Órdenes disponibles: " + ", ".join(f"`{ordering}`" for ordering in suggestions) + "."
+        return message
+
+
+def get_query_policy():
+    return getattr(settings, 'BOOK_QUERY_POLICY', 'reject')
+
+
+def get_book_query(request, ordered=True):
+    """
+    Lee los filtros y el orden de la petición (con `ordered=False`, solo los filtros). Lanza
+    `ValidationError` si no son válidos o si, con `BOOK_QUERY_POLICY = "reject"`, ningún índice
+    resuelve la combinación.
+    """
+    serializer = BookFilterSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    values = serializer.validated_data
+
+    equality = {field: values[field] for field in EQUALITY_FILTERS if field in values}
+    ranges = {}
+    legacy_ranges = {}
+    for field, (low, high) in RANGE_FILTERS.items():
+        if low in values or high in values:
+            ranges[field] = _range_bounds(field, values.get(low), values.get(high))
+            if field == 'published_date' and is_typed_storage() and may_have_legacy_documents():
+                legacy_ranges[field] = _range_bounds(field, values.get(low), values.get(high), typed=False)
+    book_query = BookQuery(equality, ranges, get_ordering(request) if ordered else None, legacy_ranges)
+
+    policy = get_query_policy()
+    if policy == 'off':
+        return book_query
+    plan = book_query.plan()
+    if not plan:
+        message = book_query.describe_problem(plan)
+        if policy == 'reject':
+            raise ValidationError({"ordering" if plan.problem == IN_MEMORY_SORT else "filters": [message]})
+        logger.warning("Consulta de libros sin índice (%s): %s", plan.problem, request.get_full_path())
+        book_query.warning = plan.problem
+    return book_query
+
+
+def set_query_warning(response, book_query):
+    """Agrega `X-Query-Warning` si la consulta se ejecutó sin un índice adecuado (política "warn")."""
+    if book_query.warning:
+        response[QUERY_WARNING_HEADER] = book_query.warning
+    return response
@@ -0,0 +1,221 @@
+"""
+Registro declarativo de índices de MongoDB para las colecciones de la app `books`.
+
+`INDEXES` describe los índices que deben existir por colección y `QUERY_SHAPES`
+las formas de consulta que usan los endpoints, para poder comprobar con
+`explain()` que ninguna termina en un recorrido completo de la colección.
+"""
+from pymongo import ASCENDING, TEXT, IndexModel
+
+# Opciones de índice que se comparan al buscar diferencias
+INDEX_OPTIONS = ('unique', 'sparse', 'expireAfterSeconds', 'partialFilterExpression', 'weights', 'default_language')
+
+# Peso de cada campo en la relevancia de la búsqueda de texto (`books.search`)
+TEXT_WEIGHTS = {'title': 10, 'author': 5, 'genre': 2}
+
+
+class IndexSpec:
+    """Un índice declarado: claves en orden y opciones de creación."""
+
+    def __init__(self, keys, name=None, **options):
+        self.keys = [(field, direction) for field, direction in keys]
+        self.name = name or '_'.join(f'{field}_{direction}' for field, direction in self.keys)
+        self.options = options
+
+    def to_model(self):
+        return IndexModel(self.keys, name=self.name, **self.options)
+
+    @property
+    def is_text(self):
+        return any(direction == TEXT for _, direction in self.keys)
+
+    def stored_keys(self):
+        """Claves tal como las devuelve `index_information()`: los campos de texto aparecen como `_fts`/`_ftsx`."""
+        keys = []
+        for field, direction in self.keys:
+            if direction != TEXT:
+                keys.append((field, direction))
+            elif ('_fts', TEXT) not in keys:
+                keys += [('_fts', TEXT), ('_ftsx', 1)]
+        return keys
+
+    def matches(self, info):
+        """Indica si el índice existente (`index_information()`) es equivalente al declarado."""
+        if [(field, direction) for field, direction in info['key']] != self.stored_keys():
+            return False
+        for option in INDEX_OPTIONS:
+            if info.get(option) != self.options.get(option):
+                return False
+        return True
+
+    def __repr__(self):
+        return f"IndexSpec({self.name!r})"
+
+
+class QueryShape:
+    """Forma de consulta usada por un endpoint, con valores de ejemplo para `explain()`."""
+
+    def __init__(self, endpoint, collection, query, sort=None, projection=None):
+        self.endpoint = endpoint
+        self.collection = collection
+        self.query = query
+        self.sort = sort
+        self.projection = projection
+
+
+INDEXES = {
+    'User': [
+        # Login, registro y `create_tokens_for_mongo_user` buscan por email
+        IndexSpec([('email', ASCENDING)], unique=True),
+        # Refresco incremental de la instantánea de versiones de usuario
+        IndexSpec([('updated_at', ASCENDING)]),
+    ],
+    'Book': [
+        # Orden por clave (`?ordering=`) con `_id` como desempate
+        IndexSpec([('title', ASCENDING), ('_id', ASCENDING)]),
+        IndexSpec([('author', ASCENDING), ('_id', ASCENDING)]),
+        IndexSpec([('published_date', ASCENDING), ('_id', ASCENDING)]),
+        IndexSpec([('price', ASCENDING), ('_id', ASCENDING)]),
+        # Recalcular las estadísticas de un año: prefijo anclado sobre la fecha, cubierto por el índice
+        IndexSpec([('published_date', ASCENDING), ('price', ASCENDING)]),
+        # Filtros de igualdad del listado (`books.filters`, regla ESR): igualdad, orden y desempate
+        IndexSpec([('genre', ASCENDING), ('_id', ASCENDING)]),
+        IndexSpec([('genre', ASCENDING), ('price', ASCENDING), ('_id', ASCENDING)]),
+        IndexSpec([('author', ASCENDING), ('published_date', ASCENDING), ('_id', ASCENDING)]),
+        # Documentos con almacenamiento tipado (`BOOK_STORAGE_MODE = "typed"`)
+        IndexSpec([('year', ASCENDING), ('price', ASCENDING)]),
+        # Búsqueda de texto (`GET /api/books/search/`); sin idioma para no aplicar stemming a nombres propios
+        IndexSpec(
+            [('title', TEXT), ('author', TEXT), ('genre', TEXT)], name='book_text',
+            weights=TEXT_WEIGHTS, default_language='none',
+        ),
+        # Resincronización incremental del índice de búsqueda en memoria (`BOOK_SEARCH_BACKEND=memory`)
+        IndexSpec([('updated_at', ASCENDING)]),
+    ],
+    'RevokedToken': [
+        # MongoDB borra cada revocación cuando sus tokens ya expiraron (`books.revocation`)
+        IndexSpec([('expires_at', ASCENDING)], expireAfterSeconds=0),
+        # Refresco incremental de la lista de revocación de cada proceso
+        IndexSpec([('updated_at', ASCENDING)]),
+    ],
+}
+
+QUERY_SHAPES = [
+    QueryShape('POST /api/login/', 'User', {'email': 'user@example.com'}),
+    QueryShape('POST /api/users/', 'User', {'email': 'user@example.com'}),
+    QueryShape('GET /api/books/', 'Book', {}, sort=[('_id', ASCENDING)]),
+    QueryShape('GET /api/books/?ordering=price', 'Book', {}, sort=[('price', ASCENDING), ('_id', ASCENDING)]),
+    QueryShape('GET /api/books/?ordering=title', 'Book', {}, sort=[('title', ASCENDING), ('_id', ASCENDING)]),
+    QueryShape('GET /api/books/?author=<author>', 'Book', {'author': 'Author 1'}, sort=[('_id', ASCENDING)]),
+    QueryShape(
+        'GET /api/books/?genre=<genre>&ordering=price', 'Book', {'genre': 'Fiction'},
+        sort=[('price', ASCENDING), ('_id', ASCENDING)],
+    ),
+    QueryShape(
+        'GET /api/books/?author=<author>&published_after=<date>&ordering=published_date', 'Book',
+        {'author': 'Author 1', 'published_date': {'$gte': '2000-01-01'}},
+        sort=[('published_date', ASCENDING), ('_id', ASCENDING)],
+    ),
+    QueryShape(
+        'GET /api/books/?price_min=<min>&price_max=<max>&ordering=price', 'Book',
+        {'price': {'$gte': 10.0, '$lte': 20.0}}, sort=[('price', ASCENDING), ('_id', ASCENDING)],
+    ),
+    QueryShape(
+        'GET /api/books/search/?q=<q>', 'Book', {'$text': {'$search': 'tolkien'}},
+        sort=[('score', {'$meta': 'textScore'}), ('_id', ASCENDING)],
+        projection={'score': {'$meta': 'textScore'}},
+    ),
+    QueryShape('GET /api/books/average-price/<year>/', 'BookYearStats', {'_id': 2008}),
+    QueryShape(
+        'rebuild_book_stats --year <year>', 'Book',
+        {'$or': [{'year': {'$in': [2008]}}, {'published_date': {'$regex': '^2008'}}]},
+        projection={'_id': 0, 'year': 1, 'published_date': 1, 'price': 1},
+    ),
+]
+
+
+def plan_indexes(db, collections=None, prune=False):
+    """
+    Compara los índices existentes con el registro y devuelve las acciones necesarias.
+
+    Cada acción es una tupla `(acción, colección, nombre, spec)` con acción
+    "create", "recreate", "drop" o "ok".
+    """
+    actions = []
+    for collection_name, specs in INDEXES.items():
+        if collections and collection_name not in collections:
+            continue
+        existing = db[collection_name].index_information()
+        declared = {spec.name for spec in specs}
+        for spec in specs:
+            info = existing.get(spec.name)
+            if info is None:
+                actions.append(('create', collection_name, spec.name, spec))
+            elif not spec.matches(info):
+                actions.append(('recreate', collection_name, spec.name, spec))
+            else:
+                actions.append(('ok', collection_name, spec.name, spec))
+        if prune:
+            for name in existing:
+                if name != '_id_' and name not in declared:
+                    actions.append(('drop', collection_name, name, None))
+    return actions
+
+
+def apply_plan(db, actions):
+    """Ejecuta las acciones de `plan_indexes`. Es idempotente."""
+    to_create = {}
+    for action, collection_name, name, spec in actions:
+        if action in ('recreate', 'drop'):
+            db[collection_name].drop_index(name)
+        if action in ('create', 'recreate'):
+            to_create.setdefault(collection_name, []).append(spec.to_model())
+    for collection_name, models in to_create.items():
+        db[collection_name].create_indexes(models)
+
+
+def ensure_indexes(db, collections=None, prune=False):
+    """Crea (y opcionalmente elimina) índices hasta que coincidan con el registro."""
+    actions = plan_indexes(db, collections=collections, prune=prune)
+    apply_plan(db, [action for action in actions if action[0] != 'ok'])
+    return actions
+
+
+def _plan_stages(plan):
+    """Recorre un plan de `explain()` y devuelve sus etapas con el índice usado."""
+    stages = []
+    pending = [plan]
+    while pending:
+        node = pending.pop()
+        if not isinstance(node, dict):
+            continue
+        if 'stage' in node:
+            stages.append((node['stage'], node.get('indexName')))
+        for key in ('inputStage', 'queryPlan'):
+            if key in node:
+                pending.append(node[key])
+        pending.extend(node.get('inputStages', []))
+    return stages
+
+
+def explain_query_shape(db, shape):
+    """
+    Ejecuta `explain()` sobre una forma de consulta y resume el plan ganador.
+
+    Devuelve un dict con las etapas, los índices usados, si recorre la colección
+    completa (`COLLSCAN`) y si ordena en memoria (`SORT`).
+    """
+    cursor = db[shape.collection].find(shape.query, shape.projection)
+    if shape.sort:
+        cursor = cursor.sort(shape.sort)
+    explain = cursor.limit(1).explain()
+    stages = _plan_stages(explain.get('queryPlanner', {}).get('winningPlan', {}))
+    names = [stage for stage, _ in stages]
+    return {
+        'endpoint': shape.endpoint,
+        'collection': shape.collection,
+        'stages': names,
+        'indexes': [index for _, index in stages if index],
+        'collscan': 'COLLSCAN' in names,
+        'in_memory_sort': 'SORT' in names,
+    }
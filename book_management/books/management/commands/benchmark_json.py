@@ -0,0 +1,61 @@
+import io
+import itertools
+import timeit
+
+from bson import ObjectId
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from books.renderers import MongoJSONParser, MongoJSONRenderer, orjson
+from books.storage import new_book, to_representation
+from books.synthetic import SyntheticBooks
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el renderizado y el parseo JSON de una página de libros con DRF (json de la biblioteca "
+        "estándar y conversión de `_id` por documento) y con `books.renderers` (orjson)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=100, help="Libros por página.")
+        parser.add_argument('--repeat', type=int, default=200, help="Repeticiones de cada medición.")
+
+    def handle(self, *args, **options):
+        generator = SyntheticBooks(seed=1)
+        documents = []
+        for row in itertools.islice(generator, options['books']):
+            document = to_representation(new_book(row))
+            document['_id'] = ObjectId()
+            documents.append(document)
+
+        drf_renderer, mongo_renderer = JSONRenderer(), MongoJSONRenderer()
+
+        def drf_render():
+            # Camino anterior: copiar cada documento convirtiendo `_id` y serializar con `json`
+            books = [dict(document, _id=str(document['_id'])) for document in documents]
+            return drf_renderer.render(books)
+
+        def mongo_render():
+            return mongo_renderer.render(documents)
+
+        body = drf_render()
+        assert JSONParser().parse(io.BytesIO(body)) == MongoJSONParser().parse(io.BytesIO(mongo_render()))
+
+        self.stdout.write(f"{options['books']} libros por página, {len(body) / 1024:.1f} KiB, orjson {'sí' if orjson else 'no'}")
+        self.report("Renderizado", drf_render, mongo_render, options['repeat'])
+        self.report(
+            "Parseo",
+            lambda: JSONParser().parse(io.BytesIO(body)),
+            lambda: MongoJSONParser().parse(io.BytesIO(body)),
+            options['repeat'],
+        )
+
+    def report(self, label, baseline, candidate, repeat):
+        baseline_time = min(timeit.repeat(baseline, number=repeat, repeat=3)) / repeat
+        candidate_time = min(timeit.repeat(candidate, number=repeat, repeat=3)) / repeat
+        self.stdout.write(
+            f"{label}: DRF {baseline_time * 1e6:.0f} µs, books.renderers {candidate_time * 1e6:.0f} µs "
+            f"({baseline_time / candidate_time:.1f}x)"
+        )
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from books.indexes import INDEXES, QUERY_SHAPES, apply_plan, explain_query_shape, plan_indexes
+
+class Command(BaseCommand):
+    help = "Crea, compara y elimina los índices de MongoDB declarados en `books.indexes`"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--collection', action='append', dest='collections', choices=sorted(INDEXES),
+            help="Limitar a una colección (se puede repetir).",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Mostrar los cambios sin aplicarlos.")
+        parser.add_argument('--prune', action='store_true', help="Eliminar los índices que no están declarados.")
+        parser.add_argument('--report', action='store_true', help="Mostrar el plan de cada endpoint con explain().")
+
+    def handle(self, *args, **options):
+        db = settings.MONGO_DB
+        actions = plan_indexes(db, collections=options['collections'], prune=options['prune'])
+
+        styles = {
+            'ok': self.style.SUCCESS,
+            'create': self.style.WARNING,
+            'recreate': self.style.WARNING,
+            'drop': self.style.ERROR,
+        }
+        for action, collection_name, name, _ in actions:
+            self.stdout.write(styles[action](f"{action:<9} {collection_name}.{name}"))
+
+        changes = [action for action in actions if action[0] != 'ok']
+        if options['dry_run']:
+            self.stdout.write(f"{len(changes)} cambios pendientes (dry-run).")
+        else:
+            apply_plan(db, changes)
+            self.stdout.write(self.style.SUCCESS(f"{len(changes)} cambios aplicados."))
+
+        if options['report']:
+            self.report(db, options['collections'])
+
+    def report(self, db, collections):
+        self.stdout.write("\nPlanes de consulta por endpoint:")
+        scans = 0
+        for shape in QUERY_SHAPES:
+            if collections and shape.collection not in collections:
+                continue
+            summary = explain_query_shape(db, shape)
+            plan = ' -> '.join(reversed(summary['stages']))
+            indexes = ', '.join(summary['indexes']) or '-'
+            line = f"{shape.endpoint:<45} {plan:<40} índices: {indexes}"
+            if summary['collscan']:
+                scans += 1
+                self.stdout.write(self.style.ERROR(f"COLLSCAN  {line}"))
+            elif summary['in_memory_sort']:
+                self.stdout.write(self.style.WARNING(f"SORT      {line}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"IXSCAN    {line}"))
+        self.stdout.write(f"{scans} endpoints todavía recorren la colección completa.")
@@ -0,0 +1,25 @@
+import hashlib
+import os
+
+from django.core.management.base import BaseCommand
+from books.openapi import get_config, render_schema
+
+class Command(BaseCommand):
+    help = (
+        "Genera el esquema OpenAPI en `OPENAPI_SCHEMA['FILE']` para que WhiteNoise lo sirva "
+        "después de `collectstatic` (ver `books.openapi`)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Archivo de salida (por defecto `OPENAPI_SCHEMA['FILE']`).")
+
+    def handle(self, *args, **options):
+        filename = options['output'] or get_config()['FILE']
+        body = render_schema()
+
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+        with open(filename, 'wb') as schema_file:
+            schema_file.write(body)
+
+        digest = hashlib.sha256(body).hexdigest()[:12]
+        self.stdout.write(self.style.SUCCESS(f"Esquema escrito en {filename} ({len(body) / 1024:.1f} KiB, sha256 {digest})."))
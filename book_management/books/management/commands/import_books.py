@@ -0,0 +1,208 @@
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from pymongo.errors import BulkWriteError
+
+from books.serializers import BookSerializer
+from books.signals import books_changed
+from books.stats import rebuild_year_stats
+from books.storage import new_book
+from books.synthetic import SyntheticBooks
+
+
+def _init_worker():
+    # Los procesos se crean con "spawn": cada uno configura Django y abre su propio cliente de MongoDB
+    django.setup()
+
+
+def insert_batch(rows, validate=True, update_stats=True):
+    """
+    Valida e inserta un lote con `insert_many(ordered=False)`.
+
+    Devuelve `(insertados, [(índice en el lote, errores)])`.
+    """
+    errors = []
+    documents = []
+    positions = []  # Índice en el lote de cada documento
+    for index, row in enumerate(rows):
+        if validate:
+            serializer = BookSerializer(data=row)
+            if not serializer.is_valid():
+                errors.append((index, serializer.errors))
+                continue
+            row = serializer.validated_data
+        documents.append(new_book(row))
+        positions.append(index)
+
+    if not documents:
+        return 0, errors
+
+    failed = set()
+    try:
+        settings.MONGO_DB['Book'].insert_many(documents, ordered=False)
+    except BulkWriteError as exc:
+        for error in exc.details["writeErrors"]:
+            failed.add(error["index"])
+            errors.append((positions[error["index"]], {"error": [error["errmsg"]]}))
+
+    inserted = [document for position, document in enumerate(documents) if position not in failed]
+    if update_stats and inserted:
+        books_changed.send(sender=Command, removed=[], added=inserted)
+    return len(inserted), errors
+
+
+def _process(task):
+    start, rows, seed, options = task
+    if rows is None:
+        # Lote sintético: cada lote tiene su propia semilla, así el resultado no depende de los procesos
+        generator = SyntheticBooks(seed=None if seed is None else seed * 1_000_003 + start)
+        rows = list(itertools.islice(generator, options['size']))
+    inserted, errors = insert_batch(rows, validate=options['validate'], update_stats=options['update_stats'])
+    return start, len(rows), inserted, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa libros en streaming desde NDJSON o CSV (archivo o stdin) o genera libros sintéticos, "
+        "insertándolos por lotes con varios procesos"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help="Archivo de entrada, o '-' para leer de stdin.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help="Por defecto se deduce de la extensión.")
+        parser.add_argument('--synthetic', type=int, metavar='N', help="Generar N libros sintéticos en lugar de leer un archivo.")
+        parser.add_argument('--seed', type=int, default=None, help="Semilla para --synthetic (reproducible).")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Documentos por insert_many.")
+        parser.add_argument('--workers', type=int, default=1, help="Procesos que validan e insertan en paralelo.")
+        parser.add_argument('--offset', type=int, default=0, help="Saltar las primeras N filas.")
+        parser.add_argument('--resume', action='store_true', help="Continuar desde el último punto de control de esta fuente.")
+        parser.add_argument('--no-validate', action='store_true', help="No validar con BookSerializer (filas ya confiables).")
+        parser.add_argument(
+            '--no-stats', action='store_true',
+            help="No actualizar BookYearStats por lote; se reconstruye una sola vez al final.",
+        )
+
+    def handle(self, *args, **options):
+        if bool(options['path']) == bool(options['synthetic']):
+            raise CommandError("Indique un archivo o --synthetic N (solo uno de los dos).")
+
+        if options['synthetic']:
+            source = f"synthetic:{options['seed']}"
+        else:
+            source = 'stdin' if options['path'] == '-' else os.path.abspath(options['path'])
+        checkpoints = settings.MONGO_DB['Migrations']
+        checkpoint_id = f"import_books:{source}"
+        offset = options['offset']
+        if options['resume']:
+            checkpoint = checkpoints.find_one({"_id": checkpoint_id})
+            offset = checkpoint["offset"] if checkpoint else 0
+        if offset:
+            self.stdout.write(f"Comenzando en la fila {offset}.")
+
+        task_options = {
+            'validate': not options['no_validate'],
+            'update_stats': not options['no_stats'],
+            'size': options['batch_size'],
+        }
+        if options['synthetic']:
+            tasks = self.synthetic_tasks(options['synthetic'], offset, options['seed'], task_options)
+            stream = None
+        else:
+            path = options['path']
+            file_format = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+            stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+            tasks = self.file_tasks(stream, file_format, offset, task_options)
+
+        totals = {"rows": 0, "inserted": 0, "failed": 0}
+        started = time.monotonic()
+        last_report = started
+        try:
+            for start, size, inserted, errors in self.run(tasks, options['workers']):
+                totals["rows"] += size
+                totals["inserted"] += inserted
+                totals["failed"] += len(errors)
+                for index, error in errors[:10]:
+                    self.stderr.write(f"Fila {start + index + 1}: {error}")
+                checkpoints.update_one(
+                    {"_id": checkpoint_id},
+                    {"$set": {"offset": start + size, "updated_at": timezone.now()}},
+                    upsert=True,
+                )
+                now = time.monotonic()
+                if now - last_report >= 5:
+                    last_report = now
+                    rate = totals["rows"] / (now - started)
+                    self.stdout.write(f"Fila {start + size}: {totals['inserted']} insertados ({rate:.0f} filas/s).")
+        finally:
+            if stream is not None and stream is not sys.stdin:
+                stream.close()
+
+        if options['no_stats'] and totals["inserted"]:
+            self.stdout.write("Reconstruyendo las estadísticas por año...")
+            # También incrementa la revisión de los listados, que sin `books_changed` por lote no cambió
+            rebuild_year_stats()
+
+        elapsed = time.monotonic() - started
+        rate = totals["rows"] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['inserted']} libros insertados, {totals['failed']} filas con error, "
+            f"en {elapsed:.1f}s ({rate:.0f} filas/s)."
+        ))
+
+    def read_rows(self, stream, file_format):
+        if file_format == 'csv':
+            yield from csv.DictReader(stream)
+            return
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise CommandError(f"Línea {line_number}: JSON no válido ({exc}).")
+
+    def file_tasks(self, stream, file_format, offset, task_options):
+        rows = itertools.islice(self.read_rows(stream, file_format), offset, None)
+        start = offset
+        while True:
+            batch = list(itertools.islice(rows, task_options['size']))
+            if not batch:
+                return
+            yield start, batch, None, task_options
+            start += len(batch)
+
+    def synthetic_tasks(self, total, offset, seed, task_options):
+        for start in range(offset, total, task_options['size']):
+            yield start, None, seed, dict(task_options, size=min(task_options['size'], total - start))
+
+    def run(self, tasks, workers):
+        """
+        Procesa los lotes y devuelve los resultados en orden de entrada.
+
+        Con varios procesos se mantienen como máximo `2 * workers` lotes en vuelo, de modo
+        que la lectura no se adelanta sin límite a la inserción.
+        """
+        if workers <= 1:
+            for task in tasks:
+                yield _process(task)
+            return
+
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(workers, initializer=_init_worker) as pool:
+            pending = deque()
+            for task in tasks:
+                pending.append(pool.apply_async(_process, (task,)))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
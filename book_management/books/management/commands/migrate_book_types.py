@@ -0,0 +1,106 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from pymongo import UpdateOne
+
+from books.storage import convert_fields, is_typed_storage, needs_migration
+
+CHECKPOINT_ID = 'migrate_book_types'
+
+class Command(BaseCommand):
+    help = (
+        "Convierte los libros existentes al almacenamiento tipado (fecha BSON, año y precio Decimal128) "
+        "en lotes acotados. Guarda un punto de control y se puede reanudar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Documentos leídos por lote.")
+        parser.add_argument('--sleep', type=float, default=0.1, help="Pausa en segundos entre lotes.")
+        parser.add_argument('--max-batches', type=int, default=None, help="Detenerse después de N lotes.")
+        parser.add_argument('--restart', action='store_true', help="Ignorar el punto de control y empezar desde el principio.")
+        parser.add_argument('--dry-run', action='store_true', help="Contar los cambios sin escribirlos.")
+
+    def handle(self, *args, **options):
+        book_collection = settings.MONGO_DB['Book']
+        checkpoints = settings.MONGO_DB['Migrations']
+
+        if not is_typed_storage():
+            self.stdout.write(self.style.WARNING(
+                "BOOK_STORAGE_MODE no es 'typed': la API seguirá guardando libros en formato legacy."
+            ))
+
+        checkpoint = None if options['restart'] else checkpoints.find_one({"_id": CHECKPOINT_ID})
+        last_id = checkpoint["last_id"] if checkpoint else None
+        if last_id is not None:
+            self.stdout.write(f"Reanudando después de _id {last_id}.")
+
+        totals = {"scanned": 0, "converted": 0, "skipped": 0, "conflicts": 0}
+        batches = 0
+        started = time.monotonic()
+        while options['max_batches'] is None or batches < options['max_batches']:
+            query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            documents = list(
+                book_collection.find(query, {"published_date": 1, "price": 1, "year": 1})
+                .sort("_id", 1)
+                .limit(options['batch_size'])
+            )
+            if not documents:
+                break
+
+            operations = []
+            for document in documents:
+                if not needs_migration(document):
+                    continue
+                try:
+                    fields = convert_fields(document.get('published_date'), document.get('price'))
+                except (TypeError, ValueError):
+                    totals["skipped"] += 1
+                    continue
+                if not fields:
+                    continue
+                # Solo se actualiza si el documento no cambió desde que se leyó
+                guard = {"_id": document["_id"]}
+                for field in ("published_date", "price"):
+                    guard[field] = document.get(field)
+                operations.append(UpdateOne(guard, {"$set": fields}))
+
+            converted = len(operations)
+            if operations and not options['dry_run']:
+                result = book_collection.bulk_write(operations, ordered=False)
+                converted = result.modified_count
+                totals["conflicts"] += len(operations) - result.matched_count
+            totals["converted"] += converted
+
+            totals["scanned"] += len(documents)
+            last_id = documents[-1]["_id"]
+            batches += 1
+            if not options['dry_run']:
+                checkpoints.update_one(
+                    {"_id": CHECKPOINT_ID},
+                    {"$set": {"last_id": last_id, "updated_at": timezone.now()}, "$inc": {"converted": converted}},
+                    upsert=True,
+                )
+            self.stdout.write(
+                f"Lote {batches}: {totals['scanned']} leídos, {totals['converted']} convertidos, "
+                f"{totals['skipped']} omitidos, {totals['conflicts']} con conflicto."
+            )
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        elapsed = time.monotonic() - started
+        rate = totals["scanned"] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Migración {'simulada' if options['dry_run'] else 'completada'}: {totals['converted']} documentos "
+            f"convertidos en {elapsed:.1f}s ({rate:.0f} documentos/s)."
+        ))
+        if totals["conflicts"]:
+            self.stdout.write(self.style.WARNING(
+                "Algunos documentos cambiaron durante la migración; vuelva a ejecutar con --restart para convertirlos."
+            ))
+        elif not options['dry_run']:
+            self.stdout.write(
+                "Cuando no queden documentos por convertir, active BOOK_STORAGE_MIGRATED para que los "
+                "filtros por fecha dejen de buscar también las fechas en texto."
+            )
@@ -1,6 +1,8 @@
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from bson import ObjectId
+from books.signals import books_changed
+from books.storage import new_book
 
 class Command(BaseCommand):
     help = "Poblar la colección de libros con datos iniciales"
@@ -53,5 +55,7 @@ class Command(BaseCommand):
         ]
 
         # Insertar datos en la colección
+        books = [new_book(book) for book in books]
         result = book_collection.insert_many(books)
+        books_changed.send(sender=self.__class__, removed=[], added=books)
         self.stdout.write(self.style.SUCCESS(f"{len(result.inserted_ids)} libros añadidos a la colección."))
\ No newline at end of file
@@ -0,0 +1,60 @@
+import csv
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from books.utils import provision_users
+
+class Command(BaseCommand):
+    help = "Da de alta usuarios en lote desde un archivo CSV (email,password) o NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Archivo de entrada, o '-' para leer de stdin.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help="Por defecto se deduce de la extensión.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Usuarios por inserción.")
+
+    def read_rows(self, stream, file_format):
+        if file_format == 'csv':
+            yield from csv.DictReader(stream)
+            return
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise CommandError(f"Línea {line_number}: JSON no válido ({exc}).")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+
+        inserted, failed, offset = 0, 0, 0
+        started = time.monotonic()
+        try:
+            batch = []
+            for row in self.read_rows(stream, file_format):
+                batch.append(row)
+                if len(batch) >= options['batch_size']:
+                    inserted, failed = self.flush(batch, offset, inserted, failed)
+                    offset += len(batch)
+                    batch = []
+            if batch:
+                inserted, failed = self.flush(batch, offset, inserted, failed)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        elapsed = time.monotonic() - started
+        rate = inserted / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{inserted} usuarios creados, {failed} filas con error en {elapsed:.1f}s ({rate:.0f} usuarios/s)."
+        ))
+
+    def flush(self, batch, offset, inserted, failed):
+        report = provision_users(batch)
+        for failure in report["failed"]:
+            self.stderr.write(f"Fila {offset + failure['row'] + 1} ({failure['email']}): {failure['errors']}")
+        return inserted + report["inserted"], failed + len(report["failed"])
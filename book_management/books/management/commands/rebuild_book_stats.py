@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from books.stats import invalidate_stats_responses, rebuild_year_stats, recompute_years
+
+class Command(BaseCommand):
+    help = "Reconstruye las estadísticas de precio por año (`BookYearStats`) a partir de la colección de libros"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, action='append', dest='years', help="Recalcular solo este año (se puede repetir).")
+
+    def handle(self, *args, **options):
+        if options['years']:
+            recompute_years(options['years'])
+            invalidate_stats_responses()
+            self.stdout.write(self.style.SUCCESS(f"Estadísticas recalculadas para {len(options['years'])} años."))
+            return
+
+        total = rebuild_year_stats()
+        self.stdout.write(self.style.SUCCESS(f"Estadísticas reconstruidas para {total} años."))
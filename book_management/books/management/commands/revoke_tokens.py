@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import TokenError, UntypedToken
+from books.authentication import bump_user_version
+from books.revocation import revoke_token, revoke_user_tokens
+
+class Command(BaseCommand):
+    help = (
+        "Revoca todos los tokens emitidos hasta ahora para un usuario, o un token concreto "
+        "(ver `books.revocation`)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Email o id del usuario cuyos tokens se revocan.")
+        parser.add_argument('--token', help="Access o refresh token a revocar.")
+
+    def handle(self, *args, **options):
+        if not options['user'] and not options['token']:
+            raise CommandError("Indica --user o --token.")
+
+        if options['token']:
+            try:
+                token = UntypedToken(options['token'])
+            except TokenError as exc:
+                raise CommandError(f"Token no válido: {exc}")
+            revoke_token(token)
+            self.stdout.write(self.style.SUCCESS(f"Token {token['jti']} revocado."))
+
+        if options['user']:
+            user_id = self.find_user_id(options['user'])
+            revoked_before = revoke_user_tokens(user_id)
+            # También invalida sus tokens con `MONGO_JWT_AUTH['CHECK_USER_VERSION']`, aunque
+            # la revocación esté desactivada
+            bump_user_version(user_id)
+            self.stdout.write(self.style.SUCCESS(
+                f"Tokens del usuario {user_id} emitidos hasta "
+                f"{datetime.fromtimestamp(revoked_before, tz=timezone.utc).isoformat()} revocados "
+                f"y versión del usuario incrementada."
+            ))
+
+    def find_user_id(self, value):
+        query = {"_id": ObjectId(value)} if ObjectId.is_valid(value) else {"email": value}
+        user = settings.MONGO_DB['User'].find_one(query, {"_id": 1})
+        if user is None:
+            raise CommandError(f"No existe el usuario {value!r}.")
+        return str(user["_id"])
@@ -0,0 +1,98 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Se ejecuta en un proceso nuevo por perfil para medir el arranque en frío
+PROBE = """
+import json, statistics, sys, time
+
+started = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter() - started
+
+from django.urls import get_resolver
+started = time.perf_counter()
+get_resolver().url_patterns
+urlconf = time.perf_counter() - started
+modules = len(sys.modules)
+
+from django.conf import settings
+from django.test import Client
+settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+client = Client()
+path, requests = sys.argv[1], int(sys.argv[2])
+# `/metrics` exige el token de métricas (ver `HasMetricsToken`)
+headers = {"Authorization": f"Bearer {settings.METRICS['TOKEN']}"} if path.rstrip('/') == '/metrics' else {}
+
+started = time.perf_counter()
+status = client.get(path, headers=headers).status_code
+first_request = time.perf_counter() - started
+
+durations = []
+for _ in range(requests):
+    started = time.perf_counter()
+    client.get(path, headers=headers)
+    durations.append(time.perf_counter() - started)
+
+print(json.dumps({
+    "setup_ms": setup * 1000,
+    "urlconf_ms": urlconf * 1000,
+    "modules": modules,
+    "apps": len(settings.INSTALLED_APPS),
+    "middleware": len(settings.MIDDLEWARE),
+    "status": status,
+    "first_request_ms": first_request * 1000,
+    "request_us": statistics.median(durations) * 1e6,
+}))
+"""
+
+ROWS = (
+    ("Apps instaladas", "apps", "{:.0f}"),
+    ("Middleware", "middleware", "{:.0f}"),
+    ("django.setup()", "setup_ms", "{:.1f} ms"),
+    ("Carga de URLs", "urlconf_ms", "{:.1f} ms"),
+    ("Módulos importados", "modules", "{:.0f}"),
+    ("Primera petición", "first_request_ms", "{:.1f} ms"),
+    ("Petición (mediana)", "request_us", "{:.0f} µs"),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el arranque (django.setup(), carga de URLs, módulos importados) y el costo por petición "
+        "de los perfiles de configuración (SETTINGS_PROFILE), cada uno en un proceso nuevo"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', default=['full', 'api'], help="Perfiles a comparar.")
+        parser.add_argument(
+            '--path', default='/metrics',
+            help="Ruta de la petición medida; por defecto una que no consulta MongoDB.",
+        )
+        parser.add_argument('--requests', type=int, default=500, help="Peticiones medidas después de la primera.")
+
+    def handle(self, *args, **options):
+        results = {profile: self.probe(profile, options['path'], options['requests']) for profile in options['profiles']}
+
+        width = max(len(label) for label, _, _ in ROWS)
+        self.stdout.write(f"Petición medida: GET {options['path']} (estado {', '.join(str(result['status']) for result in results.values())})")
+        self.stdout.write(" " * width + "".join(f"{profile:>14}" for profile in results))
+        for label, key, template in ROWS:
+            self.stdout.write(f"{label:<{width}}" + "".join(f"{template.format(result[key]):>14}" for result in results.values()))
+
+    def probe(self, profile, path, requests):
+        environment = dict(os.environ, SETTINGS_PROFILE=profile)
+        environment.setdefault('METRICS_TOKEN', 'startup-report')
+        environment.setdefault('DJANGO_SETTINGS_MODULE', 'book_management.settings')
+        process = subprocess.run(
+            [sys.executable, '-c', PROBE, path, str(requests)],
+            cwd=settings.BASE_DIR, env=environment, capture_output=True, text=True,
+        )
+        if process.returncode != 0:
+            raise CommandError(f"El perfil {profile!r} falló:\n{process.stderr}")
+        return json.loads(process.stdout.strip().splitlines()[-1])
@@ -0,0 +1,260 @@
+"""
+Tiempos por petición y métricas en formato Prometheus.
+
+`TimingMiddleware` (en `book_management.middleware`) abre un `RequestTiming` por petición
+en una variable de contexto. Lo alimentan:
+- `CommandTimingListener`, un `CommandListener` de pymongo registrado en los clientes de
+  `books.mongo`: tiempo, cantidad y bytes de los comandos de MongoDB de la petición.
+- `measure("auth")` en `MongoDBJWTAuthentication` y `measure("serialize")` en el renderer JSON.
+
+Al terminar, el middleware agrega la cabecera `Server-Timing` y acumula los tiempos en
+histogramas por endpoint y fase (`total`, `auth`, `db`, `serialize`; `db` y `auth` se
+solapan cuando la autenticación consulta MongoDB). `/metrics` los publica en formato de
+texto de Prometheus junto con la caché de respuestas y el pool de conexiones.
+
+Las métricas son de cada proceso: con varios workers, Prometheus debe consultar cada uno.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+import bson
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+from pymongo.monitoring import CommandListener
+from rest_framework.permissions import BasePermission
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PHASES = ('auth', 'db', 'serialize')
+
+current_timing = contextvars.ContextVar('request_timing', default=None)
+
+
+def get_config():
+    return getattr(settings, 'METRICS', {})
+
+
+def is_enabled():
+    return get_config().get('ENABLED', True)
+
+
+class RequestTiming:
+    __slots__ = ('started', 'phases', 'db_commands', 'db_bytes_sent', 'db_bytes_received', 'endpoint')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.db_commands = 0
+        self.db_bytes_sent = 0
+        self.db_bytes_received = 0
+        self.endpoint = None
+
+    def add(self, phase, seconds):
+        self.phases[phase] += seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total):
+        """Valor de la cabecera `Server-Timing` (duraciones en milisegundos)."""
+        entries = [
+            f'db;dur={self.phases["db"] * 1000:.2f};desc="{self.db_commands} cmd"',
+            f'auth;dur={self.phases["auth"] * 1000:.2f}',
+            f'serialize;dur={self.phases["serialize"] * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ]
+        return ', '.join(entries)
+
+
+@contextmanager
+def measure(phase):
+    """Suma el tiempo del bloque a la fase `phase` de la petición en curso (si la hay)."""
+    timing = current_timing.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(phase, time.perf_counter() - started)
+
+
+class CommandTimingListener(CommandListener):
+    """Atribuye los comandos de MongoDB a la petición del contexto en el que se ejecutan."""
+
+    def __init__(self, measure_bytes=False):
+        self.measure_bytes = measure_bytes
+
+    def started(self, event):
+        timing = current_timing.get()
+        if timing is not None and self.measure_bytes:
+            timing.db_bytes_sent += len(bson.encode(event.command))
+
+    def succeeded(self, event):
+        timing = current_timing.get()
+        if timing is None:
+            return
+        timing.add('db', event.duration_micros / 1e6)
+        timing.db_commands += 1
+        if self.measure_bytes:
+            timing.db_bytes_received += len(bson.encode(event.reply))
+        registry.mongo_commands.inc((timing.endpoint or 'unmatched', event.command_name, 'ok'))
+
+    def failed(self, event):
+        timing = current_timing.get()
+        if timing is None:
+            return
+        timing.add('db', event.duration_micros / 1e6)
+        timing.db_commands += 1
+        registry.mongo_commands.inc((timing.endpoint or 'unmatched', event.command_name, 'error'))
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values, amount=1):
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self.values.items()):
+                lines.append(f'{self.name}{{{format_labels(self.labels, label_values)}}} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(label_values)
+            if series is None:
+                # Conteos por intervalo (el último es +Inf), suma y cantidad
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][position] += 1
+            series[1] += value
+            series[2] += 1
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted(
+                (label_values, (list(counts), total, count))
+                for label_values, (counts, total, count) in self.series.items()
+            )
+        for label_values, (counts, total, count) in series:
+            labels = format_labels(self.labels, label_values)
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+class Registry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.requests = Counter('http_requests_total', 'Peticiones atendidas.', ('endpoint', 'method', 'status'))
+        self.durations = Histogram(
+            'http_request_duration_seconds', 'Duración de las peticiones por fase.',
+            ('endpoint', 'method', 'phase'), buckets,
+        )
+        self.mongo_commands = Counter(
+            'mongo_commands_total', 'Comandos de MongoDB por endpoint.', ('endpoint', 'command', 'outcome')
+        )
+        self.mongo_bytes = Counter(
+            'mongo_command_bytes_total', 'Bytes de los comandos y respuestas de MongoDB (BSON).',
+            ('endpoint', 'direction'),
+        )
+
+    def observe_request(self, endpoint, method, status_code, timing, total):
+        self.requests.inc((endpoint, method, str(status_code)))
+        self.durations.observe((endpoint, method, 'total'), total)
+        for phase, seconds in timing.phases.items():
+            self.durations.observe((endpoint, method, phase), seconds)
+        if timing.db_bytes_sent or timing.db_bytes_received:
+            self.mongo_bytes.inc((endpoint, 'sent'), timing.db_bytes_sent)
+            self.mongo_bytes.inc((endpoint, 'received'), timing.db_bytes_received)
+
+    def expose(self):
+        lines = []
+        for metric in (self.requests, self.durations, self.mongo_commands, self.mongo_bytes):
+            lines += metric.expose()
+        lines += _gauges()
+        return '\n'.join(lines) + '\n'
+
+
+def _gauges():
+    """Estado actual de la caché de respuestas y de los pools de conexiones."""
+    from .mongo import get_pool_stats
+    from .response_cache import get_response_cache
+
+    lines = []
+    cache = get_response_cache()
+    if cache is not None:
+        lines += ['# HELP response_cache_requests_total Consultas a la caché de respuestas.',
+                  '# TYPE response_cache_requests_total counter']
+        for endpoint, counter in sorted(cache.stats()["endpoints"].items()):
+            for result in ('hits', 'misses'):
+                labels = format_labels(('endpoint', 'result'), (endpoint, result))
+                lines.append(f'response_cache_requests_total{{{labels}}} {counter[result]}')
+
+    pools = get_pool_stats()
+    lines += ['# HELP mongo_pool_connections Conexiones del pool de MongoDB de este proceso.',
+              '# TYPE mongo_pool_connections gauge']
+    for client in ('sync', 'async'):
+        if client in pools:
+            for state in ('open', 'in_use'):
+                labels = format_labels(('client', 'state'), (client, state))
+                lines.append(f'mongo_pool_connections{{{labels}}} {pools[client][state]}')
+    return lines
+
+
+registry = Registry(get_config().get('BUCKETS', DEFAULT_BUCKETS))
+
+
+def get_command_listeners():
+    """Listeners para los clientes de `books.mongo` (ninguno con las métricas desactivadas)."""
+    if not is_enabled():
+        return []
+    return [CommandTimingListener(get_config().get('MEASURE_BYTES', False))]
+
+
+class HasMetricsToken(BasePermission):
+    """
+    Exige `Authorization: Bearer <METRICS['TOKEN']>`. Sin token configurado `/metrics`
+    solo está abierto con DEBUG; en producción responde 403 hasta que se defina.
+    """
+
+    def has_permission(self, request, view):
+        token = get_config().get('TOKEN')
+        if not token:
+            return settings.DEBUG
+        return constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
@@ -0,0 +1,237 @@
+"""
+Clientes de MongoDB por proceso.
+
+`settings.MONGO_DB` es un `LazyDatabase`: sus colecciones (`settings.MONGO_DB['Book']`)
+se pueden guardar en variables de módulo, pero el `MongoClient` se crea la primera vez
+que se usa en cada proceso. Después de un fork (gunicorn `--preload`, los procesos de
+`import_books`) el hijo descarta el cliente del padre y crea el suyo, así que no
+comparte sockets ni hilos de monitoreo.
+
+`AsyncMongoClient` queda ligado al event loop en el que se usa por primera vez, así
+que también se crea de forma diferida, dentro del loop del servidor ASGI.
+
+Los dos clientes usan `MONGO_CLIENT_OPTIONS` (tamaño del pool, tiempos de espera,
+compresión, preferencia de lectura) y registran un `PoolStats` con el uso de su pool y
+los listeners de comandos de `books.metrics` y `books.slow_queries`.
+"""
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from pymongo import AsyncMongoClient, MongoClient
+from pymongo.errors import PyMongoError
+from pymongo.monitoring import ConnectionPoolListener
+
+_client = None
+_async_client = None
+_lock = threading.Lock()
+
+
+class PoolStats(ConnectionPoolListener):
+    """Uso del pool de conexiones de un cliente, sumado entre servidores."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.in_use = 0
+        self.checkouts = 0
+        self.checkout_failures = {}
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.pools_cleared = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures[event.reason] = self.checkout_failures.get(event.reason, 0) + 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+            self.wait_time += event.duration
+            self.max_wait_time = max(self.max_wait_time, event.duration)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def snapshot(self, max_pool_size=None):
+        with self._lock:
+            stats = {
+                "open": self.open,
+                "in_use": self.in_use,
+                "max_pool_size": max_pool_size,
+                "utilization": self.in_use / max_pool_size if max_pool_size else None,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "average_wait_ms": self.wait_time * 1000 / self.checkouts if self.checkouts else 0.0,
+                "max_wait_ms": self.max_wait_time * 1000,
+                "pools_cleared": self.pools_cleared,
+            }
+        return stats
+
+
+pool_stats = PoolStats()
+async_pool_stats = PoolStats()
+
+
+def get_client_options():
+    """Opciones de `MongoClient` según `MONGO_CLIENT_OPTIONS`, sin las que no están definidas."""
+    options = getattr(settings, 'MONGO_CLIENT_OPTIONS', {})
+    return {name: value for name, value in options.items() if value not in (None, '')}
+
+
+def get_command_listeners():
+    # Importación diferida: `books.metrics` y `books.slow_queries` leen la configuración,
+    # y este módulo se importa desde ella
+    from . import metrics, slow_queries
+    return [*metrics.get_command_listeners(), *slow_queries.get_command_listeners()]
+
+
+def get_client():
+    """`MongoClient` de este proceso; se crea al primer uso."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = MongoClient(
+                    settings.MONGO_URI, event_listeners=[pool_stats, *get_command_listeners()], **get_client_options()
+                )
+    return _client
+
+
+def get_async_client():
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncMongoClient(
+            settings.MONGO_URI, event_listeners=[async_pool_stats, *get_command_listeners()], **get_client_options()
+        )
+    return _async_client
+
+
+def get_async_db():
+    """Base de datos de la aplicación en el cliente asíncrono (la misma que `settings.MONGO_DB`)."""
+    return get_async_client()[settings.MONGO_DB.name]
+
+
+class LazyCollection:
+    """Colección del cliente de este proceso; se resuelve en el primer uso y otra vez si el cliente cambia."""
+
+    def __init__(self, database_name, name):
+        self.database_name = database_name
+        self.name = name
+        self._client = None
+        self._collection = None
+
+    def resolve(self):
+        client = get_client()
+        if client is not self._client:
+            self._collection = client[self.database_name][self.name]
+            self._client = client
+        return self._collection
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            # `copy`, `pickle` y otros buscan atributos especiales: no crear un cliente para eso
+            raise AttributeError(attr)
+        return getattr(self.resolve(), attr)
+
+    def __getitem__(self, name):
+        return self.resolve()[name]
+
+    def __repr__(self):
+        return f"LazyCollection({self.database_name!r}, {self.name!r})"
+
+
+class LazyDatabase:
+    """Base de datos del cliente de este proceso (ver el docstring del módulo)."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def resolve(self):
+        return get_client()[self.name]
+
+    def __getitem__(self, name):
+        return LazyCollection(self.name, name)
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self.resolve(), attr)
+
+    def __repr__(self):
+        return f"LazyDatabase({self.name!r})"
+
+
+def get_pool_stats():
+    """Uso de los pools de este proceso (solo de los clientes ya creados)."""
+    max_pool_size = get_client_options().get('maxPoolSize', 100)
+    stats = {"pid": os.getpid()}
+    if _client is not None:
+        stats["sync"] = pool_stats.snapshot(max_pool_size)
+    if _async_client is not None:
+        stats["async"] = async_pool_stats.snapshot(max_pool_size)
+    return stats
+
+
+def check_health():
+    """Hace `ping` al servidor. Devuelve `(ok, detalle)` con la latencia o el error."""
+    started = time.perf_counter()
+    try:
+        get_client().admin.command('ping')
+    except PyMongoError as exc:
+        return False, {"error": str(exc)}
+    return True, {"ping_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+
+def _forget_clients():
+    # El hijo no debe usar los sockets ni los hilos de monitoreo del padre
+    global _client, _async_client, _lock, pool_stats, async_pool_stats
+    _client = None
+    _async_client = None
+    _lock = threading.Lock()
+    pool_stats = PoolStats()
+    async_pool_stats = PoolStats()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_clients)
+
+
+@receiver(setting_changed)
+def reset_clients(setting, **kwargs):
+    global _client, _async_client
+    if setting in ('MONGO_URI', 'MONGO_CLIENT_OPTIONS', 'SLOW_QUERIES'):
+        _client = None
+        _async_client = None
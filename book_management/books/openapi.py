@@ -0,0 +1,179 @@
+"""
+Esquema OpenAPI y documentación (Swagger UI y ReDoc) sin trabajo por petición.
+
+drf_yasg genera el esquema introspectando cada `@swagger_auto_schema` de `books.views`.
+En lugar de hacerlo en cada visita a `/swagger/` o `/redoc/`:
+- `manage.py generate_openapi_schema` lo escribe al construir la imagen en
+  `OPENAPI_SCHEMA['FILE']` (en `books/static/`), y WhiteNoise lo sirve desde STATIC_ROOT
+  después de `collectstatic`, sin pasar por las vistas.
+- Si el archivo no está, `/swagger.json` lo genera una vez en memoria; las siguientes
+  peticiones reciben el mismo cuerpo con un ETag del contenido (304 con `If-None-Match`).
+
+Las páginas de Swagger UI y ReDoc cargan el esquema de una de esas dos URLs. Su HTML no
+depende de la petición (`USE_SESSION_AUTH` está desactivado) y también se guarda en memoria.
+drf_yasg se importa en el primer uso, no al cargar las URLs (ni las vistas, ver `books.schema`).
+"""
+import functools
+import hashlib
+import os
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.templatetags.static import static
+from django.urls import include, path, reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.functional import lazy
+from django.utils.http import quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import permissions
+
+from .schema import apply_schemas
+
+# Formatos de drf_yasg que devuelven el esquema en JSON en lugar de la página
+SCHEMA_FORMATS = ('openapi', '.json', 'json')
+
+Document = namedtuple('Document', 'body etag content_type')
+
+_documents = {}
+_lock = threading.Lock()
+
+
+def get_config():
+    return getattr(settings, 'OPENAPI_SCHEMA', {})
+
+
+def get_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="Book Management API",
+        default_version='v1',
+        description="API para gestionar libros con operaciones CRUD",
+        terms_of_service="https://www.google.com/policies/terms/",
+        contact=openapi.Contact(email="support@example.com"),
+        license=openapi.License(name="BSD License"),
+    )
+
+
+def get_patterns():
+    from books.urls import get_urlpatterns
+
+    # drf_yasg solo documenta vistas de DRF: con ASYNC_API se documentan las síncronas equivalentes
+    return [path('api/', include(get_urlpatterns()))] if settings.ASYNC_API else None
+
+
+@functools.cache
+def get_schema_view():
+    from drf_yasg.views import get_schema_view
+
+    apply_schemas()
+    return get_schema_view(
+        get_info(),
+        public=True,
+        permission_classes=(permissions.AllowAny,),
+        patterns=get_patterns(),
+    )
+
+
+def render_schema():
+    """Esquema completo en JSON, sin host: la documentación usa el del navegador."""
+    from drf_yasg.codecs import OpenAPICodecJson
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    apply_schemas()
+    schema = OpenAPISchemaGenerator(get_info(), patterns=get_patterns()).get_schema(request=None, public=True)
+    return OpenAPICodecJson(validators=[]).encode(schema)
+
+
+def get_static_schema_file():
+    """Archivo que sirve el manejador de estáticos activo, o None si no hay esquema pregenerado."""
+    if 'whitenoise.middleware.WhiteNoiseMiddleware' in settings.MIDDLEWARE:
+        # WhiteNoise sirve lo que `collectstatic` copió a STATIC_ROOT al arrancar
+        filename = os.path.join(settings.STATIC_ROOT, get_config().get('STATIC_PATH', 'openapi/schema.json'))
+    else:
+        # `ASGIStaticFilesHandler` busca en los directorios `static/` de las apps
+        filename = get_config().get('FILE')
+    return filename if filename and os.path.isfile(filename) else None
+
+
+def get_spec_url():
+    if get_static_schema_file():
+        return static(get_config().get('STATIC_PATH', 'openapi/schema.json'))
+    return reverse('schema-json')
+
+
+# Para `SWAGGER_SETTINGS` y `REDOC_SETTINGS`, que se leen antes de cargar las URLs
+spec_url = lazy(get_spec_url, str)()
+
+
+def make_document(body, content_type):
+    return Document(body, quote_etag(hashlib.sha256(body).hexdigest()[:32]), content_type)
+
+
+def get_document(key, build):
+    """Documento guardado bajo `key`; `build` se llama una sola vez aunque lleguen peticiones simultáneas."""
+    document = _documents.get(key)
+    if document is None:
+        with _lock:
+            document = _documents.get(key)
+            if document is None:
+                document = _documents[key] = build()
+    return document
+
+
+def build_schema_document():
+    filename = get_static_schema_file() or get_config().get('FILE')
+    if filename and os.path.isfile(filename):
+        with open(filename, 'rb') as schema_file:
+            return make_document(schema_file.read(), 'application/json')
+    return make_document(render_schema(), 'application/json')
+
+
+def document_response(request, document):
+    response = get_conditional_response(request, etag=document.etag)
+    if response is None:
+        response = HttpResponse(document.body, content_type=document.content_type)
+    response['ETag'] = document.etag
+    patch_cache_control(response, public=True, max_age=get_config().get('MAX_AGE', 300))
+    return response
+
+
+@csrf_exempt
+def schema_view(request):
+    return document_response(request, get_document('schema', build_schema_document))
+
+
+def docs_view(renderer):
+    """Página de Swagger UI o ReDoc; con `?format=openapi` (como en drf_yasg) devuelve el esquema."""
+    @functools.cache
+    def get_view():
+        return get_schema_view().with_ui(renderer, cache_timeout=0)
+
+    def build_page(request):
+        response = get_view()(request)
+        response.render()
+        if response.status_code != 200:
+            return None
+        return make_document(response.content, response['Content-Type'])
+
+    @csrf_exempt
+    def view(request, *args, **kwargs):
+        if request.GET.get('format') in SCHEMA_FORMATS:
+            return schema_view(request)
+        document = get_document(renderer, lambda: build_page(request))
+        if document is None:
+            _documents.pop(renderer, None)
+            return get_view()(request, *args, **kwargs)
+        return document_response(request, document)
+
+    return view
+
+
+@receiver(setting_changed)
+def reset_documents(setting, **kwargs):
+    if setting in ('OPENAPI_SCHEMA', 'STATIC_ROOT', 'ASYNC_API', 'MIDDLEWARE'):
+        _documents.clear()
@@ -0,0 +1,262 @@
+import base64
+import binascii
+import json
+
+from bson import ObjectId, json_util
+from django.conf import settings
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Campos por los que se puede ordenar el listado de libros
+BOOK_ORDERING_FIELDS = ('_id', 'title', 'author', 'published_date', 'price')
+
+
+def get_ordering(request, allowed_fields=BOOK_ORDERING_FIELDS, param='ordering'):
+    """
+    Devuelve el orden solicitado como (campo, dirección). Por defecto `_id` ascendente.
+    """
+    value = request.query_params.get(param, '').strip()
+    if not value:
+        return '_id', 1
+    direction = -1 if value.startswith('-') else 1
+    field = value.lstrip('-')
+    if field == 'id':
+        field = '_id'
+    if field not in allowed_fields:
+        raise ValidationError({param: [f"Campo de orden no válido: '{field}'."]})
+    return field, direction
+
+
+def get_sort(field, direction):
+    """Orden de MongoDB con `_id` como desempate para que el orden sea total."""
+    if field == '_id':
+        return [('_id', direction)]
+    return [(field, direction), ('_id', direction)]
+
+
+class BookPagination(PageNumberPagination):
+    """
+    Paginación por número de página aplicada en la propia consulta (skip/limit).
+
+    El total se obtiene según `BOOK_PAGINATION_COUNT`:
+    - "exact": `count_documents` con el mismo filtro.
+    - "estimated": metadatos de la colección cuando no hay filtro (O(1)).
+    - "none": no se cuenta; una página fuera de rango devuelve una lista vacía.
+    """
+    page_size = 10  # Tamaño de la página
+    page_size_query_param = 'page_size'  # Permite que el usuario pase el tamaño de la página
+    max_page_size = 100  # Máximo tamaño de página permitido
+    count_header = 'X-Total-Count'
+
+    def get_count_strategy(self):
+        return getattr(settings, 'BOOK_PAGINATION_COUNT', 'exact')
+
+    def get_page_number(self, request, paginator=None):
+        page_number = request.query_params.get(self.page_query_param) or 1
+        try:
+            page_number = int(page_number)
+            if page_number < 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message="That page number is not a valid integer."
+            ))
+        return page_number
+
+    def count_documents(self, collection, query):
+        strategy = self.get_count_strategy()
+        if strategy == 'none':
+            return None
+        if strategy == 'estimated' and not query:
+            return collection.estimated_document_count()
+        return collection.count_documents(query)
+
+    def get_window(self, request, count):
+        """Devuelve `(skip, limit)` de la página solicitada, una vez conocido el total (`count`, o None)."""
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        self.page_number = self.get_page_number(request)
+        self.count = count
+
+        skip = (self.page_number - 1) * self.page_size_value
+        if self.count is not None and self.page_number > 1 and skip >= self.count:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=self.page_number, message="That page contains no results"
+            ))
+        return skip, self.page_size_value
+
+    def find_page(self, collection, request, count, query, sort, projection):
+        """Cursor de la página solicitada, una vez conocido el total (`count`, o None)."""
+        skip, limit = self.get_window(request, count)
+        cursor = collection.find(query, projection).sort(sort or [('_id', 1)])
+        return cursor.skip(skip).limit(limit)
+
+    def paginate_collection(self, collection, request, query=None, sort=None, projection=None):
+        """
+        Devuelve solo los documentos de la página solicitada.
+        """
+        query = query or {}
+        count = self.count_documents(collection, query)
+        return list(self.find_page(collection, request, count, query, sort, projection))
+
+    async def apaginate_collection(self, collection, request, query=None, sort=None, projection=None):
+        """Igual que `paginate_collection`, con una colección de `AsyncMongoClient`."""
+        query = query or {}
+        count = self.count_documents(collection, query)
+        if count is not None:
+            count = await count
+        return await self.find_page(collection, request, count, query, sort, projection).to_list()
+
+    def get_headers(self):
+        if self.count is None:
+            return {}
+        return {self.count_header: str(self.count)}
+
+
+class BookCursorPagination(BasePagination):
+    """
+    Paginación por clave (keyset) sobre `_id` o un campo de orden con `_id` como desempate.
+
+    Cada página se obtiene con un filtro de rango sobre la última posición vista,
+    de modo que las páginas profundas cuestan lo mismo que la primera. Los tokens
+    `next`/`previous` son opacos para el cliente.
+    """
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def encode_cursor(self, position, reverse):
+        payload = {
+            'o': self.ordering_value,
+            'v': json_util.dumps(position[0]),
+            'i': str(position[1]),
+            'r': reverse,
+        }
+        data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            if payload['o'] != self.ordering_value or not ObjectId.is_valid(payload['i']):
+                raise ValueError
+            value = json_util.loads(payload['v'])
+            return value, ObjectId(payload['i']), bool(payload['r'])
+        except (KeyError, TypeError, ValueError, binascii.Error, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_position(self, document):
+        value = document.get(self.field) if self.field != '_id' else document['_id']
+        return value, document['_id']
+
+    def get_keyset_query(self, value, object_id, reverse):
+        forward = self.direction == 1
+        if reverse:
+            forward = not forward
+        operator = '$gt' if forward else '$lt'
+        if self.field == '_id':
+            return {'_id': {operator: object_id}}
+        return {'$or': [
+            {self.field: {operator: value}},
+            {self.field: value, '_id': {operator: object_id}},
+        ]}
+
+    def find_page(self, collection, request, query=None, projection=None, ordering=None):
+        """
+        Cursor con la página que sigue (o precede) a la posición de `?cursor=`, más un documento
+        para saber si hay otra página. El resultado se procesa con `set_page`.
+        """
+        self.request = request
+        self.field, self.direction = ordering or get_ordering(request, param=self.ordering_query_param)
+        self.ordering_value = ('-' if self.direction == -1 else '') + self.field
+        self.page_size_value = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+
+        query = dict(query or {})
+        position = self.decode_cursor(request)
+        reverse = bool(position and position[2])
+        if position:
+            keyset = self.get_keyset_query(position[0], position[1], reverse)
+            query = {'$and': [query, keyset]} if query else keyset
+
+        if projection is not None and self.field != '_id':
+            # La posición del cursor necesita el campo de orden aunque no se haya pedido
+            projection = dict(projection)
+            if any(projection.values()):
+                projection[self.field] = 1
+            else:
+                projection.pop(self.field, None)
+
+        self.position, self.reverse = position, reverse
+        direction = -self.direction if reverse else self.direction
+        sort = get_sort(self.field, direction)
+        return collection.find(query, projection).sort(sort).limit(self.page_size_value + 1)
+
+    def set_page(self, documents):
+        """Recorta los documentos leídos con `find_page` y calcula los enlaces."""
+        has_more = len(documents) > self.page_size_value
+        documents = documents[:self.page_size_value]
+        if self.reverse:
+            documents.reverse()
+            self.has_next, self.has_previous = self.position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.position is not None
+
+        self.first_position = self.get_position(documents[0]) if documents else None
+        self.last_position = self.get_position(documents[-1]) if documents else None
+        return documents
+
+    def paginate_collection(self, collection, request, query=None, projection=None, ordering=None):
+        """
+        Devuelve la página que sigue (o precede) a la posición codificada en `?cursor=`.
+        """
+        return self.set_page(list(self.find_page(collection, request, query, projection, ordering)))
+
+    async def apaginate_collection(self, collection, request, query=None, projection=None, ordering=None):
+        """Igual que `paginate_collection`, con una colección de `AsyncMongoClient`."""
+        cursor = self.find_page(collection, request, query, projection, ordering)
+        return self.set_page(await cursor.to_list())
+
+    def get_next_link(self):
+        if not self.has_next or self.last_position is None:
+            return None
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, self.encode_cursor(self.last_position, False)
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first_position is None:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, self.encode_cursor(self.first_position, True)
+        )
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
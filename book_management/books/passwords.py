@@ -0,0 +1,157 @@
+"""
+Hash y verificación de contraseñas en un pool de hilos acotado.
+
+scrypt/pbkdf2 consumen CPU durante decenas de milisegundos. Ejecutarlos en un pool
+con concurrencia limitada (`PASSWORD_HASHING['MAX_CONCURRENCY']`) evita que una
+ráfaga de logins ocupe todos los hilos del worker; cuando hay demasiadas
+verificaciones en cola se rechaza la petición en lugar de acumular latencia.
+
+Las altas masivas (`hash_passwords`) usan otro pool, de `BULK_CONCURRENCY` hilos, para
+no ocupar los lugares de los logins mientras generan miles de hashes.
+"""
+import asyncio
+import itertools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from werkzeug.security import check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = None
+_bulk_executor = None
+_method_prefix = None
+_lock = threading.Lock()
+MISSING = object()
+
+
+class PasswordHasherBusy(Exception):
+    """No hay capacidad para verificar más contraseñas en este momento."""
+
+
+def get_config():
+    return getattr(settings, 'PASSWORD_HASHING', {})
+
+
+def _get_executor():
+    global _executor, _pending
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                config = get_config()
+                max_concurrency = config.get('MAX_CONCURRENCY', 2)
+                _pending = threading.BoundedSemaphore(config.get('MAX_PENDING', max_concurrency * 8))
+                _executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='password-hash')
+    return _executor
+
+
+def _submit(fn, *args, timeout=MISSING):
+    """
+    Envía una tarea al pool. `timeout` es la espera máxima por un lugar en la cola:
+    por defecto `QUEUE_TIMEOUT`, 0 para no esperar y None para esperar sin límite.
+    """
+    executor = _get_executor()
+    if timeout is MISSING:
+        timeout = get_config().get('QUEUE_TIMEOUT', 5)
+    if timeout == 0:
+        acquired = _pending.acquire(blocking=False)
+    else:
+        acquired = _pending.acquire(timeout=timeout)
+    if not acquired:
+        raise PasswordHasherBusy()
+    future = executor.submit(fn, *args)
+    future.add_done_callback(lambda _: _pending.release())
+    return future
+
+
+def _get_bulk_executor():
+    global _bulk_executor
+    if _bulk_executor is None:
+        with _lock:
+            if _bulk_executor is None:
+                _bulk_executor = ThreadPoolExecutor(
+                    max_workers=get_config().get('BULK_CONCURRENCY', 1), thread_name_prefix='password-hash-bulk'
+                )
+    return _bulk_executor
+
+
+@receiver(setting_changed)
+def reset_password_hashing(setting, **kwargs):
+    global _executor, _pending, _bulk_executor, _method_prefix
+    if setting == 'PASSWORD_HASHING':
+        with _lock:
+            for executor in (_executor, _bulk_executor):
+                if executor is not None:
+                    executor.shutdown(wait=False)
+            _executor, _pending, _bulk_executor, _method_prefix = None, None, None, None
+
+
+def get_hash_method():
+    return get_config().get('METHOD', 'scrypt')
+
+
+def hash_password(password):
+    """Genera el hash de una contraseña con el método configurado."""
+    return _submit(generate_password_hash, password, get_hash_method()).result()
+
+
+def hash_passwords(passwords):
+    """
+    Genera los hashes de muchas contraseñas (para altas masivas) en el pool de altas masivas,
+    separado del de los logins: un lote grande no los deja sin lugar en la cola.
+    """
+    method = get_hash_method()
+    return list(_get_bulk_executor().map(generate_password_hash, passwords, itertools.repeat(method)))
+
+
+def verify_password(password_hash, password):
+    """Verifica una contraseña contra su hash. Lanza `PasswordHasherBusy` si el pool está saturado."""
+    return _submit(check_password_hash, password_hash, password).result()
+
+
+async def averify_password(password_hash, password):
+    """
+    Versión asíncrona de `verify_password` para las vistas de ASGI: espera el resultado sin
+    bloquear el event loop. No espera lugar en la cola (eso sí lo bloquearía), así que
+    lanza `PasswordHasherBusy` en cuanto el pool está saturado.
+    """
+    future = _submit(check_password_hash, password_hash, password, timeout=0)
+    return await asyncio.wrap_future(future)
+
+
+def needs_rehash(password_hash):
+    """Indica si el hash se generó con un método o costo distinto del configurado."""
+    global _method_prefix
+    if _method_prefix is None:
+        # werkzeug completa los parámetros por defecto ("scrypt" -> "scrypt:32768:8:1")
+        _method_prefix = generate_password_hash('', get_hash_method()).split('$', 1)[0]
+    return password_hash.split('$', 1)[0] != _method_prefix
+
+
+def rehash_in_background(collection, user_id, old_hash, password):
+    """
+    Regenera el hash con el método actual sin bloquear la respuesta.
+
+    La actualización solo se aplica si el hash no cambió mientras tanto. Si el pool
+    está saturado se omite; se volverá a intentar en el siguiente login.
+    """
+    def save(future):
+        # Importación local: `books.authentication` importa este módulo a través de `books.utils`
+        from .authentication import invalidate_cached_user
+
+        try:
+            collection.update_one({"_id": user_id, "password": old_hash}, {"$set": {"password": future.result()}})
+            invalidate_cached_user(user_id)
+        except Exception as exc:
+            logger.error(f"No se pudo actualizar el hash de la contraseña: {exc}")
+
+    try:
+        future = _submit(generate_password_hash, password, get_hash_method(), timeout=0)
+    except PasswordHasherBusy:
+        return
+    future.add_done_callback(save)
@@ -0,0 +1,71 @@
+"""
+Selección de campos (`?fields=` / `?exclude=`) para las lecturas de libros.
+
+Los campos pedidos se convierten en una proyección de MongoDB, así que los demás no se
+leen ni se serializan. `_id` siempre se devuelve.
+"""
+from rest_framework.exceptions import ValidationError
+
+from .serializers import BookSerializer
+
+# Campos que se pueden seleccionar: los de la API de un libro
+BOOK_FIELDS = ('_id',) + tuple(BookSerializer().fields)
+
+# Campos internos que necesita el detalle para calcular el ETag (ver `books.conditional`)
+VALIDATOR_FIELDS = ('version', 'updated_at')
+
+
+class FieldSelection:
+    def __init__(self, include=None, exclude=None):
+        self.include = include
+        self.exclude = exclude
+
+    def __bool__(self):
+        return bool(self.include or self.exclude)
+
+    def projection(self, extra=()):
+        """Proyección de MongoDB, o None para el documento completo. `extra` son campos que se leen siempre."""
+        if self.include:
+            return {field: 1 for field in (*self.include, *extra)}
+        if self.exclude:
+            return {field: 0 for field in self.exclude if field not in extra}
+        return None
+
+    def trim(self, document):
+        """Quita en el lugar los campos que se leyeron pero no se pidieron (p. ej. el campo de orden del cursor)."""
+        if self.include:
+            for field in [field for field in document if field != '_id' and field not in self.include]:
+                del document[field]
+        elif self.exclude:
+            for field in self.exclude:
+                document.pop(field, None)
+        return document
+
+
+def _parse_fields(request, param, allowed_fields):
+    value = request.query_params.get(param, '')
+    fields = []
+    for field in (part.strip() for part in value.split(',')):
+        if not field:
+            continue
+        if field == 'id':
+            field = '_id'
+        if field not in allowed_fields:
+            raise ValidationError({param: [f"Campo no válido: '{field}'."]})
+        if field not in fields:
+            fields.append(field)
+    return fields
+
+
+def get_field_selection(request, allowed_fields=BOOK_FIELDS):
+    """
+    Lee `?fields=a,b` o `?exclude=a,b`. Lanza `ValidationError` con campos desconocidos, si se
+    usan los dos parámetros o si se intenta excluir `_id`.
+    """
+    include = _parse_fields(request, 'fields', allowed_fields)
+    exclude = _parse_fields(request, 'exclude', allowed_fields)
+    if include and exclude:
+        raise ValidationError({"fields": ["No se puede usar `fields` junto con `exclude`."]})
+    if '_id' in exclude:
+        raise ValidationError({"exclude": ["El campo '_id' se devuelve siempre."]})
+    return FieldSelection(include=include, exclude=exclude)
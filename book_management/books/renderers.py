@@ -0,0 +1,81 @@
+"""
+Renderer y parser JSON de la API basados en orjson.
+
+Codifican de forma nativa los tipos de BSON (`ObjectId`, `Decimal128`, `datetime`),
+así que las vistas devuelven los documentos de MongoDB sin convertirlos campo por
+campo. Si orjson no está instalado, o se pide JSON con sangría (API navegable), se usa
+el `json` de la biblioteca estándar con el mismo tratamiento de los tipos de BSON.
+
+Se configuran en `REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES']` y `['DEFAULT_PARSER_CLASSES']`.
+"""
+from bson import Decimal128, ObjectId
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .metrics import measure
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+
+class MongoJSONEncoder(JSONEncoder):
+    """`JSONEncoder` de DRF que además acepta `ObjectId` y `Decimal128`."""
+
+    def default(self, obj):
+        if isinstance(obj, ObjectId):
+            return str(obj)
+        if isinstance(obj, Decimal128):
+            return float(obj.to_decimal())
+        return super().default(obj)
+
+
+_fallback_encoder = MongoJSONEncoder()
+
+
+def _default(obj):
+    # orjson ya codifica str, números, dict, list y datetime; el resto pasa por el encoder de DRF
+    return _fallback_encoder.default(obj)
+
+
+class MongoJSONRenderer(JSONRenderer):
+    encoder_class = MongoJSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        with measure('serialize'):
+            if orjson is None or self.get_indent(accepted_media_type or '', renderer_context or {}) is not None:
+                return super().render(data, accepted_media_type, renderer_context)
+            return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class MongoJSONParser(JSONParser):
+    renderer_class = MongoJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        # orjson solo acepta UTF-8, que es lo que exige JSON (RFC 8259)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class PrometheusRenderer(BaseRenderer):
+    """Texto ya formateado por `books.metrics` (formato de exposición 0.0.4)."""
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        # Errores de DRF (p. ej. 403 sin el token): el mensaje como texto, no la repr del diccionario
+        if isinstance(data, dict) and 'detail' in data:
+            data = data['detail']
+        return f'{data}\n'.encode(self.charset)
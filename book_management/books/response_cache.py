@@ -0,0 +1,268 @@
+"""
+Caché de respuestas para las lecturas de libros.
+
+La clave de cada respuesta incluye el endpoint, los parámetros de la petición y la
+generación de la colección de libros. Cada escritura (`books_changed`) incrementa la
+generación, así que las entradas anteriores dejan de usarse sin recorrer claves y
+terminan de expirar por TTL o por LRU.
+
+Backends (`RESPONSE_CACHE['BACKEND']`):
+- "lru": memoria de cada proceso (`books.cache.LRUCache`). La generación es la revisión
+  de `books.revisions`, releída cada GENERATION_REFRESH_INTERVAL segundos, más las
+  escrituras del propio proceso; las de otros procesos se ven con ese retraso.
+- "django": el backend de caché de Django indicado en ALIAS (p. ej. Redis o Memcached),
+  compartido entre procesos; la generación se guarda en la misma caché.
+- "none": desactivada.
+"""
+import functools
+import hashlib
+import itertools
+import json
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from .cache import MISSING, LRUCache
+from .conditional import get_media_format, not_modified
+from .revisions import BOOK_REVISION, COUNTERS_COLLECTION
+from .signals import books_changed
+from .snapshot import PollingSnapshot
+
+# Cabeceras que se guardan junto con el cuerpo
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'X-Total-Count', 'X-Query-Warning')
+
+_response_cache = None
+_lock = threading.Lock()
+
+
+class CachedResponse:
+    __slots__ = ('data', 'headers')
+
+    def __init__(self, data, headers):
+        self.data = data
+        self.headers = headers
+
+
+class RevisionSnapshot(PollingSnapshot):
+    """Revisiones de la colección `Counters`, por nombre de colección."""
+    collection_name = COUNTERS_COLLECTION
+    projection = {"revision": 1, "updated_at": 1}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.revisions = {}
+
+    def apply(self, document):
+        self.revisions[document["_id"]] = document["revision"]
+
+
+class LRUBackend:
+    def __init__(self, max_size=2048, refresh_interval=5):
+        self.entries = LRUCache(max_size=max_size)
+        self.revisions = RevisionSnapshot(interval=refresh_interval)
+        self._local = itertools.count()
+        self.local_generation = next(self._local)
+
+    def needs_io(self):
+        return self.revisions.is_due()
+
+    def get_generation(self):
+        self.revisions.refresh_if_due()
+        return f"{self.revisions.revisions.get(BOOK_REVISION, 0)}.{self.local_generation}"
+
+    def bump_generation(self):
+        self.local_generation = next(self._local)
+
+    def get(self, key):
+        return self.entries.get_or_missing(key)
+
+    def set(self, key, value, ttl):
+        self.entries.set(key, value, ttl)
+
+    def stats(self):
+        return self.entries.stats()
+
+
+class DjangoCacheBackend:
+    generation_key = f'books:generation:{BOOK_REVISION}'
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def needs_io(self):
+        return True
+
+    def get_generation(self):
+        generation = self.cache.get(self.generation_key)
+        if generation is None:
+            # Si la clave se perdió, empezar por un valor que no repita generaciones anteriores
+            self.cache.add(self.generation_key, time.time_ns(), timeout=None)
+            generation = self.cache.get(self.generation_key)
+        return generation
+
+    def bump_generation(self):
+        try:
+            self.cache.incr(self.generation_key)
+        except ValueError:
+            self.cache.add(self.generation_key, time.time_ns(), timeout=None)
+
+    def get(self, key):
+        return self.cache.get(key, MISSING)
+
+    def set(self, key, value, ttl):
+        self.cache.set(key, value, ttl)
+
+    def stats(self):
+        return {}
+
+
+class ResponseCache:
+    """Respuestas cacheadas por endpoint, con TTL y contadores de aciertos por endpoint."""
+
+    def __init__(self, backend, ttls=None, default_ttl=30):
+        self.backend = backend
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def make_key(self, endpoint, request, view_kwargs):
+        params = sorted(
+            (name, value) for name in request.query_params for value in request.query_params.getlist(name)
+        )
+        # El host forma parte de los enlaces `next`/`previous` del listado por cursor
+        raw = json.dumps(
+            [request.get_host(), get_media_format(request), sorted(view_kwargs.items()), params], default=str
+        )
+        digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+        return f"books:response:{endpoint}:{self.backend.get_generation()}:{digest}"
+
+    def lookup(self, endpoint, request, view_kwargs):
+        """Devuelve `(clave, entrada)`; la entrada es `MISSING` si no está en caché."""
+        key = self.make_key(endpoint, request, view_kwargs)
+        entry = self.backend.get(key)
+        with self._lock:
+            counter = self.counters.setdefault(endpoint, {"hits": 0, "misses": 0})
+            counter["misses" if entry is MISSING else "hits"] += 1
+        return key, entry
+
+    def store(self, endpoint, key, response):
+        # Solo respuestas completas con cuerpo en memoria (no errores, 304 ni streaming)
+        if response.status_code != 200 or getattr(response, 'data', None) is None:
+            return
+        headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+        self.backend.set(key, CachedResponse(response.data, headers), self.ttls.get(endpoint, self.default_ttl))
+
+    def respond(self, entry, request, build):
+        etag = entry.headers.get('ETag')
+        if etag:
+            response = not_modified(request, etag, parse_http_date_safe(entry.headers.get('Last-Modified', '')))
+            if response is not None:
+                return response
+        return build(entry.data, headers=entry.headers)
+
+    def stats(self):
+        with self._lock:
+            endpoints = {
+                endpoint: dict(counter, hit_ratio=counter["hits"] / (counter["hits"] + counter["misses"]))
+                for endpoint, counter in self.counters.items()
+            }
+        return {"endpoints": endpoints, "backend": self.backend.stats()}
+
+
+def get_config():
+    return getattr(settings, 'RESPONSE_CACHE', {})
+
+
+def get_response_cache():
+    """Caché de respuestas de este proceso según `RESPONSE_CACHE`, o None si está desactivada."""
+    global _response_cache
+    if _response_cache is None:
+        config = get_config()
+        backend_name = config.get('BACKEND', 'none')
+        if backend_name == 'none':
+            return None
+        with _lock:
+            if _response_cache is None:
+                if backend_name == 'django':
+                    backend = DjangoCacheBackend(config.get('ALIAS', 'default'))
+                else:
+                    backend = LRUBackend(config.get('MAX_SIZE', 2048), config.get('GENERATION_REFRESH_INTERVAL', 5))
+                _response_cache = ResponseCache(backend, config.get('TTL'), config.get('DEFAULT_TTL', 30))
+    return _response_cache
+
+
+@receiver(setting_changed)
+def reset_response_cache(setting, **kwargs):
+    global _response_cache
+    if setting == 'RESPONSE_CACHE':
+        _response_cache = None
+
+
+@receiver(books_changed)
+def bump_response_generation(sender, removed=(), added=(), **kwargs):
+    cache = get_response_cache()
+    if cache is not None and (removed or added):
+        cache.backend.bump_generation()
+
+
+def cache_response(endpoint):
+    """
+    Decorador para el `get` de una vista: responde desde la caché si hay una entrada para
+    la generación actual y, si no, guarda la respuesta de la vista. Agrega `X-Cache: HIT|MISS`.
+
+    Sirve para vistas de DRF y para las de `books.async_views` (que responden con `render`).
+    """
+    def decorator(method):
+        if iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(view, request, *args, **kwargs):
+                cache = get_response_cache()
+                if cache is None:
+                    return await method(view, request, *args, **kwargs)
+
+                # Las consultas a un backend externo (o a MongoDB para refrescar la generación) no bloquean el loop
+                io_bound = cache.backend.needs_io()
+                if io_bound:
+                    key, entry = await sync_to_async(cache.lookup, thread_sensitive=False)(endpoint, request, kwargs)
+                else:
+                    key, entry = cache.lookup(endpoint, request, kwargs)
+                if entry is not MISSING:
+                    response = cache.respond(entry, request, view.render)
+                    response['X-Cache'] = 'HIT'
+                    return response
+
+                response = await method(view, request, *args, **kwargs)
+                if io_bound:
+                    await sync_to_async(cache.store, thread_sensitive=False)(endpoint, key, response)
+                else:
+                    cache.store(endpoint, key, response)
+                response['X-Cache'] = 'MISS'
+                return response
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            cache = get_response_cache()
+            if cache is None:
+                return method(view, request, *args, **kwargs)
+
+            key, entry = cache.lookup(endpoint, request, kwargs)
+            if entry is not MISSING:
+                response = cache.respond(entry, request, Response)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            response = method(view, request, *args, **kwargs)
+            cache.store(endpoint, key, response)
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
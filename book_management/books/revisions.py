@@ -0,0 +1,46 @@
+"""
+Número de revisión de la colección de libros.
+
+Cada escritura notificada con `books_changed` incrementa un contador en la colección
+`Counters`. Leerlo cuesta una búsqueda por `_id`, así que un listado puede validar
+su ETag sin ejecutar la consulta de la página. Las escrituras hechas fuera de la
+aplicación (p. ej. desde la consola de MongoDB) deben llamar a `bump_revision`.
+"""
+from django.conf import settings
+from django.dispatch import receiver
+
+from .mongo import get_async_db
+from .signals import books_changed
+
+COUNTERS_COLLECTION = 'Counters'
+BOOK_REVISION = 'Book'
+
+
+def _unpack(counter):
+    if not counter:
+        return 0, None
+    return counter["revision"], counter.get("updated_at")
+
+
+def get_revision(name=BOOK_REVISION):
+    """Devuelve `(revisión, updated_at)`; `(0, None)` si todavía no hubo escrituras."""
+    return _unpack(settings.MONGO_DB[COUNTERS_COLLECTION].find_one({"_id": name}))
+
+
+async def aget_revision(name=BOOK_REVISION):
+    """Versión asíncrona de `get_revision`."""
+    return _unpack(await get_async_db()[COUNTERS_COLLECTION].find_one({"_id": name}))
+
+
+def bump_revision(name=BOOK_REVISION):
+    settings.MONGO_DB[COUNTERS_COLLECTION].update_one(
+        {"_id": name},
+        {"$inc": {"revision": 1}, "$currentDate": {"updated_at": True}},
+        upsert=True,
+    )
+
+
+@receiver(books_changed)
+def bump_book_revision(sender, removed=(), added=(), **kwargs):
+    if removed or added:
+        bump_revision()
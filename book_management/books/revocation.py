@@ -0,0 +1,159 @@
+"""
+Revocación de tokens JWT sin consultar MongoDB en cada petición.
+
+Las revocaciones se guardan en la colección `RevokedToken`:
+- `{"_id": <jti>, "kind": "token"}`: un token concreto (logout).
+- `{"_id": "user:<user_id>", "kind": "user", "revoked_before": <epoch>}`: todos los tokens
+  del usuario emitidos hasta ese segundo (`iat`), p. ej. al forzar el cierre de sus sesiones.
+  Los access tokens obtenidos con un refresh token conservan su `iat`, así que también caen.
+
+Cada documento tiene `expires_at` (cuando el token, o el último token afectado, expira de
+todos modos) con un índice TTL, así que la colección solo contiene revocaciones vigentes.
+
+Cada proceso mantiene una copia en memoria (`RevocationSnapshot`) refrescada de forma
+incremental cada `TOKEN_REVOCATION['REFRESH_INTERVAL']` segundos: comprobar un token es
+buscar su `jti` y su `user_id` en dos diccionarios. Una revocación se aplica de inmediato
+en el proceso que la registra y en los demás tras el siguiente refresco.
+"""
+import calendar
+import time
+from datetime import datetime, timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework_simplejwt.settings import api_settings
+
+from .snapshot import PollingSnapshot
+
+_revocations = None
+
+
+def get_config():
+    return getattr(settings, 'TOKEN_REVOCATION', {})
+
+
+def to_epoch(value):
+    return calendar.timegm(value.utctimetuple())
+
+
+class RevocationSnapshot(PollingSnapshot):
+    """`jti` revocados y corte por usuario, con la expiración de cada entrada."""
+    collection_name = 'RevokedToken'
+    projection = {"kind": 1, "user_id": 1, "revoked_before": 1, "expires_at": 1, "updated_at": 1}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tokens = {}  # jti -> expiración (epoch)
+        self.users = {}  # user_id -> (revoked_before, expiración)
+
+    def apply(self, document):
+        expires_at = to_epoch(document["expires_at"])
+        if document.get("kind") == "user":
+            self.add_user(document["user_id"], document["revoked_before"], expires_at)
+        else:
+            self.add_token(document["_id"], expires_at)
+
+    def add_token(self, jti, expires_at):
+        self.tokens[jti] = expires_at
+
+    def add_user(self, user_id, revoked_before, expires_at):
+        current = self.users.get(user_id)
+        if current is None or current[0] < revoked_before:
+            self.users[user_id] = (revoked_before, expires_at)
+
+    def refresh(self):
+        super().refresh()
+        self.purge()
+
+    def purge(self, now=None):
+        """Descarta las entradas cuyos tokens ya expiraron (el TTL las borra también en MongoDB)."""
+        now = time.time() if now is None else now
+        self.tokens = {jti: expires_at for jti, expires_at in self.tokens.items() if expires_at > now}
+        self.users = {user_id: entry for user_id, entry in self.users.items() if entry[1] > now}
+
+    def is_revoked(self, token):
+        if token.get(api_settings.JTI_CLAIM) in self.tokens:
+            return True
+        entry = self.users.get(str(token.get(api_settings.USER_ID_CLAIM)))
+        # `iat` tiene resolución de segundos: se rechaza también el segundo de la revocación
+        return entry is not None and token.get('iat', 0) <= entry[0]
+
+
+def get_revocations(refresh=True):
+    """Revocaciones de este proceso, o None si `TOKEN_REVOCATION['ENABLED']` está desactivado."""
+    global _revocations
+    if not get_config().get('ENABLED', True):
+        return None
+    if _revocations is None:
+        _revocations = RevocationSnapshot(interval=get_config().get('REFRESH_INTERVAL', 5))
+    if refresh:
+        _revocations.refresh_if_due()
+    return _revocations
+
+
+async def aget_revocations():
+    """Como `get_revocations`, pero el refresco (una consulta bloqueante) se hace fuera del event loop."""
+    revocations = get_revocations(refresh=False)
+    if revocations is not None and revocations.is_due():
+        await sync_to_async(revocations.refresh_if_due, thread_sensitive=False)()
+    return revocations
+
+
+def is_token_revoked(token):
+    revocations = get_revocations()
+    return revocations is not None and revocations.is_revoked(token)
+
+
+async def ais_token_revoked(token):
+    revocations = await aget_revocations()
+    return revocations is not None and revocations.is_revoked(token)
+
+
+def revoke_token(token):
+    """Revoca un token validado (access o refresh) hasta su expiración."""
+    jti = token[api_settings.JTI_CLAIM]
+    expires_at = datetime.fromtimestamp(token['exp'], tz=timezone.utc)
+    settings.MONGO_DB['RevokedToken'].update_one(
+        {"_id": jti},
+        {
+            "$set": {"kind": "token", "user_id": str(token.get(api_settings.USER_ID_CLAIM)), "expires_at": expires_at},
+            "$currentDate": {"updated_at": True},
+        },
+        upsert=True,
+    )
+    revocations = get_revocations(refresh=False)
+    if revocations is not None:
+        revocations.add_token(jti, token['exp'])
+
+
+def revoke_user_tokens(user_id):
+    """Revoca todos los tokens del usuario emitidos hasta ahora. Devuelve el corte (epoch)."""
+    user_id = str(user_id)
+    revoked_before = int(time.time())
+    # Después de la vida de un refresh token no queda ningún token anterior al corte
+    expires_at = revoked_before + int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+    settings.MONGO_DB['RevokedToken'].update_one(
+        {"_id": f"user:{user_id}"},
+        {
+            "$set": {"kind": "user", "user_id": user_id},
+            "$max": {
+                "revoked_before": revoked_before,
+                "expires_at": datetime.fromtimestamp(expires_at, tz=timezone.utc),
+            },
+            "$currentDate": {"updated_at": True},
+        },
+        upsert=True,
+    )
+    revocations = get_revocations(refresh=False)
+    if revocations is not None:
+        revocations.add_user(user_id, revoked_before, expires_at)
+    return revoked_before
+
+
+@receiver(setting_changed)
+def reset_revocations(setting, **kwargs):
+    global _revocations
+    if setting == 'TOKEN_REVOCATION':
+        _revocations = None
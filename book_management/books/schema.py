@@ -0,0 +1,72 @@
+"""
+Anotaciones de la documentación OpenAPI sin importar drf_yasg al cargar las vistas.
+
+`books.views` usa `swagger_auto_schema` y `openapi` de este módulo con la misma sintaxis
+que los de drf_yasg, pero solo se guardan los argumentos: `openapi.Parameter(...)` y
+`openapi.IN_QUERY` son referencias diferidas. `apply_schemas()` importa drf_yasg y aplica
+los decoradores reales; `books.openapi` la llama antes de generar el esquema. Así el
+perfil "api" (ver `book_management/settings.py`) no importa drf_yasg en cada worker.
+"""
+import threading
+
+_pending = []
+_lock = threading.Lock()
+
+
+class Deferred:
+    """Atributo de `drf_yasg.openapi`, o una llamada a él, que se resuelve en `apply_schemas()`."""
+    __slots__ = ('name', 'args', 'kwargs')
+
+    def __init__(self, name, args=None, kwargs=None):
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+
+    def __call__(self, *args, **kwargs):
+        return Deferred(self.name, args, kwargs)
+
+    def resolve(self, module):
+        value = getattr(module, self.name)
+        if self.args is None:
+            return value
+        return value(*resolve(self.args, module), **resolve(self.kwargs, module))
+
+
+class DeferredModule:
+    def __getattr__(self, name):
+        return Deferred(name)
+
+
+openapi = DeferredModule()
+
+
+def resolve(value, module):
+    if isinstance(value, Deferred):
+        return value.resolve(module)
+    if isinstance(value, dict):
+        return {key: resolve(item, module) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(resolve(item, module) for item in value)
+    return value
+
+
+def swagger_auto_schema(**kwargs):
+    """Como `drf_yasg.utils.swagger_auto_schema`; se aplica en `apply_schemas()`."""
+    def decorator(view_method):
+        with _lock:
+            _pending.append((view_method, kwargs))
+        return view_method
+    return decorator
+
+
+def apply_schemas():
+    """Aplica los decoradores de drf_yasg pendientes (una vez por método)."""
+    from drf_yasg import openapi as yasg_openapi
+    from drf_yasg.utils import swagger_auto_schema as yasg_swagger_auto_schema
+
+    from . import views  # noqa: F401 (registra sus anotaciones si todavía no se cargaron las URLs)
+
+    with _lock:
+        while _pending:
+            view_method, kwargs = _pending.pop()
+            yasg_swagger_auto_schema(**resolve(kwargs, yasg_openapi))(view_method)
@@ -0,0 +1,256 @@
+"""
+Búsqueda de texto completo sobre título, autor y género (`GET /api/books/search/?q=`).
+
+Backends (`BOOK_SEARCH['BACKEND']`):
+- "mongo": índice de texto `book_text` de `books.indexes`, ordenado por `textScore`.
+  Acepta la sintaxis de `$text` (frases entre comillas, términos negados con `-`).
+- "memory": índice invertido en memoria de cada proceso, con los mismos pesos por
+  campo (`TEXT_WEIGHTS`) y un idf por término. La primera búsqueda lo empieza a construir
+  en un hilo aparte (recorre toda la colección); hasta que termina, las búsquedas usan el
+  índice de texto de MongoDB. Se actualiza con `books_changed` y se resincroniza cada
+  RESYNC_INTERVAL segundos con los libros cuyo `updated_at` cambió (escrituras de otros
+  procesos). Las bajas hechas por otros procesos se ven en la reconstrucción completa, cada
+  REBUILD_INTERVAL segundos, también en segundo plano: mientras tanto se sigue usando el
+  índice anterior. Solo guarda `_id` y términos; los documentos de la página se leen con
+  una consulta `$in`.
+"""
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.exceptions import ValidationError
+
+from .indexes import TEXT_WEIGHTS
+from .signals import books_changed
+from .snapshot import PollingSnapshot
+
+logger = logging.getLogger(__name__)
+
+MAX_QUERY_LENGTH = 200
+
+_TOKEN = re.compile(r'\w+')
+
+_backend = None
+_lock = threading.Lock()
+
+
+def tokenize(text):
+    """Términos de un texto: en minúsculas, sin tildes y separados por cualquier signo."""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', str(text).lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _TOKEN.findall(text)
+
+
+def get_search_query(request):
+    """Lee `?q=`. Lanza `ValidationError` si falta o es demasiado largo."""
+    value = request.query_params.get('q', '').strip()
+    if not value:
+        raise ValidationError({"q": ["Este parámetro es obligatorio."]})
+    if len(value) > MAX_QUERY_LENGTH:
+        raise ValidationError({"q": [f"Máximo {MAX_QUERY_LENGTH} caracteres."]})
+    return value
+
+
+class InvertedIndex:
+    """Término -> {`_id`: frecuencia ponderada por campo}, con los términos de cada libro para poder quitarlo."""
+
+    def __init__(self, weights=TEXT_WEIGHTS):
+        self.weights = weights
+        self.postings = {}
+        self.terms = {}
+
+    def __len__(self):
+        return len(self.terms)
+
+    def add(self, document):
+        object_id = document['_id']
+        self.remove(object_id)
+        frequencies = Counter()
+        for field, weight in self.weights.items():
+            for term in tokenize(document.get(field)):
+                frequencies[term] += weight
+        for term, frequency in frequencies.items():
+            self.postings.setdefault(term, {})[object_id] = frequency
+        self.terms[object_id] = tuple(frequencies)
+
+    def remove(self, object_id):
+        for term in self.terms.pop(object_id, ()):
+            postings = self.postings[term]
+            postings.pop(object_id, None)
+            if not postings:
+                del self.postings[term]
+
+    def search(self, terms, limit=None):
+        """
+        Devuelve `(total, [(_id, puntuación), ...])` con los libros que contienen alguno de los
+        términos, de mayor a menor puntuación (`_id` como desempate). `limit` acota la lista.
+        """
+        scores = {}
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + len(self.terms) / len(postings))
+            for object_id, frequency in postings.items():
+                scores[object_id] = scores.get(object_id, 0.0) + frequency * idf
+        ranked = ((-score, object_id) for object_id, score in scores.items())
+        top = heapq.nsmallest(limit, ranked) if limit is not None else sorted(ranked)
+        return len(scores), [(object_id, -score) for score, object_id in top]
+
+
+class SearchIndexSnapshot(PollingSnapshot):
+    """Mantiene un `InvertedIndex` con los libros de MongoDB (ver el docstring del módulo)."""
+    collection_name = 'Book'
+    projection = {field: 1 for field in (*TEXT_WEIGHTS, 'updated_at')}
+
+    def __init__(self, interval=5, rebuild_interval=3600, timer=time.monotonic):
+        super().__init__(interval=interval, timer=timer)
+        self.rebuild_interval = rebuild_interval
+        self.last_rebuild = None
+        self.index = InvertedIndex()
+        self.index_lock = threading.Lock()
+        self.rebuilding = False
+
+    def apply(self, document):
+        with self.index_lock:
+            self.index.add(document)
+
+    @property
+    def ready(self):
+        return self.last_rebuild is not None
+
+    def refresh(self):
+        if self.last_rebuild is None or self.timer() - self.last_rebuild >= self.rebuild_interval:
+            self.start_rebuild()
+        if self.ready:
+            super().refresh()
+        else:
+            self.last_refresh = self.timer()
+
+    def start_rebuild(self):
+        """Lanza `rebuild` en un hilo aparte si no hay otra en curso; las búsquedas no la esperan."""
+        with self.index_lock:
+            if self.rebuilding:
+                return
+            self.rebuilding = True
+        threading.Thread(target=self._rebuild_in_background, name='search-index-rebuild', daemon=True).start()
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        except Exception as exc:
+            # Se reintenta en el siguiente refresco
+            logger.error(f"No se pudo reconstruir el índice de búsqueda: {exc}")
+        finally:
+            with self.index_lock:
+                self.rebuilding = False
+
+    def rebuild(self):
+        """Construye un índice nuevo con toda la colección y lo reemplaza de una vez."""
+        index = InvertedIndex()
+        since = datetime.min
+        for document in self.collection.find({}, self.projection):
+            index.add(document)
+            # Los libros anteriores a `updated_at` no lo tienen; entran en cada reconstrucción
+            since = max(since, document.get('updated_at') or since)
+        with self._lock:
+            with self.index_lock:
+                self.index = index
+            self.since = since
+            self.last_rebuild = self.last_refresh = self.timer()
+
+    def update(self, removed, added):
+        with self.index_lock:
+            for document in removed:
+                self.index.remove(document['_id'])
+            for document in added:
+                self.index.add(document)
+
+    def search(self, terms, limit=None):
+        with self.index_lock:
+            return self.index.search(terms, limit)
+
+
+class MongoTextSearch:
+    def search(self, collection, request, q, paginator, projection=None):
+        query = {"$text": {"$search": q}}
+        score = {"$meta": "textScore"}
+        projection = dict(projection or {}, score=score)
+        return paginator.paginate_collection(
+            collection, request, query=query, sort=[('score', score), ('_id', 1)], projection=projection
+        )
+
+
+class MemorySearch:
+    def __init__(self, resync_interval=5, rebuild_interval=3600):
+        self.snapshot = SearchIndexSnapshot(interval=resync_interval, rebuild_interval=rebuild_interval)
+        self.fallback = MongoTextSearch()
+
+    def search(self, collection, request, q, paginator, projection=None):
+        self.snapshot.refresh_if_due()
+        if not self.snapshot.ready:
+            # El índice se está construyendo en segundo plano
+            return self.fallback.search(collection, request, q, paginator, projection)
+        # Basta con ordenar los primeros `página * tamaño` resultados
+        end = paginator.get_page_number(request) * paginator.get_page_size(request)
+        total, ranked = self.snapshot.search(tokenize(q), limit=end)
+        skip, _ = paginator.get_window(request, total)
+        ranked = ranked[skip:]
+
+        documents = {
+            document['_id']: document
+            for document in collection.find({"_id": {"$in": [object_id for object_id, _ in ranked]}}, projection)
+        }
+        # Un libro borrado por otro proceso puede seguir en el índice hasta la próxima reconstrucción
+        page = []
+        for object_id, score in ranked:
+            if object_id in documents:
+                page.append(dict(documents[object_id], score=score))
+        return page
+
+    def update(self, removed, added):
+        if self.snapshot.last_rebuild is not None:
+            self.snapshot.update(removed, added)
+
+
+def get_config():
+    return getattr(settings, 'BOOK_SEARCH', {})
+
+
+def get_search_backend():
+    """Backend de búsqueda de este proceso según `BOOK_SEARCH`."""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                config = get_config()
+                if config.get('BACKEND', 'mongo') == 'memory':
+                    _backend = MemorySearch(config.get('RESYNC_INTERVAL', 5), config.get('REBUILD_INTERVAL', 3600))
+                else:
+                    _backend = MongoTextSearch()
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_search_backend(setting, **kwargs):
+    global _backend
+    if setting == 'BOOK_SEARCH':
+        _backend = None
+
+
+@receiver(books_changed)
+def update_search_index(sender, removed=(), added=(), **kwargs):
+    # Solo el índice en memoria, y solo si ya se construyó; con "mongo" MongoDB mantiene el índice de texto
+    if isinstance(_backend, MemorySearch):
+        _backend.update(removed, added)
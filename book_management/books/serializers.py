@@ -1,6 +1,6 @@
 from rest_framework import serializers
-from werkzeug.security import generate_password_hash
-from django.conf import settings
+from .passwords import hash_password
+from .storage import is_typed_storage, parse_published_date
 
 class BookSerializer(serializers.Serializer):
     title = serializers.CharField(max_length=255)
@@ -9,22 +9,31 @@ class BookSerializer(serializers.Serializer):
     genre = serializers.CharField(max_length=100)
     price = serializers.FloatField()
 
+    def validate_published_date(self, value):
+        """Con almacenamiento tipado la fecha debe poder convertirse en una fecha BSON."""
+        if is_typed_storage():
+            try:
+                parse_published_date(value)
+            except ValueError:
+                raise serializers.ValidationError("Formato de fecha no válido. Use YYYY-MM-DD.")
+        return value
+
 class UserLoginSerializer(serializers.Serializer):
     email = serializers.EmailField(required=True)
     password = serializers.CharField(write_only=True, required=True)
 
+# Errores de validación cuando el correo ya existe
+DUPLICATE_EMAIL_ERRORS = {"email": ["El correo ya está registrado."]}
+
 class UserSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True)
 
-    def validate_email(self, value):
-        """Verifica si el correo ya existe en la base de datos."""
-        user_collection = settings.MONGO_DB['User']
-        if user_collection.find_one({"email": value}):
-            raise serializers.ValidationError("El correo ya está registrado.")
-        return value
+    # La unicidad del correo la garantiza el índice único `email_1` (ver `books.indexes`):
+    # el alta es una sola inserción y el error de clave duplicada se traduce en
+    # `DUPLICATE_EMAIL_ERRORS`.
 
     def create(self, validated_data):
         """Hashea la contraseña y devuelve los datos del usuario."""
-        validated_data['password'] = generate_password_hash(validated_data['password'])
+        validated_data['password'] = hash_password(validated_data['password'])
         return validated_data
\ No newline at end of file
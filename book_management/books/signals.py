@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Se envía después de escribir libros en MongoDB.
+# Argumentos: `removed` (documentos tal como estaban antes) y `added` (documentos tal como quedaron).
+# Una actualización envía el documento anterior en `removed` y el nuevo en `added`.
+books_changed = Signal()
@@ -0,0 +1,356 @@
+"""
+Registro de consultas lentas de MongoDB con su plan de ejecución.
+
+`SlowQueryListener` es un `CommandListener` de pymongo registrado en los clientes de
+`books.mongo`. Cuando un comando supera `SLOW_QUERIES['THRESHOLD_MS']` y en la pila de
+llamadas hay código de `SLOW_QUERIES['MODULES']` (por defecto las vistas, la
+autenticación y `books/utils.py`), se registra en el logger `books.slow_queries` con:
+- la forma del filtro, con los valores reemplazados por "?",
+- el endpoint y la función de la vista que lo originó,
+- un resumen de `explain("executionStats")` (COLLSCAN o IXSCAN, índices, claves y
+  documentos examinados), para una muestra de EXPLAIN_SAMPLE_RATE de los registros.
+
+Cada forma se registra a lo sumo una vez cada LOG_INTERVAL segundos (las repeticiones se
+cuentan y se informan en el registro siguiente) y en total no más de MAX_PER_MINUTE
+registros por minuto. El `explain` se ejecuta en un hilo aparte: pymongo no permite
+enviar comandos desde los listeners y la petición no debe esperar por él.
+"""
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from pymongo.errors import PyMongoError
+from pymongo.monitoring import CommandListener
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODULES = ('books/views.py', 'books/async_views.py', 'books/authentication.py', 'books/utils.py')
+
+# Comandos que aceptan `explain`, con el campo que contiene el filtro
+FILTER_FIELDS = {
+    'find': 'filter',
+    'count': 'query',
+    'distinct': 'query',
+    'findAndModify': 'query',
+}
+EXPLAINABLE = {'find', 'aggregate', 'count', 'distinct', 'findAndModify', 'update', 'delete'}
+
+# Campos que agrega el driver y que `explain` no acepta o no necesita
+DRIVER_FIELDS = {
+    'lsid', '$db', '$clusterTime', '$readPreference', 'txnNumber', 'autocommit',
+    'startTransaction', 'writeConcern', 'readConcern', 'maxTimeMS',
+}
+
+# Etapas del plan que recorren un índice
+INDEX_STAGES = {'IXSCAN', 'EXPRESS_IXSCAN', 'IDHACK', 'EXPRESS_IDHACK', 'COUNT_SCAN', 'DISTINCT_SCAN', 'TEXT_MATCH'}
+
+MAX_SHAPES = 1000
+MAX_PENDING_EXPLAINS = 4
+
+_listener = None
+_executor = None
+_pending = threading.BoundedSemaphore(MAX_PENDING_EXPLAINS)
+
+
+def get_config():
+    return getattr(settings, 'SLOW_QUERIES', {})
+
+
+def redact(value):
+    """Forma de un filtro: conserva campos y operadores y reemplaza los valores por "?"."""
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, dict) for item in value):
+            return [redact(item) for item in value]
+        # `$in`, `$all`, etc.: la cantidad de valores no cambia la forma
+        return ['?']
+    return '?'
+
+
+def redact_pipeline(pipeline):
+    """Forma de un pipeline: se ocultan los valores de `$match` (también dentro de `$facet`)."""
+    stages = []
+    for stage in pipeline:
+        name, body = next(iter(stage.items()))
+        if name == '$match':
+            body = redact(body)
+        elif name == '$facet':
+            body = {facet: redact_pipeline(sub_pipeline) for facet, sub_pipeline in body.items()}
+        elif name in ('$limit', '$skip', '$sample'):
+            body = '?'
+        stages.append({name: body})
+    return stages
+
+
+def command_collection(command_name, command):
+    """
+    Colección sobre la que opera el comando, o None. En `getMore` el valor del comando es el
+    id del cursor y la colección va en `collection`; en comandos como `ping` es un número.
+    """
+    if command_name == 'getMore':
+        return command.get('collection')
+    target = command.get(command_name)
+    return target if isinstance(target, str) else None
+
+
+def command_shape(command_name, command):
+    """Forma redactada del comando, usada para agrupar y registrar."""
+    shape = {command_name: command_collection(command_name, command)}
+    if command_name in FILTER_FIELDS:
+        shape['filter'] = redact(command.get(FILTER_FIELDS[command_name]) or {})
+        for field in ('sort', 'projection', 'hint', 'key'):
+            if field in command:
+                shape[field] = command[field]
+    elif command_name == 'aggregate':
+        shape['pipeline'] = redact_pipeline(command.get('pipeline', []))
+    elif command_name in ('update', 'delete'):
+        statements = command.get('updates' if command_name == 'update' else 'deletes', [])
+        shape['filter'] = [redact(statement.get('q', {})) for statement in statements[:1]]
+    return shape
+
+
+def explain_command(command_name, command):
+    """Comando `explain` equivalente, o None si el comando no se puede explicar sin efectos."""
+    if command_name not in EXPLAINABLE:
+        return None
+    if command_name == 'aggregate' and any(
+        '$out' in stage or '$merge' in stage for stage in command.get('pipeline', [])
+    ):
+        return None
+    explained = {key: value for key, value in command.items() if key not in DRIVER_FIELDS}
+    return {'explain': explained, 'verbosity': 'executionStats'}
+
+
+def _plan_stages(plan, stages, indexes):
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        if 'indexName' in plan:
+            indexes.append(plan['indexName'])
+        for key, value in plan.items():
+            if key != 'slotBasedPlan':
+                _plan_stages(value, stages, indexes)
+    elif isinstance(plan, list):
+        for item in plan:
+            _plan_stages(item, stages, indexes)
+
+
+def _find(document, key, found):
+    # Los `explain` de `aggregate` anidan el plan en las etapas (`$cursor`) o en cada shard
+    if isinstance(document, dict):
+        if key in document:
+            found.append(document[key])
+        for value in document.values():
+            _find(value, key, found)
+    elif isinstance(document, list):
+        for item in document:
+            _find(item, key, found)
+    return found
+
+
+def summarize_explain(explain):
+    """Resumen de la salida de `explain("executionStats")`."""
+    stages, indexes = [], []
+    for plan in _find(explain, 'winningPlan', []):
+        _plan_stages(plan, stages, indexes)
+
+    if 'COLLSCAN' in stages:
+        scan = 'COLLSCAN'
+    elif INDEX_STAGES.intersection(stages):
+        scan = 'IXSCAN'
+    else:
+        scan = stages[-1] if stages else None
+
+    summary = {"scan": scan, "stages": stages, "indexes": sorted(set(indexes))}
+    execution_stats = [stats for stats in _find(explain, 'executionStats', []) if 'totalDocsExamined' in stats]
+    if execution_stats:
+        summary.update({
+            "keys_examined": sum(stats.get('totalKeysExamined', 0) for stats in execution_stats),
+            "docs_examined": sum(stats.get('totalDocsExamined', 0) for stats in execution_stats),
+            "returned": sum(stats.get('nReturned', 0) for stats in execution_stats),
+            "execution_ms": max(stats.get('executionTimeMillis', 0) for stats in execution_stats),
+        })
+    return summary
+
+
+def find_origin(modules):
+    """Primer marco de la pila (desde el más interno) que pertenece a `modules`."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename.replace(os.sep, '/')
+        for module in modules:
+            if filename.endswith(module):
+                return f"{module}:{frame.f_lineno} {frame.f_code.co_qualname}"
+        frame = frame.f_back
+    return None
+
+
+class SlowQueryLog:
+    """Agrupa los registros por forma y limita cuántos se emiten."""
+
+    def __init__(self, log_interval=300, max_per_minute=30):
+        self.log_interval = log_interval
+        self.max_per_minute = max_per_minute
+        self.shapes = OrderedDict()
+        self.window_started = 0.0
+        self.window_count = 0
+        self._lock = threading.Lock()
+
+    def admit(self, key, duration_ms, now=None):
+        """
+        Devuelve None si este comando no se registra, o `(repeticiones, máximo_ms)` con las
+        ocurrencias omitidas de la misma forma desde el registro anterior (incluida esta).
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self.shapes.get(key)
+            if state is None:
+                state = self.shapes[key] = {"last_logged": None, "count": 0, "max_ms": 0.0}
+                if len(self.shapes) > MAX_SHAPES:
+                    self.shapes.popitem(last=False)
+            state["count"] += 1
+            state["max_ms"] = max(state["max_ms"], duration_ms)
+
+            if state["last_logged"] is not None and now - state["last_logged"] < self.log_interval:
+                return None
+            if now - self.window_started >= 60:
+                self.window_started = now
+                self.window_count = 0
+            if self.window_count >= self.max_per_minute:
+                return None
+
+            self.window_count += 1
+            self.shapes.move_to_end(key)
+            state["last_logged"] = now
+            occurrences, max_ms = state["count"], state["max_ms"]
+            state["count"], state["max_ms"] = 0, 0.0
+        return occurrences, max_ms
+
+
+class SlowQueryListener(CommandListener):
+    def __init__(self, threshold_ms, modules=DEFAULT_MODULES, explain_sample_rate=1.0, log=None):
+        self.threshold = threshold_ms * 1000  # Microsegundos, como `duration_micros`
+        self.modules = tuple(modules)
+        self.explain_sample_rate = explain_sample_rate
+        self.log = log or SlowQueryLog()
+        self.commands = {}
+
+    def started(self, event):
+        # `succeeded` no trae el comando: se guarda hasta que termine
+        self.commands[(event.connection_id, event.request_id)] = (event.command_name, event.command)
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event)
+
+    def _finished(self, event):
+        command_name, command = self.commands.pop((event.connection_id, event.request_id), (None, None))
+        if command is None or event.duration_micros < self.threshold:
+            return
+        origin = find_origin(self.modules)
+        if origin is None:
+            return
+
+        shape = command_shape(command_name, command)
+        collection = command_collection(command_name, command)
+        namespace = f"{event.database_name}.{collection}" if collection else event.database_name
+        key = (namespace, json.dumps(shape, sort_keys=True, default=str))
+        admitted = self.log.admit(key, event.duration_micros / 1000)
+        if admitted is None:
+            return
+
+        occurrences, max_ms = admitted
+        from .metrics import current_timing
+        timing = current_timing.get()
+        entry = {
+            "duration_ms": round(event.duration_micros / 1000, 2),
+            "namespace": namespace,
+            "command": command_name,
+            "shape": shape,
+            "endpoint": timing.endpoint if timing is not None else None,
+            "origin": origin,
+            "occurrences": occurrences,
+            "max_ms": round(max_ms, 2),
+        }
+        explain = explain_command(command_name, command)
+        if explain is not None and random.random() < self.explain_sample_rate and _pending.acquire(blocking=False):
+            try:
+                _get_executor().submit(_explain_and_log, event.database_name, explain, entry)
+            except RuntimeError:
+                _pending.release()
+                emit(entry)
+        else:
+            emit(entry)
+
+
+def emit(entry):
+    plan = entry.get("plan") or {}
+    logger.warning(
+        "Consulta lenta: %s ms %s en %s (%s), %s vez/veces desde el registro anterior, plan %s: %s",
+        entry["duration_ms"], entry["namespace"], entry["endpoint"], entry["origin"],
+        entry["occurrences"], plan.get("scan", "-"), json.dumps(entry["shape"], default=str),
+        extra={"slow_query": entry},
+    )
+
+
+def _explain_and_log(database_name, explain, entry):
+    from .mongo import get_client
+    try:
+        entry["plan"] = summarize_explain(get_client()[database_name].command(explain))
+    except PyMongoError as exc:
+        entry["plan"] = {"error": str(exc)}
+    finally:
+        _pending.release()
+    emit(entry)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-query-explain')
+    return _executor
+
+
+def get_command_listeners():
+    """Listener para los clientes de `books.mongo` (ninguno si THRESHOLD_MS no es positivo)."""
+    global _listener
+    config = get_config()
+    if config.get('THRESHOLD_MS', 0) <= 0:
+        return []
+    if _listener is None:
+        _listener = SlowQueryListener(
+            config['THRESHOLD_MS'],
+            modules=config.get('MODULES', DEFAULT_MODULES),
+            explain_sample_rate=config.get('EXPLAIN_SAMPLE_RATE', 1.0),
+            log=SlowQueryLog(config.get('LOG_INTERVAL', 300), config.get('MAX_PER_MINUTE', 30)),
+        )
+    return [_listener]
+
+
+def _forget_executor():
+    global _executor, _pending
+    _executor = None
+    _pending = threading.BoundedSemaphore(MAX_PENDING_EXPLAINS)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_executor)
+
+
+@receiver(setting_changed)
+def reset_slow_query_listener(setting, **kwargs):
+    global _listener
+    if setting == 'SLOW_QUERIES':
+        _listener = None
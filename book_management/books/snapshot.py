@@ -0,0 +1,69 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+
+
+class PollingSnapshot:
+    """
+    Copia en memoria de una colección pequeña, refrescada de forma incremental.
+
+    Cada `interval` segundos se leen solo los documentos cuyo `timestamp_field`
+    es posterior al último visto, así que el costo por refresco es proporcional a
+    los cambios y no al tamaño de la colección. Las subclases definen `apply`.
+
+    `updated_at` lo asigna el servidor (`$currentDate`) al aplicar cada escritura, así que una
+    escritura que se confirma (o llega a la réplica leída) después de otra puede tener una
+    marca anterior. Por eso cada refresco vuelve a leer desde `since - safety_lag`: los
+    documentos repetidos se aplican de nuevo, y `apply` debe ser idempotente.
+    """
+    collection_name = None
+    timestamp_field = 'updated_at'
+    projection = None
+    safety_lag = timedelta(seconds=30)
+
+    def __init__(self, interval=30, timer=time.monotonic):
+        self.interval = interval
+        self.timer = timer
+        self.since = datetime.min
+        self.last_refresh = None
+        self._lock = threading.Lock()
+
+    @property
+    def collection(self):
+        return settings.MONGO_DB[self.collection_name]
+
+    def apply(self, document):
+        raise NotImplementedError
+
+    def refresh(self):
+        """Aplica los documentos modificados desde el último refresco."""
+        # `$gte` en lugar de `$gt` para no perder escrituras con el mismo milisegundo; `apply` es idempotente
+        query = {self.timestamp_field: {"$gte": self.read_from()}}
+        cursor = self.collection.find(query, self.projection).sort(self.timestamp_field, 1)
+        for document in cursor:
+            self.apply(document)
+            self.since = max(self.since, document[self.timestamp_field])
+        self.last_refresh = self.timer()
+
+    def read_from(self):
+        """Marca desde la que se lee: `since` menos `safety_lag`, para ver las escrituras tardías."""
+        if self.since - datetime.min <= self.safety_lag:
+            return datetime.min
+        return self.since - self.safety_lag
+
+    def is_due(self):
+        return self.last_refresh is None or self.timer() - self.last_refresh >= self.interval
+
+    def refresh_if_due(self):
+        """Refresca si pasó el intervalo. Solo un hilo refresca; los demás usan la copia actual."""
+        if not self.is_due():
+            return
+        if not self._lock.acquire(blocking=self.last_refresh is None):
+            return
+        try:
+            if self.is_due():
+                self.refresh()
+        finally:
+            self._lock.release()
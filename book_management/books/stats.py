@@ -0,0 +1,176 @@
+"""
+Estadísticas de precio por año materializadas en la colección `BookYearStats`.
+
+Cada documento tiene la forma `{"_id": <año>, "count", "sum", "min", "max"}` y se
+mantiene de forma incremental a partir de la señal `books_changed`. Los mínimos y
+máximos no se pueden "restar", así que cuando se elimina el libro que los fijaba
+se recalculan solo los años afectados.
+
+`rebuild_year_stats` y `recompute_years` fuera de la señal reescriben la colección sin
+`books_changed`: `invalidate_stats_responses` invalida las respuestas cacheadas.
+"""
+from datetime import datetime
+
+from django.conf import settings
+from django.dispatch import receiver
+from pymongo import ReplaceOne, UpdateOne
+
+from .response_cache import get_response_cache
+from .revisions import bump_revision
+from .signals import books_changed
+from .storage import to_float, year_filter
+
+book_collection = settings.MONGO_DB['Book']
+stats_collection = settings.MONGO_DB['BookYearStats']
+
+# Año de publicación: el campo `year` de los documentos tipados o, en los documentos
+# legacy, los primeros cuatro caracteres de `published_date`
+YEAR_EXPRESSION = {
+    "$ifNull": ["$year", {
+        "$cond": [
+            {"$eq": [{"$type": "$published_date"}, "date"]},
+            {"$year": "$published_date"},
+            {"$convert": {
+                "input": {"$substrCP": ["$published_date", 0, 4]},
+                "to": "int",
+                "onError": None,
+                "onNull": None,
+            }},
+        ]
+    }]
+}
+
+
+def get_book_year(book):
+    """Devuelve el año de publicación de un documento de libro, o None si no se puede deducir."""
+    if isinstance(book.get('year'), int):
+        return book['year']
+    published_date = book.get('published_date')
+    if isinstance(published_date, datetime):
+        return published_date.year
+    if isinstance(published_date, str) and published_date[:4].isdigit():
+        return int(published_date[:4])
+    return None
+
+
+def get_book_price(book):
+    price = book.get('price')
+    if price is None:
+        return None
+    return float(to_float(price))
+
+
+def _group_by_year(books):
+    groups = {}
+    for book in books:
+        year, price = get_book_year(book), get_book_price(book)
+        if year is None or price is None:
+            continue
+        group = groups.setdefault(year, {"count": 0, "sum": 0.0, "min": price, "max": price})
+        group["count"] += 1
+        group["sum"] += price
+        group["min"] = min(group["min"], price)
+        group["max"] = max(group["max"], price)
+    return groups
+
+
+def _stats_pipeline(match=None):
+    pipeline = [{"$match": match}] if match else []
+    pipeline += [
+        {"$group": {
+            "_id": YEAR_EXPRESSION,
+            "count": {"$sum": 1},
+            "sum": {"$sum": "$price"},
+            "min": {"$min": "$price"},
+            "max": {"$max": "$price"},
+        }},
+        {"$match": {"_id": {"$ne": None}}},
+    ]
+    return pipeline
+
+
+def recompute_years(years):
+    """Recalcula desde la colección `Book` las estadísticas de los años indicados."""
+    years = set(years)
+    if not years:
+        return
+    results = {doc["_id"]: doc for doc in book_collection.aggregate(_stats_pipeline(year_filter(years)))}
+    operations = [ReplaceOne({"_id": year}, doc, upsert=True) for year, doc in results.items()]
+    if operations:
+        stats_collection.bulk_write(operations, ordered=False)
+    missing = [year for year in years if year not in results]
+    if missing:
+        stats_collection.delete_many({"_id": {"$in": missing}})
+
+
+def apply_book_changes(removed=(), added=()):
+    """
+    Aplica a `BookYearStats` el efecto de eliminar `removed` y añadir `added`.
+    """
+    removed_groups = _group_by_year(removed)
+    added_groups = _group_by_year(added)
+    operations = []
+    for year in set(removed_groups) | set(added_groups):
+        removed_group = removed_groups.get(year, {"count": 0, "sum": 0.0})
+        added_group = added_groups.get(year)
+        update = {"$inc": {
+            "count": (added_group["count"] if added_group else 0) - removed_group["count"],
+            "sum": (added_group["sum"] if added_group else 0.0) - removed_group["sum"],
+        }}
+        if added_group:
+            update["$min"] = {"min": added_group["min"]}
+            update["$max"] = {"max": added_group["max"]}
+        operations.append(UpdateOne({"_id": year}, update, upsert=True))
+    if not operations:
+        return
+    stats_collection.bulk_write(operations, ordered=False)
+
+    if not removed_groups:
+        return
+    # Recalcular los años en los que se eliminó el mínimo, el máximo o el último libro
+    stale = []
+    for doc in stats_collection.find({"_id": {"$in": list(removed_groups)}}):
+        group = removed_groups[doc["_id"]]
+        removed_min = group["min"] <= to_float(doc.get("min", group["min"]))
+        removed_max = group["max"] >= to_float(doc.get("max", group["max"]))
+        if doc["count"] <= 0 or removed_min or removed_max:
+            stale.append(doc["_id"])
+    recompute_years(stale)
+
+
+def invalidate_stats_responses():
+    """
+    Invalida las respuestas cacheadas después de reescribir `BookYearStats` sin `books_changed`,
+    como lo hace esa señal: incrementa la revisión de libros (parte de la generación de la
+    caché "lru" en todos los procesos) y la generación de la caché de este proceso (la
+    compartida con el backend "django").
+    """
+    bump_revision()
+    cache = get_response_cache()
+    if cache is not None:
+        cache.backend.bump_generation()
+
+
+def rebuild_year_stats():
+    """Reconstruye toda la colección `BookYearStats` en una sola agregación."""
+    book_collection.aggregate(_stats_pipeline() + [{"$out": stats_collection.name}])
+    invalidate_stats_responses()
+    return stats_collection.count_documents({})
+
+
+def get_year_stats(year):
+    """Lectura puntual por `_id` de las estadísticas de un año."""
+    stats = stats_collection.find_one({"_id": year})
+    if not stats or stats["count"] <= 0:
+        return None
+    return {
+        "average_price": to_float(stats["sum"]) / stats["count"],
+        "count": stats["count"],
+        "min_price": to_float(stats["min"]),
+        "max_price": to_float(stats["max"]),
+    }
+
+
+@receiver(books_changed)
+def update_year_stats(sender, removed=(), added=(), **kwargs):
+    apply_book_changes(removed=removed, added=added)
@@ -0,0 +1,136 @@
+"""
+Conversión entre la representación de la API de un libro y su documento en MongoDB.
+
+Con `BOOK_STORAGE_MODE = "legacy"` los libros se guardan tal como llegan del
+serializador (`published_date` como texto y `price` como double). Con "typed"
+se guarda una fecha BSON real, el año derivado en `year` y el precio como
+Decimal128, de modo que los rangos y ordenamientos se pueden indexar. La lectura
+acepta ambos formatos, así que la API no cambia mientras dura la migración.
+"""
+from datetime import datetime
+from decimal import Decimal
+
+from bson import Decimal128
+from django.conf import settings
+from django.utils import timezone
+
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def is_typed_storage():
+    return getattr(settings, 'BOOK_STORAGE_MODE', 'legacy') == 'typed'
+
+
+def may_have_legacy_documents():
+    """
+    Con "typed", si puede quedar algún documento sin migrar: hasta que se activa
+    `BOOK_STORAGE_MIGRATED` los filtros por fecha aceptan también el texto "YYYY-MM-DD".
+    """
+    return not is_typed_storage() or not getattr(settings, 'BOOK_STORAGE_MIGRATED', False)
+
+
+def parse_published_date(value):
+    """Convierte "YYYY-MM-DD" en datetime. Lanza ValueError si el formato no es válido."""
+    return datetime.strptime(value, DATE_FORMAT)
+
+
+def to_decimal128(price):
+    # Pasar por str para conservar el valor decimal que envió el cliente (19.99 y no 19.989999...)
+    return Decimal128(Decimal(str(price)))
+
+
+def to_float(value):
+    if isinstance(value, Decimal128):
+        return float(value.to_decimal())
+    return value
+
+
+def convert_fields(published_date, price):
+    """Devuelve los campos tipados (`published_date`, `year`, `price`) a partir de los valores de la API."""
+    fields = {}
+    if isinstance(published_date, str):
+        date = parse_published_date(published_date)
+        fields['published_date'] = date
+        fields['year'] = date.year
+    elif isinstance(published_date, datetime):
+        fields['year'] = published_date.year
+    if price is not None and not isinstance(price, Decimal128):
+        fields['price'] = to_decimal128(price)
+    return fields
+
+
+def to_storage(data):
+    """Documento a guardar a partir de los datos validados por `BookSerializer`."""
+    document = dict(data)
+    if is_typed_storage():
+        document.update(convert_fields(document.get('published_date'), document.get('price')))
+    return document
+
+
+def storage_update(data):
+    """Operación de actualización (`$set`/`$unset`) para reemplazar los campos de un libro."""
+    document = to_storage(data)
+    update = {"$set": document}
+    if 'published_date' in document and 'year' not in document:
+        # Un documento migrado que vuelve a guardarse en modo legacy no debe conservar un año obsoleto
+        update["$unset"] = {"year": ""}
+    return update
+
+
+def now():
+    """Fecha actual con la precisión de BSON (milisegundos), para que el documento en memoria coincida con el guardado."""
+    value = timezone.now()
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+
+def new_book(data):
+    """Documento a insertar: los campos de `to_storage` más `version` y `updated_at` (para ETag y Last-Modified)."""
+    document = to_storage(data)
+    document['version'] = 1
+    document['updated_at'] = now()
+    return document
+
+
+def book_update(data):
+    """`storage_update` que además incrementa `version` y renueva `updated_at`."""
+    update = storage_update(data)
+    update["$set"]["updated_at"] = now()
+    update["$inc"] = {"version": 1}
+    return update
+
+
+def apply_update(document, update):
+    """Documento que resulta de aplicar `update` (de `book_update`) a `document`, sin volver a leerlo."""
+    result = {key: value for key, value in document.items() if key not in update.get("$unset", {})}
+    result.update(update["$set"])
+    for field, amount in update.get("$inc", {}).items():
+        result[field] = result.get(field, 0) + amount
+    return result
+
+
+def to_representation(document):
+    """Convierte en el lugar un documento almacenado al formato de la API."""
+    published_date = document.get('published_date')
+    if isinstance(published_date, datetime):
+        document['published_date'] = published_date.strftime(DATE_FORMAT)
+    if 'price' in document:
+        document['price'] = to_float(document['price'])
+    # Campos internos: la versión y la fecha de modificación se exponen como ETag y Last-Modified
+    for field in ('year', 'version', 'updated_at'):
+        document.pop(field, None)
+    return document
+
+
+def year_filter(years):
+    """Filtro de MongoDB para los libros publicados en alguno de `years`, en cualquiera de los dos formatos."""
+    years = sorted(years)
+    legacy = [{"published_date": {"$regex": f"^{year}"}} for year in years]
+    return {"$or": [{"year": {"$in": years}}] + legacy}
+
+
+def needs_migration(document):
+    return (
+        isinstance(document.get('published_date'), str)
+        or 'year' not in document
+        or not isinstance(document.get('price'), Decimal128)
+    )
@@ -0,0 +1,78 @@
+"""
+Generador de libros sintéticos para pruebas de capacidad.
+
+Las distribuciones son sesgadas como en un catálogo real: pocos géneros y autores
+concentran la mayoría de los libros (Zipf) y los años recientes tienen más
+publicaciones que los antiguos (exponencial).
+"""
+import bisect
+import itertools
+import random
+import string
+
+GENRES = [
+    "Fiction", "Mystery", "Romance", "Science Fiction", "Fantasy", "Biography", "History",
+    "Self-Help", "Programming", "Software Engineering", "Business", "Poetry", "Horror",
+    "Children", "Travel", "Cooking", "Algorithms", "Philosophy", "Science", "Art",
+]
+FIRST_NAMES = [
+    "Ana", "Carlos", "María", "José", "Lucía", "Miguel", "Sofía", "Javier", "Elena", "Diego",
+    "Laura", "Pablo", "Carmen", "Andrés", "Isabel", "Robert", "Linda", "James", "Mary", "John",
+]
+LAST_NAMES = [
+    "García", "Martínez", "López", "Sánchez", "Pérez", "Gómez", "Martin", "Jiménez", "Ruiz",
+    "Hernández", "Díaz", "Moreno", "Smith", "Johnson", "Brown", "Taylor", "Wilson", "Cormen",
+]
+TITLE_WORDS = [
+    "Shadow", "River", "Code", "Night", "Garden", "Empire", "Silent", "Patterns", "Journey",
+    "Secret", "Light", "Data", "Ocean", "Memory", "Storm", "Design", "City", "Dream", "Fire",
+    "Algorithm", "Winter", "House", "Machine", "Forest", "Echo", "Stone", "Heart", "Map",
+]
+
+
+class ZipfChoice:
+    """Elige elementos de una lista con probabilidad proporcional a 1 / rango^s."""
+
+    def __init__(self, items, s=1.1):
+        self.items = list(items)
+        weights = [1 / (rank ** s) for rank in range(1, len(self.items) + 1)]
+        self.cumulative = list(itertools.accumulate(weights))
+
+    def __call__(self, rng):
+        index = bisect.bisect_left(self.cumulative, rng.random() * self.cumulative[-1])
+        return self.items[index]
+
+
+class SyntheticBooks:
+    """Iterador de libros sintéticos reproducible a partir de `seed`."""
+
+    def __init__(self, seed=None, authors=5000, latest_year=2024, oldest_year=1900):
+        self.rng = random.Random(seed)
+        names = [
+            f"{first} {initial}. {last}"
+            for first in FIRST_NAMES for initial in string.ascii_uppercase for last in LAST_NAMES
+        ]
+        self.rng.shuffle(names)
+        self.author = ZipfChoice(names[:authors])
+        self.genre = ZipfChoice(GENRES, s=0.9)
+        self.latest_year = latest_year
+        self.oldest_year = oldest_year
+
+    def year(self):
+        # La mitad de los libros se publicó en los últimos ~10 años
+        age = int(self.rng.expovariate(1 / 15))
+        return max(self.oldest_year, self.latest_year - age)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        rng = self.rng
+        words = rng.sample(TITLE_WORDS, rng.randint(1, 4))
+        return {
+            "title": "The " + " ".join(words),
+            "author": self.author(rng),
+            "published_date": f"{self.year():04d}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "genre": self.genre(rng),
+            "price": round(min(500.0, rng.lognormvariate(3.2, 0.5)), 2),
+        }
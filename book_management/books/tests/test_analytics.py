@@ -0,0 +1,80 @@
+import pytest
+from bson import Decimal128
+from rest_framework.exceptions import ValidationError
+
+from books.analytics import PRICE_RANGE, BookStatsSerializer, StatsCache, build_pipeline, check_histogram, format_facets
+
+def test_pipeline_filters_before_single_facet():
+    """
+    Prueba que los filtros vayan primero y que todas las facetas pedidas estén en un solo `$facet`.
+    """
+    pipeline = build_pipeline({"genre": "Fiction"}, ["summary", "top_authors"], top=3)
+
+    assert pipeline[0] == {"$match": {"genre": "Fiction"}}
+    assert list(pipeline[-1]["$facet"]) == ["summary", "top_authors"]
+    assert pipeline[-1]["$facet"]["top_authors"][-1] == {"$limit": 3}
+    assert len([stage for stage in pipeline if "$facet" in stage]) == 1
+    assert "$match" not in build_pipeline({}, ["summary"])[0]
+
+def test_stats_serializer_validates_facets():
+    """
+    Prueba que se rechacen facetas desconocidas y se apliquen los valores por defecto.
+    """
+    serializer = BookStatsSerializer(data={"facets": "by_genre, price_histogram"})
+    assert serializer.is_valid()
+    assert serializer.validated_data == {"facets": ["by_genre", "price_histogram"], "top": 10, "bucket_size": 10.0}
+
+    assert not BookStatsSerializer(data={"facets": "by_isbn"}).is_valid()
+    assert not BookStatsSerializer(data={"top": 1000}).is_valid()
+
+def test_format_facets_converts_prices_and_keys():
+    """
+    Prueba que el resultado de `$facet` se convierta al formato de la API, con Decimal128 como float.
+    """
+    result = {
+        "summary": [],
+        "by_genre": [{"_id": "Fiction", "count": 2, "average_price": Decimal128("15.5"), "min_price": 10.0, "max_price": 21.0}],
+        "top_authors": [{"_id": "Author Name", "count": 2}],
+        "price_histogram": [{"_id": Decimal128("10"), "count": 1}],
+    }
+
+    assert format_facets(result, bucket_size=10.0) == {
+        "summary": {"count": 0, "average_price": None, "min_price": None, "max_price": None},
+        "by_genre": [{"genre": "Fiction", "count": 2, "average_price": 15.5, "min_price": 10.0, "max_price": 21.0}],
+        "top_authors": [{"author": "Author Name", "count": 2}],
+        "price_histogram": [{"price_from": 10.0, "price_to": 20.0, "count": 1}],
+    }
+
+def test_stats_cache_computes_once_per_key():
+    """
+    Prueba que un resultado cacheado no vuelva a calcular la agregación.
+    """
+    cache = StatsCache(ttl=60)
+    calls = []
+    key = cache.make_key({"genre": "Fiction"}, ["summary"], 10, 10.0)
+
+    assert cache.get_or_compute(key, lambda: calls.append(1) or {"summary": {}}) == ({"summary": {}}, False)
+    assert cache.get_or_compute(key, lambda: calls.append(1) or {"summary": {}}) == ({"summary": {}}, True)
+    assert calls == [1]
+
+def test_histogram_is_capped_and_rejects_small_buckets():
+    """
+    Prueba que el histograma se limite a `max_buckets` intervalos y que uno demasiado fino se rechace con el mínimo válido.
+    """
+    pipeline = build_pipeline({}, ["price_histogram"], bucket_size=0.01, max_buckets=100)
+    facets = pipeline[-1]["$facet"]
+    assert facets["price_histogram"][-1] == {"$limit": 101}
+    assert PRICE_RANGE in facets
+    assert PRICE_RANGE not in build_pipeline({}, ["summary"])[-1]["$facet"]
+
+    price_range = [{"_id": None, "min_price": Decimal128("1"), "max_price": 100.0}]
+    check_histogram({"price_histogram": [{}] * 100, PRICE_RANGE: price_range}, max_buckets=100)
+    with pytest.raises(ValidationError) as excinfo:
+        check_histogram({"price_histogram": [{}] * 101, PRICE_RANGE: price_range}, max_buckets=100)
+    assert "1.0" in str(excinfo.value.detail["bucket_size"][0])
+
+    # Con un solo intervalo, el mínimo es el que deja todos los precios en [0, bucket_size)
+    with pytest.raises(ValidationError) as excinfo:
+        check_histogram({"price_histogram": [{}] * 2, PRICE_RANGE: price_range}, max_buckets=1)
+    assert "100.01" in str(excinfo.value.detail["bucket_size"][0])
+    assert PRICE_RANGE not in format_facets({"price_histogram": [], PRICE_RANGE: price_range})
@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+from bson import ObjectId
+from django.test import AsyncRequestFactory, override_settings
+
+from books.async_views import AsyncBookExport, AsyncBookList, AsyncTokenRefreshView
+from books.authentication import MongoDBJWTAuthentication
+from books.urls import get_urlpatterns
+from books.utils import MongoDBUser, create_tokens_for_user
+
+factory = AsyncRequestFactory()
+
+def test_async_view_requires_authentication():
+    """
+    Prueba que la vista asíncrona responda 401 con el mismo formato que DRF si no hay token.
+    """
+    response = asyncio.run(AsyncBookList.as_view()(factory.get('/api/books/')))
+
+    assert response.status_code == 401
+    assert response['WWW-Authenticate'].startswith('Bearer')
+    assert json.loads(response.content)["detail"] == "Authentication credentials were not provided."
+
+@override_settings(TOKEN_REVOCATION={'ENABLED': False})
+def test_async_token_refresh():
+    """
+    Prueba que el refresco asíncrono genere un access token y rechace tokens inválidos.
+    """
+    refresh, _ = create_tokens_for_user({"_id": ObjectId(), "email": "testuser@example.com"})
+    view = AsyncTokenRefreshView.as_view()
+
+    response = asyncio.run(view(factory.post(
+        '/api/token/refresh/', {"refresh": str(refresh)}, content_type='application/json'
+    )))
+    assert response.status_code == 200
+    assert "access" in json.loads(response.content)
+
+    response = asyncio.run(view(factory.post(
+        '/api/token/refresh/', {"refresh": "no-es-un-token"}, content_type='application/json'
+    )))
+    assert response.status_code == 401
+
+@override_settings(MONGO_JWT_AUTH={'MODE': 'stateless', 'CHECK_USER_VERSION': False}, TOKEN_REVOCATION={'ENABLED': False})
+def test_async_stateless_authentication():
+    """
+    Prueba que la autenticación asíncrona resuelva al usuario a partir de los claims del token.
+    """
+    _, access = create_tokens_for_user({"_id": ObjectId(), "email": "testuser@example.com", "version": 3})
+    request = factory.get('/api/books/', headers={"Authorization": f"Bearer {access}"})
+
+    user, token = asyncio.run(MongoDBJWTAuthentication().aauthenticate(request))
+
+    assert isinstance(user, MongoDBUser)
+    assert user.email == "testuser@example.com"
+    assert user.version == 3
+
+@override_settings(MONGO_JWT_AUTH={'MODE': 'stateless', 'CHECK_USER_VERSION': False}, TOKEN_REVOCATION={'ENABLED': False})
+def test_async_export_streams_asynchronously():
+    """
+    Prueba que con ASYNC_API la exportación use la vista asíncrona y responda con un iterador asíncrono.
+    """
+    patterns = {pattern.name: pattern for pattern in get_urlpatterns(use_async=True)}
+    assert patterns['book-export'].callback.view_class is AsyncBookExport
+
+    _, access = create_tokens_for_user({"_id": ObjectId(), "email": "testuser@example.com"})
+    request = factory.get('/api/books/export/', {'output': 'csv'}, headers={"Authorization": f"Bearer {access}"})
+
+    response = asyncio.run(AsyncBookExport.as_view()(request))
+
+    assert response.status_code == 200
+    assert response.is_async
+    assert hasattr(response.streaming_content, '__aiter__')
+    assert response['Content-Disposition'] == 'attachment; filename="books.csv"'
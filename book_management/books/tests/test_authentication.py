@@ -0,0 +1,45 @@
+import pytest
+from bson import ObjectId
+from django.test import override_settings
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from books import authentication
+from books.authentication import MongoDBJWTAuthentication, UserVersionSnapshot
+from books.utils import MongoDBUser, USER_EMAIL_CLAIM, USER_VERSION_CLAIM
+
+def _access_token(user):
+    refresh = RefreshToken.for_user(user)
+    refresh[USER_EMAIL_CLAIM] = user.email
+    refresh[USER_VERSION_CLAIM] = user.version
+    return refresh.access_token
+
+@override_settings(MONGO_JWT_AUTH={'MODE': 'stateless', 'CHECK_USER_VERSION': False}, TOKEN_REVOCATION={'ENABLED': False})
+def test_stateless_mode_builds_user_from_claims():
+    """
+    Prueba que en modo sin estado el usuario se construya a partir de los claims del token.
+    """
+    user = MongoDBUser(email="testuser@example.com", user_id=ObjectId(), version=2)
+
+    resolved = MongoDBJWTAuthentication().get_user(_access_token(user))
+
+    assert resolved.id == user.id
+    assert resolved.email == "testuser@example.com"
+    assert resolved.version == 2
+
+@override_settings(
+    MONGO_JWT_AUTH={'MODE': 'stateless', 'CHECK_USER_VERSION': True, 'VERSION_REFRESH_INTERVAL': 3600},
+    TOKEN_REVOCATION={'ENABLED': False},
+)
+def test_stateless_mode_rejects_outdated_user_version():
+    """
+    Prueba que se rechace un token emitido antes del último cambio de versión del usuario.
+    """
+    user = MongoDBUser(email="testuser@example.com", user_id=ObjectId(), version=1)
+    snapshot = UserVersionSnapshot(interval=3600)
+    snapshot.last_refresh = snapshot.timer()  # Instantánea ya cargada: no se consulta MongoDB
+    snapshot.apply({"_id": ObjectId(user.id), "version": 2})
+    authentication._user_versions = snapshot
+
+    with pytest.raises(AuthenticationFailed):
+        MongoDBJWTAuthentication().get_user(_access_token(user))
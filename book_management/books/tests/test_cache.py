@@ -0,0 +1,51 @@
+from books.cache import LRUCache
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_lru_cache_evicts_least_recently_used():
+    """
+    Prueba que al superar el tamaño máximo se desaloje la entrada menos usada.
+    """
+    cache = LRUCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" pasa a ser la más reciente
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_lru_cache_expires_entries():
+    """
+    Prueba que las entradas expiren al cumplirse el TTL y que se cuenten aciertos y fallos.
+    """
+    timer = FakeTimer()
+    cache = LRUCache(max_size=10, ttl=30, timer=timer)
+    cache.set("user", "value")
+
+    timer.now = 29
+    assert cache.get("user") == "value"
+    timer.now = 31
+    assert cache.get("user") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_ratio"] == 0.5
+
+def test_lru_cache_delete():
+    """
+    Prueba que una entrada invalidada deje de estar disponible.
+    """
+    cache = LRUCache()
+    cache.set("user", "value")
+
+    assert cache.delete("user")
+    assert not cache.delete("user")
+    assert cache.get("user") is None
@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from django.test import RequestFactory
+
+from books.conditional import book_validators, list_validators, not_modified
+
+factory = RequestFactory()
+
+BOOK = {"_id": ObjectId(), "version": 3, "updated_at": datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)}
+
+def test_book_not_modified_with_current_etag():
+    """
+    Prueba que se responda 304 con el ETag vigente y que una nueva versión lo invalide.
+    """
+    etag, last_modified = book_validators(factory.get('/'), BOOK)
+
+    response = not_modified(factory.get('/', headers={"If-None-Match": etag}), etag, last_modified)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+
+    new_etag, _ = book_validators(factory.get('/'), dict(BOOK, version=4))
+    assert new_etag != etag
+    assert not_modified(factory.get('/', headers={"If-None-Match": etag}), new_etag, last_modified) is None
+
+def test_book_not_modified_since():
+    """
+    Prueba que If-Modified-Since responda 304 si el libro no cambió desde esa fecha.
+    """
+    etag, last_modified = book_validators(factory.get('/'), BOOK)
+
+    request = factory.get('/', headers={"If-Modified-Since": "Wed, 01 May 2024 12:00:00 GMT"})
+    assert not_modified(request, etag, last_modified).status_code == 304
+    request = factory.get('/', headers={"If-Modified-Since": "Tue, 30 Apr 2024 12:00:00 GMT"})
+    assert not_modified(request, etag, last_modified) is None
+
+def test_list_etag_depends_on_revision_and_query():
+    """
+    Prueba que el ETag de un listado cambie con la revisión de la colección y con los parámetros.
+    """
+    page_1, _ = list_validators(factory.get('/api/books/', {"page": 1}), (7, None))
+
+    assert page_1.startswith('W/"')
+    assert list_validators(factory.get('/api/books/', {"page": 1}), (7, None))[0] == page_1
+    assert list_validators(factory.get('/api/books/', {"page": 1}), (8, None))[0] != page_1
+    assert list_validators(factory.get('/api/books/', {"page": 2}), (7, None))[0] != page_1
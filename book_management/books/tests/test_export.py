@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+from bson import ObjectId
+
+from books.export import aiter_ndjson, iter_csv, iter_ndjson
+
+class ListCursor:
+    """Cursor mínimo sobre una lista, con `close()` como el de pymongo."""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.documents)
+
+    def close(self):
+        self.closed = True
+
+class AsyncListCursor(ListCursor):
+    """Como `ListCursor`, con la interfaz asíncrona de `AsyncMongoClient`."""
+
+    async def __aiter__(self):
+        for document in self.documents:
+            yield document
+
+    async def close(self):
+        self.closed = True
+
+def _books(count):
+    return [
+        {"_id": ObjectId(), "title": f"Book {i}", "author": "Author, Name", "published_date": "2020-01-01",
+         "genre": "Fiction", "price": float(i)}
+        for i in range(count)
+    ]
+
+def test_iter_ndjson_chunks_lines():
+    """
+    Prueba que se emita una línea JSON por libro, agrupadas en bloques, y que se cierre el cursor.
+    """
+    cursor = ListCursor(_books(5))
+    chunks = list(iter_ndjson(cursor, chunk_size=2))
+
+    assert len(chunks) == 3
+    lines = ''.join(chunks).splitlines()
+    assert [json.loads(line)["price"] for line in lines] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert cursor.closed
+
+def test_iter_csv_writes_header_and_rows():
+    """
+    Prueba que el CSV tenga encabezado y escape correctamente los valores.
+    """
+    output = ''.join(iter_csv(ListCursor(_books(2))))
+
+    lines = output.splitlines()
+    assert lines[0] == "_id,title,author,published_date,genre,price"
+    assert lines[1].endswith(',Book 0,"Author, Name",2020-01-01,Fiction,0.0')
+    assert len(lines) == 3
+
+def test_aiter_ndjson_matches_sync_output():
+    """
+    Prueba que el generador asíncrono emita los mismos bloques que el síncrono y cierre el cursor.
+    """
+    books = _books(5)
+    cursor = AsyncListCursor([dict(book) for book in books])
+
+    async def collect():
+        return [chunk async for chunk in aiter_ndjson(cursor, chunk_size=2)]
+
+    assert asyncio.run(collect()) == list(iter_ndjson(ListCursor(books), chunk_size=2))
+    assert cursor.closed
@@ -0,0 +1,104 @@
+from datetime import datetime
+
+import pytest
+from bson import Decimal128
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from books.filters import COLLSCAN, IN_MEMORY_SORT, get_book_query, plan_query
+from books.indexes import QUERY_SHAPES, IndexSpec
+
+factory = APIRequestFactory()
+
+def _request(params):
+    return Request(factory.get('/api/books/', params))
+
+def test_book_query_translates_filters():
+    """
+    Prueba que los filtros de igualdad y de rango se traduzcan en un filtro de MongoDB.
+    """
+    book_query = get_book_query(_request({
+        "author": "Author 1", "price_min": "10", "price_max": "20",
+        "published_after": "2000-01-01", "ordering": "-price",
+    }))
+
+    assert book_query.query == {
+        "author": "Author 1",
+        "price": {"$gte": 10.0, "$lte": 20.0},
+        "published_date": {"$gte": "2000-01-01"},
+    }
+    assert book_query.sort == [("price", -1), ("_id", -1)]
+
+def test_book_query_uses_typed_bounds(settings):
+    """
+    Prueba que con almacenamiento tipado los rangos usen fechas BSON y Decimal128, y también
+    fechas en texto hasta que se complete la migración.
+    """
+    settings.BOOK_STORAGE_MODE = "typed"
+    book_query = get_book_query(_request({"price_max": "19.99", "published_before": "2008-12-31", "ordering": "price"}))
+
+    assert book_query.query["price"] == {"$lte": Decimal128("19.99")}
+    # Los documentos sin migrar guardan la fecha como texto
+    assert book_query.query["$or"] == [
+        {"published_date": {"$lte": datetime(2008, 12, 31)}},
+        {"published_date": {"$lte": "2008-12-31"}},
+    ]
+    assert book_query.plan()
+
+    settings.BOOK_STORAGE_MIGRATED = True
+    book_query = get_book_query(_request({"published_before": "2008-12-31", "ordering": "published_date"}))
+    assert book_query.query == {"published_date": {"$lte": datetime(2008, 12, 31)}}
+
+def test_book_query_validates_values():
+    """
+    Prueba que se rechacen valores no válidos y rangos invertidos.
+    """
+    with pytest.raises(ValidationError):
+        get_book_query(_request({"price_min": "barato"}))
+    with pytest.raises(ValidationError):
+        get_book_query(_request({"price_min": "20", "price_max": "10", "ordering": "price"}))
+    with pytest.raises(ValidationError):
+        get_book_query(_request({"published_after": "01/01/2000", "ordering": "published_date"}))
+
+def test_plan_query_follows_esr_rule():
+    """
+    Prueba que se elija un índice con las igualdades como prefijo seguidas del orden.
+    """
+    assert plan_query({"author": "A"}, {}, [("_id", 1)]).index == "author_1__id_1"
+    assert plan_query({"genre": "G"}, {}, [("price", -1), ("_id", -1)]).index == "genre_1_price_1__id_1"
+    assert plan_query({}, {"price": {"$gte": 10}}, [("price", 1), ("_id", 1)]).index == "price_1__id_1"
+    # Igualdad sobre el campo de orden: el orden lo da el desempate
+    assert plan_query({"title": "T"}, {}, [("title", 1), ("_id", 1)]).index == "title_1__id_1"
+    assert plan_query({}, {}, [("_id", -1)]).index == "_id_"
+
+def test_plan_query_detects_problems():
+    """
+    Prueba que se detecten el orden en memoria y el recorrido completo de la colección.
+    """
+    assert plan_query({}, {"price": {"$gte": 10}}, [("title", 1), ("_id", 1)]).problem == IN_MEMORY_SORT
+    indexes = [IndexSpec([("title", 1), ("_id", 1)])]
+    assert plan_query({"genre": "G"}, {}, [("title", 1), ("_id", 1)], indexes=indexes).problem == COLLSCAN
+
+def test_book_query_policy(settings):
+    """
+    Prueba que una consulta sin índice se rechace con los órdenes disponibles o solo se marque con "warn".
+    """
+    params = {"price_min": "10", "ordering": "title"}
+    with pytest.raises(ValidationError) as exc_info:
+        get_book_query(_request(params))
+    assert "`price`" in str(exc_info.value.detail["ordering"][0])
+
+    settings.BOOK_QUERY_POLICY = "warn"
+    assert get_book_query(_request(params)).warning == IN_MEMORY_SORT
+
+def test_query_shapes_have_indexes():
+    """
+    Prueba que las formas de consulta filtradas declaradas en el registro tengan un índice.
+    """
+    for shape in QUERY_SHAPES:
+        if shape.collection != "Book" or not shape.endpoint.startswith("GET /api/books/?"):
+            continue
+        equality = {field: value for field, value in shape.query.items() if not isinstance(value, dict)}
+        ranges = {field: value for field, value in shape.query.items() if isinstance(value, dict)}
+        assert plan_query(equality, ranges, shape.sort), shape.endpoint
@@ -0,0 +1,27 @@
+from pymongo import ASCENDING
+
+from books.indexes import IndexSpec, _plan_stages
+
+def test_index_spec_name_and_match():
+    """
+    Prueba que el nombre por defecto siga la convención de MongoDB y que se detecten diferencias.
+    """
+    spec = IndexSpec([('email', ASCENDING)], unique=True)
+
+    assert spec.name == 'email_1'
+    assert spec.matches({'key': [('email', 1)], 'unique': True, 'v': 2})
+    assert not spec.matches({'key': [('email', 1)], 'v': 2})
+    assert not spec.matches({'key': [('email', -1)], 'unique': True, 'v': 2})
+
+def test_plan_stages_detects_collscan_and_index():
+    """
+    Prueba que se recorran las etapas anidadas de un plan de `explain()`.
+    """
+    plan = {
+        'stage': 'FETCH',
+        'inputStage': {'stage': 'IXSCAN', 'indexName': 'price_1__id_1'},
+    }
+    assert _plan_stages(plan) == [('FETCH', None), ('IXSCAN', 'price_1__id_1')]
+
+    sbe_plan = {'queryPlan': {'stage': 'SORT', 'inputStage': {'stage': 'COLLSCAN'}}}
+    assert [stage for stage, _ in _plan_stages(sbe_plan)] == ['SORT', 'COLLSCAN']
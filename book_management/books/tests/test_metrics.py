@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from book_management.middleware import TimingMiddleware
+from books.metrics import (
+    CommandTimingListener, HasMetricsToken, Histogram, RequestTiming, current_timing, measure, registry,
+)
+
+factory = RequestFactory()
+
+def test_histogram_exposition_is_cumulative():
+    """
+    Prueba que los intervalos del histograma se publiquen acumulados, con suma y cantidad.
+    """
+    histogram = Histogram('latency_seconds', 'Latencia.', ('endpoint',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(('book-list',), value)
+
+    lines = histogram.expose()
+    assert 'latency_seconds_bucket{endpoint="book-list",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{endpoint="book-list",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{endpoint="book-list",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{endpoint="book-list"} 4' in lines
+
+def test_listener_and_measure_attribute_time_to_current_request():
+    """
+    Prueba que los comandos de MongoDB y las fases medidas se sumen a la petición del contexto.
+    """
+    listener = CommandTimingListener(measure_bytes=True)
+    event = SimpleNamespace(command={"find": "Book"}, reply={"ok": 1}, duration_micros=1500, command_name="find")
+
+    # Sin petición en curso no se registra nada
+    listener.started(event)
+    listener.succeeded(event)
+
+    timing = RequestTiming()
+    token = current_timing.set(timing)
+    try:
+        listener.started(event)
+        listener.succeeded(event)
+        with measure('serialize'):
+            pass
+    finally:
+        current_timing.reset(token)
+
+    assert timing.db_commands == 1
+    assert timing.phases['db'] == 0.0015
+    assert timing.db_bytes_sent > 0 and timing.db_bytes_received > 0
+    assert timing.phases['serialize'] > 0
+    assert 'db;dur=1.50;desc="1 cmd"' in timing.server_timing(0.01)
+
+def test_timing_middleware_adds_server_timing():
+    """
+    Prueba que el middleware agregue `Server-Timing` y registre la petición por endpoint.
+    """
+    request = factory.get('/api/health/')
+    request.resolver_match = SimpleNamespace(url_name='health', route='api/health/')
+    middleware = TimingMiddleware(lambda request: middleware.process_view(request, None, (), {}) or HttpResponse())
+
+    response = middleware(request)
+    assert 'total;dur=' in response['Server-Timing']
+    assert 'http_requests_total{endpoint="health",method="GET",status="200"}' in registry.expose()
+
+def test_metrics_token_permission(settings):
+    """
+    Prueba que `/metrics` exija el token, y que sin token configurado solo esté abierto con DEBUG.
+    """
+    permission = HasMetricsToken()
+    settings.METRICS = {}
+    assert not permission.has_permission(Request(factory.get('/metrics')), None)
+    settings.DEBUG = True
+    assert permission.has_permission(Request(factory.get('/metrics')), None)
+
+    settings.DEBUG = False
+    settings.METRICS = {'TOKEN': 'secreto'}
+    assert not permission.has_permission(Request(factory.get('/metrics')), None)
+    assert permission.has_permission(Request(factory.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto')), None)
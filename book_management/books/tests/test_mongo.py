@@ -0,0 +1,47 @@
+import copy
+from types import SimpleNamespace
+
+from django.test import override_settings
+
+from books import mongo
+
+def test_lazy_database_does_not_connect_until_used():
+    """
+    Prueba que obtener una colección no cree el cliente y que el cliente se cree una vez por proceso.
+    """
+    with override_settings(MONGO_URI="mongodb://localhost:1/", MONGO_CLIENT_OPTIONS={"maxPoolSize": 5, "compressors": ""}):
+        collection = mongo.LazyDatabase("BookManagement")["Book"]
+        copy.deepcopy(collection)
+        assert collection.name == "Book"
+        assert mongo._client is None
+
+        client = collection.resolve().database.client
+        assert collection.full_name == "BookManagement.Book"
+        assert mongo.get_client() is client
+        assert client.options.pool_options.max_pool_size == 5
+
+        # Después de un fork el hijo crea su propio cliente
+        mongo._forget_clients()
+        assert collection.resolve().database.client is not client
+        client.close()
+        mongo.get_client().close()
+
+def test_pool_stats_tracks_utilization():
+    """
+    Prueba que los eventos del pool se reflejen en las conexiones en uso y las esperas.
+    """
+    stats = mongo.PoolStats()
+    event = SimpleNamespace(duration=0.004, reason="timeout")
+    stats.connection_created(event)
+    stats.connection_checked_out(event)
+    stats.connection_check_out_failed(event)
+
+    snapshot = stats.snapshot(max_pool_size=4)
+    assert snapshot["open"] == 1
+    assert snapshot["in_use"] == 1
+    assert snapshot["utilization"] == 0.25
+    assert snapshot["checkout_failures"] == {"timeout": 1}
+    assert snapshot["max_wait_ms"] == 4.0
+
+    stats.connection_checked_in(event)
+    assert stats.snapshot(max_pool_size=4)["in_use"] == 0
@@ -0,0 +1,43 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import RequestFactory
+
+from books import openapi
+
+factory = RequestFactory()
+
+def test_schema_is_generated_once_and_revalidated(settings, monkeypatch):
+    """
+    Prueba que sin archivo pregenerado el esquema se genere una vez y se revalide con su ETag.
+    """
+    settings.OPENAPI_SCHEMA = {'FILE': None, 'MAX_AGE': 60}
+    calls = []
+    monkeypatch.setattr(openapi, 'render_schema', lambda: calls.append(1) or b'{"swagger": "2.0"}')
+
+    response = openapi.schema_view(factory.get('/swagger.json'))
+    assert response.status_code == 200
+    assert response['Cache-Control'] == 'public, max-age=60'
+
+    revalidated = openapi.docs_view('swagger')(factory.get('/swagger/?format=openapi', HTTP_IF_NONE_MATCH=response['ETag']))
+    assert revalidated.status_code == 304
+    assert calls == [1]
+
+def test_generated_file_is_served(settings, tmp_path):
+    """
+    Prueba que `generate_openapi_schema` escriba el esquema y que `/swagger.json` sirva ese archivo.
+    """
+    filename = tmp_path / 'openapi' / 'schema.json'
+    settings.OPENAPI_SCHEMA = {'FILE': str(filename)}
+    call_command('generate_openapi_schema', stdout=StringIO())
+
+    schema = json.loads(filename.read_bytes())
+    assert schema['basePath'] == '/api'
+    assert '/books/' in schema['paths']
+    # Las anotaciones diferidas de `books.schema` se aplicaron (parámetros y respuestas manuales)
+    assert 'published_after' in [parameter['name'] for parameter in schema['paths']['/books/']['get']['parameters']]
+    assert '503' in schema['paths']['/users/']['post']['responses']
+
+    response = openapi.schema_view(factory.get('/swagger.json'))
+    assert response.content == filename.read_bytes()
@@ -0,0 +1,82 @@
+import pytest
+from bson import ObjectId
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from books.pagination import BookCursorPagination, get_ordering
+
+factory = APIRequestFactory()
+
+def _request(params):
+    return Request(factory.get('/api/books/', params))
+
+def _paginator(ordering):
+    paginator = BookCursorPagination()
+    paginator.field, paginator.direction = ordering
+    paginator.ordering_value = ('-' if paginator.direction == -1 else '') + paginator.field
+    return paginator
+
+def test_cursor_token_roundtrip():
+    """
+    Prueba que un token de cursor se decodifique en la misma posición que lo generó.
+    """
+    paginator = _paginator(('price', -1))
+    object_id = ObjectId()
+    token = paginator.encode_cursor((19.99, object_id), True)
+
+    assert paginator.decode_cursor(_request({"cursor": token})) == (19.99, object_id, True)
+
+def test_cursor_token_rejects_other_ordering():
+    """
+    Prueba que un token generado con otro orden sea rechazado.
+    """
+    token = _paginator(('price', -1)).encode_cursor((19.99, ObjectId()), False)
+
+    with pytest.raises(NotFound):
+        _paginator(('title', 1)).decode_cursor(_request({"cursor": token}))
+    with pytest.raises(NotFound):
+        _paginator(('title', 1)).decode_cursor(_request({"cursor": "no-es-un-token"}))
+
+def test_keyset_query_uses_id_as_tiebreaker():
+    """
+    Prueba que el filtro de rango incluya `_id` como desempate.
+    """
+    paginator = _paginator(('price', 1))
+    object_id = ObjectId()
+
+    assert paginator.get_keyset_query(10.0, object_id, False) == {"$or": [
+        {"price": {"$gt": 10.0}},
+        {"price": 10.0, "_id": {"$gt": object_id}},
+    ]}
+    assert paginator.get_keyset_query(10.0, object_id, True)["$or"][0] == {"price": {"$lt": 10.0}}
+
+def test_get_ordering_validates_field():
+    """
+    Prueba que solo se acepten campos de orden conocidos.
+    """
+    assert get_ordering(_request({"ordering": "-price"})) == ("price", -1)
+    assert get_ordering(_request({})) == ("_id", 1)
+    with pytest.raises(ValidationError):
+        get_ordering(_request({"ordering": "password"}))
+
+def test_cursor_projection_keeps_ordering_field():
+    """
+    Prueba que la paginación por cursor lea el campo de orden aunque la proyección lo omita.
+    """
+    class Collection:
+        def find(self, query, projection):
+            self.projection = projection
+            return self
+
+        def sort(self, sort):
+            return self
+
+        def limit(self, limit):
+            return self
+
+    collection = Collection()
+    _paginator(('price', 1)).find_page(collection, _request({"ordering": "price"}), projection={"title": 1})
+    assert collection.projection == {"title": 1, "price": 1}
+    BookCursorPagination().find_page(collection, _request({"ordering": "price"}), projection={"price": 0, "genre": 0})
+    assert collection.projection == {"genre": 0}
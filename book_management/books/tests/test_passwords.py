@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+from bson import ObjectId
+from django.test import override_settings
+from werkzeug.security import generate_password_hash
+
+from books import passwords
+from books.authentication import get_user_cache
+from books.utils import MongoDBUser
+
+FAST_HASHING = {'METHOD': 'pbkdf2:sha256:1000', 'MAX_CONCURRENCY': 1, 'MAX_PENDING': 1, 'QUEUE_TIMEOUT': 0.01}
+
+@override_settings(PASSWORD_HASHING=FAST_HASHING)
+def test_hash_and_verify_password():
+    """
+    Prueba que el hash generado en el pool se verifique correctamente.
+    """
+    password_hash = passwords.hash_password("mypassword")
+
+    assert password_hash.startswith("pbkdf2:sha256:1000$")
+    assert passwords.verify_password(password_hash, "mypassword")
+    assert not passwords.verify_password(password_hash, "wrongpassword")
+
+@override_settings(PASSWORD_HASHING=FAST_HASHING)
+def test_needs_rehash_detects_other_method_or_cost():
+    """
+    Prueba que se detecten los hashes con otro método o costo.
+    """
+    assert not passwords.needs_rehash(generate_password_hash("x", "pbkdf2:sha256:1000"))
+    assert passwords.needs_rehash(generate_password_hash("x", "pbkdf2:sha256:2000"))
+    assert passwords.needs_rehash(generate_password_hash("x", "scrypt"))
+
+@override_settings(PASSWORD_HASHING=FAST_HASHING)
+def test_verify_password_rejects_when_pool_is_saturated():
+    """
+    Prueba que se rechace la verificación cuando la cola del pool está llena.
+    """
+    release = threading.Event()
+    blocked = passwords._submit(release.wait)
+    try:
+        with pytest.raises(passwords.PasswordHasherBusy):
+            passwords.verify_password(generate_password_hash("x", "pbkdf2:sha256:1000"), "x")
+    finally:
+        release.set()
+        blocked.result()
+
+@override_settings(PASSWORD_HASHING=FAST_HASHING)
+def test_hash_passwords_does_not_use_login_pool():
+    """
+    Prueba que las altas masivas generen sus hashes aunque el pool de los logins esté saturado.
+    """
+    release = threading.Event()
+    blocked = passwords._submit(release.wait)
+    try:
+        hashes = passwords.hash_passwords(["a", "b", "c"])
+    finally:
+        release.set()
+        blocked.result()
+
+    assert [passwords.verify_password(password_hash, password) for password_hash, password in zip(hashes, "abc")] == [True] * 3
+
+class RecordingCollection:
+    """Colección mínima que registra las actualizaciones."""
+
+    def __init__(self):
+        self.updates = []
+
+    def update_one(self, query, update):
+        self.updates.append((query, update))
+
+@override_settings(PASSWORD_HASHING=FAST_HASHING, MONGO_USER_CACHE={'MAX_SIZE': 10, 'TTL': 60})
+def test_rehash_in_background_invalidates_cached_user():
+    """
+    Prueba que al guardar el nuevo hash se elimine al usuario de la caché de este proceso.
+    """
+    user_id = ObjectId()
+    cache = get_user_cache()
+    cache.set(str(user_id), MongoDBUser(email="testuser@example.com", user_id=user_id))
+    collection = RecordingCollection()
+
+    passwords.rehash_in_background(collection, user_id, "old-hash", "mypassword")
+    # Con un solo hilo, la tarea siguiente empieza después del callback que guarda el hash
+    passwords._submit(lambda: None).result()
+
+    assert collection.updates[0][0] == {"_id": user_id, "password": "old-hash"}
+    assert cache.get(str(user_id)) is None
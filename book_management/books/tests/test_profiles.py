@@ -0,0 +1,14 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+def test_api_profile_serves_requests():
+    """
+    Prueba que el perfil "api" arranque y atienda peticiones, según `startup_report`.
+    """
+    output = StringIO()
+    call_command('startup_report', profiles=['api'], requests=1, stdout=output)
+
+    report = output.getvalue()
+    assert "GET /metrics (estado 200)" in report
+    assert "Middleware" in report and "Petición (mediana)" in report
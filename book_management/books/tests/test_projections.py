@@ -0,0 +1,52 @@
+import pytest
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from books.projections import VALIDATOR_FIELDS, get_field_selection
+
+factory = APIRequestFactory()
+
+BOOK = {
+    "_id": "id",
+    "title": "Clean Code",
+    "author": "Robert C. Martin",
+    "published_date": "2008-08-01",
+    "genre": "Software Engineering",
+    "price": 19.99,
+}
+
+def _selection(params):
+    return get_field_selection(Request(factory.get('/api/books/', params)))
+
+def test_fields_become_projection():
+    """
+    Prueba que `?fields=` se convierta en una proyección de inclusión y recorte la respuesta.
+    """
+    selection = _selection({"fields": "title, price,title"})
+
+    assert selection.projection() == {"title": 1, "price": 1}
+    assert selection.projection(extra=VALIDATOR_FIELDS) == {"title": 1, "price": 1, "version": 1, "updated_at": 1}
+    assert selection.trim(dict(BOOK)) == {"_id": "id", "title": "Clean Code", "price": 19.99}
+
+def test_exclude_becomes_projection():
+    """
+    Prueba que `?exclude=` se convierta en una proyección de exclusión.
+    """
+    selection = _selection({"exclude": "author,genre"})
+
+    assert selection.projection() == {"author": 0, "genre": 0}
+    assert selection.trim(dict(BOOK)) == {"_id": "id", "title": "Clean Code", "published_date": "2008-08-01", "price": 19.99}
+    assert _selection({}).projection() is None
+
+@pytest.mark.parametrize("params", [
+    {"fields": "title,isbn"},
+    {"fields": "title", "exclude": "price"},
+    {"exclude": "_id"},
+])
+def test_invalid_field_selection(params):
+    """
+    Prueba que se rechacen campos desconocidos, la combinación de ambos parámetros y excluir `_id`.
+    """
+    with pytest.raises(ValidationError):
+        _selection(params)
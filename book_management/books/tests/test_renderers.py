@@ -0,0 +1,52 @@
+import io
+import json
+from datetime import datetime
+
+import pytest
+from bson import Decimal128, ObjectId
+from rest_framework.exceptions import ErrorDetail, ParseError
+
+from books.renderers import MongoJSONParser, MongoJSONRenderer, PrometheusRenderer
+
+def test_renderer_encodes_bson_types():
+    """
+    Prueba que el renderer codifique ObjectId, Decimal128 y datetime sin conversión previa.
+    """
+    object_id = ObjectId()
+    data = [{"_id": object_id, "price": Decimal128("19.99"), "updated_at": datetime(2024, 5, 1, 12, 0), "title": "Café"}]
+
+    rendered = MongoJSONRenderer().render(data)
+
+    assert json.loads(rendered) == [
+        {"_id": str(object_id), "price": 19.99, "updated_at": "2024-05-01T12:00:00", "title": "Café"}
+    ]
+
+def test_renderer_indented_fallback():
+    """
+    Prueba que con sangría (API navegable) se use el encoder estándar con los mismos tipos.
+    """
+    object_id = ObjectId()
+
+    rendered = MongoJSONRenderer().render({"_id": object_id}, renderer_context={"indent": 4})
+
+    assert rendered.decode() == '{\n    "_id": "%s"\n}' % object_id
+
+def test_parser():
+    """
+    Prueba que el parser lea JSON válido y responda con ParseError ante JSON inválido.
+    """
+    parser = MongoJSONParser()
+
+    assert parser.parse(io.BytesIO('{"title": "Café", "price": 1.5}'.encode())) == {"title": "Café", "price": 1.5}
+    with pytest.raises(ParseError):
+        parser.parse(io.BytesIO(b'{"title": '))
+
+def test_prometheus_renderer_renders_errors_as_text():
+    """
+    Prueba que los errores de `/metrics` (401/403) se devuelvan como texto y no como la repr de DRF.
+    """
+    renderer = PrometheusRenderer()
+    detail = ErrorDetail("No tiene permiso para realizar esta acción.", code="permission_denied")
+
+    assert renderer.render({"detail": detail}) == "No tiene permiso para realizar esta acción.\n".encode()
+    assert renderer.render("metric 1\n") == b"metric 1\n"
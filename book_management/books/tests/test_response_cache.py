@@ -0,0 +1,58 @@
+from django.test import override_settings
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+
+from books.cache import MISSING
+from books.response_cache import DjangoCacheBackend, LRUBackend, ResponseCache
+
+factory = APIRequestFactory()
+
+def _request(params=None):
+    return Request(factory.get('/api/books/', params or {}))
+
+def _lru_backend():
+    backend = LRUBackend(max_size=10, refresh_interval=3600)
+    backend.revisions.last_refresh = backend.revisions.timer()  # Revisiones ya cargadas: no se consulta MongoDB
+    return backend
+
+def test_response_cache_hits_until_generation_changes():
+    """
+    Prueba que una respuesta se sirva desde la caché hasta que una escritura cambie la generación.
+    """
+    cache = ResponseCache(_lru_backend(), ttls={'book-list': 30})
+    key, entry = cache.lookup('book-list', _request({"page": 2}), {})
+    assert entry is MISSING
+    cache.store('book-list', key, Response([{"title": "Clean Code"}], headers={"X-Total-Count": "11"}))
+
+    _, entry = cache.lookup('book-list', _request({"page": 2}), {})
+    assert entry.data == [{"title": "Clean Code"}]
+    assert entry.headers == {"X-Total-Count": "11"}
+    assert cache.lookup('book-list', _request({"page": 3}), {})[1] is MISSING
+
+    cache.backend.bump_generation()
+    assert cache.lookup('book-list', _request({"page": 2}), {})[1] is MISSING
+    assert cache.stats()["endpoints"]["book-list"] == {"hits": 1, "misses": 3, "hit_ratio": 0.25}
+
+def test_response_cache_skips_errors():
+    """
+    Prueba que no se guarden respuestas de error.
+    """
+    cache = ResponseCache(_lru_backend())
+    key, _ = cache.lookup('book-detail', _request(), {"pk": "x"})
+    cache.store('book-detail', key, Response({"error": "Book not found"}, status=404))
+
+    assert cache.lookup('book-detail', _request(), {"pk": "x"})[1] is MISSING
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+def test_django_backend_generation():
+    """
+    Prueba que la generación compartida del backend de Django aumente con cada escritura.
+    """
+    backend = DjangoCacheBackend()
+    backend.cache.clear()
+    generation = backend.get_generation()
+
+    assert backend.get_generation() == generation
+    backend.bump_generation()
+    assert backend.get_generation() == generation + 1
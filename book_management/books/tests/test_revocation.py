@@ -0,0 +1,109 @@
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+from django.test import AsyncRequestFactory, override_settings
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from books import revocation
+from books.async_views import AsyncTokenRefreshView
+from books.authentication import MongoDBJWTAuthentication
+from books.revocation import RevocationSnapshot
+from books.utils import create_tokens_for_user
+
+factory = AsyncRequestFactory()
+
+@pytest.fixture
+def revocations(settings):
+    """Lista de revocación ya cargada: las comprobaciones no consultan MongoDB."""
+    settings.TOKEN_REVOCATION = {'ENABLED': True, 'REFRESH_INTERVAL': 3600}
+    snapshot = RevocationSnapshot(interval=3600)
+    snapshot.last_refresh = snapshot.timer()
+    revocation._revocations = snapshot
+    return snapshot
+
+def test_snapshot_revokes_tokens_and_users(revocations):
+    """
+    Prueba que se revoquen un token por `jti` y los tokens de un usuario emitidos hasta el corte.
+    """
+    user_id = ObjectId()
+    refresh, access = create_tokens_for_user({"_id": user_id, "email": "testuser@example.com"})
+    other_refresh, _ = create_tokens_for_user({"_id": ObjectId(), "email": "other@example.com"})
+
+    assert not revocations.is_revoked(access)
+    revocations.apply({"_id": access["jti"], "kind": "token", "expires_at": access.current_time.replace(year=2100)})
+    assert revocations.is_revoked(access)
+    assert not revocations.is_revoked(refresh)
+
+    revocations.add_user(str(user_id), refresh["iat"], time.time() + 60)
+    assert revocations.is_revoked(refresh)
+    assert revocations.is_revoked(refresh.access_token)  # Conserva el `iat` del refresh token
+    assert not revocations.is_revoked(other_refresh)
+
+    revocations.purge(now=time.time() + 120)
+    assert not revocations.is_revoked(refresh)
+    assert revocations.is_revoked(access)
+
+@override_settings(MONGO_JWT_AUTH={'MODE': 'stateless', 'CHECK_USER_VERSION': False})
+def test_revoked_tokens_are_rejected_without_database(revocations):
+    """
+    Prueba que la autenticación y el refresco rechacen tokens revocados usando solo la copia en memoria.
+    """
+    user_id = ObjectId()
+    refresh, access = create_tokens_for_user({"_id": user_id, "email": "testuser@example.com"})
+    assert MongoDBJWTAuthentication().get_user(access).id == str(user_id)
+
+    revocations.add_user(str(user_id), refresh["iat"], time.time() + 60)
+    with pytest.raises(AuthenticationFailed):
+        MongoDBJWTAuthentication().get_user(access)
+
+    response = asyncio.run(AsyncTokenRefreshView.as_view()(factory.post(
+        '/api/token/refresh/', {"refresh": str(refresh)}, content_type='application/json'
+    )))
+    assert response.status_code == 401
+    assert json.loads(response.content) == {"error": "Token revocado"}
+
+class ListCollection:
+    """Colección mínima con `find({campo: {"$gte": valor}}).sort(campo, 1)` sobre una lista."""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def find(self, query, projection=None):
+        (field, condition), = query.items()
+        return ListCursor([document for document in self.documents if document[field] >= condition["$gte"]], field)
+
+class ListCursor(list):
+    def __init__(self, documents, field):
+        super().__init__(documents)
+        self.field = field
+
+    def sort(self, field, direction):
+        return sorted(self, key=lambda document: document[field])
+
+class ListRevocationSnapshot(RevocationSnapshot):
+    collection = None
+
+def test_snapshot_sees_late_writes_with_older_timestamp():
+    """
+    Prueba que un refresco vea una revocación confirmada tarde con un `updated_at` anterior al último visto.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    expires_at = now + timedelta(days=1)
+    snapshot = ListRevocationSnapshot(interval=0)
+    snapshot.collection = ListCollection([{"_id": "jti-1", "kind": "token", "expires_at": expires_at, "updated_at": now}])
+
+    snapshot.refresh()
+    assert snapshot.since == now
+
+    # Otra escritura, con una marca de un segundo antes, aparece después del refresco
+    snapshot.collection.documents.append(
+        {"_id": "jti-2", "kind": "token", "expires_at": expires_at, "updated_at": now - timedelta(seconds=1)}
+    )
+    snapshot.refresh()
+
+    assert set(snapshot.tokens) == {"jti-1", "jti-2"}
+    assert snapshot.since == now
@@ -0,0 +1,152 @@
+import threading
+
+import pytest
+from bson import ObjectId
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from books.indexes import INDEXES
+from books.pagination import BookPagination
+from books.search import InvertedIndex, MemorySearch, SearchIndexSnapshot, get_search_query, tokenize
+
+factory = APIRequestFactory()
+
+def _request(params):
+    return Request(factory.get('/api/books/search/', params))
+
+def _book(title, author="Autor", genre="Novela"):
+    return {"_id": ObjectId(), "title": title, "author": author, "genre": genre}
+
+def test_tokenize_ignores_case_and_accents():
+    """
+    Prueba que los términos se normalicen a minúsculas y sin tildes.
+    """
+    assert tokenize("Cien Años de Soledad, G. García Márquez") == [
+        "cien", "anos", "de", "soledad", "g", "garcia", "marquez",
+    ]
+    assert tokenize(None) == []
+
+def test_get_search_query_requires_q():
+    """
+    Prueba que `q` sea obligatorio y tenga un largo máximo.
+    """
+    assert get_search_query(_request({"q": "  tolkien "})) == "tolkien"
+    with pytest.raises(ValidationError):
+        get_search_query(_request({}))
+    with pytest.raises(ValidationError):
+        get_search_query(_request({"q": "x" * 201}))
+
+def test_inverted_index_ranks_by_field_weight():
+    """
+    Prueba que una coincidencia en el título puntúe más que una en el autor o el género.
+    """
+    in_title = _book("Dune")
+    in_author = _book("Otro libro", author="Dune Fan")
+    in_genre = _book("Tercero", genre="Dune")
+    index = InvertedIndex()
+    for book in (in_genre, in_author, in_title, _book("Sin relación")):
+        index.add(book)
+
+    total, ranked = index.search(["dune"])
+    assert total == 3
+    assert [object_id for object_id, _ in ranked] == [in_title["_id"], in_author["_id"], in_genre["_id"]]
+    assert index.search(["dune"], limit=1)[1][0][0] == in_title["_id"]
+
+def test_inverted_index_updates_and_removes():
+    """
+    Prueba que volver a agregar un libro reemplace sus términos y que quitarlo limpie el índice.
+    """
+    book = _book("Dune")
+    index = InvertedIndex()
+    index.add(book)
+    index.add(dict(book, title="Fundación"))
+
+    assert index.search(["dune"]) == (0, [])
+    assert index.search(["fundacion"])[0] == 1
+
+    index.remove(book["_id"])
+    assert len(index) == 0
+    assert index.postings == {}
+
+def test_memory_search_paginates_ranked_ids():
+    """
+    Prueba que la búsqueda en memoria lea solo los libros de la página, en orden de relevancia.
+    """
+    books = [_book(f"Dune {'dune ' * i}") for i in range(5)]
+
+    class Collection:
+        def find(self, query, projection):
+            ids = query["_id"]["$in"]
+            return [dict(book) for book in books if book["_id"] in ids]
+
+    search = MemorySearch()
+    search.snapshot.last_refresh = search.snapshot.last_rebuild = search.snapshot.timer()
+    search.update([], books)
+
+    paginator = BookPagination()
+    page = search.search(Collection(), _request({"q": "dune", "page": 2, "page_size": 2}), "dune", paginator)
+    assert [book["_id"] for book in page] == [books[2]["_id"], books[1]["_id"]]
+    assert paginator.get_headers() == {"X-Total-Count": "5"}
+    with pytest.raises(NotFound):
+        search.search(Collection(), _request({"q": "dune", "page": 4, "page_size": 2}), "dune", BookPagination())
+
+class BlockingCollection:
+    """Colección cuyo recorrido completo espera a `release` (simula una colección grande)."""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.release = threading.Event()
+
+    def find(self, query, projection):
+        assert self.release.wait(5)
+        return list(self.documents)
+
+class BlockingSearchIndexSnapshot(SearchIndexSnapshot):
+    collection = None
+
+def test_memory_search_builds_index_in_background():
+    """
+    Prueba que la primera búsqueda no espere a construir el índice: usa el índice de texto
+    de MongoDB hasta que la construcción en segundo plano termina.
+    """
+    book = _book("Dune")
+    search = MemorySearch()
+    search.snapshot = BlockingSearchIndexSnapshot()
+    search.snapshot.collection = BlockingCollection([book])
+    fallback_calls = []
+
+    class Fallback:
+        def search(self, collection, request, q, paginator, projection=None):
+            fallback_calls.append(q)
+            return []
+
+    search.fallback = Fallback()
+    assert search.search(None, _request({"q": "dune"}), "dune", BookPagination()) == []
+    assert fallback_calls == ["dune"]
+    assert search.snapshot.rebuilding
+
+    search.snapshot.start_rebuild()  # no lanza una segunda construcción
+    search.snapshot.collection.release.set()
+    for thread in threading.enumerate():
+        if thread.name == "search-index-rebuild":
+            thread.join(5)
+
+    assert search.snapshot.ready and not search.snapshot.rebuilding
+    total, ranked = search.snapshot.search(["dune"])
+    assert total == 1 and ranked[0][0] == book["_id"]
+
+def test_text_index_matches_index_information():
+    """
+    Prueba que el índice de texto declarado coincida con cómo lo describe `index_information()`.
+    """
+    spec = next(spec for spec in INDEXES["Book"] if spec.name == "book_text")
+    info = {
+        "key": [("_fts", "text"), ("_ftsx", 1)],
+        "weights": {"title": 10, "author": 5, "genre": 2},
+        "default_language": "none",
+        "language_override": "language",
+        "textIndexVersion": 3,
+    }
+    assert spec.matches(info)
+    assert not spec.matches(dict(info, weights={"title": 1, "author": 1, "genre": 1}))
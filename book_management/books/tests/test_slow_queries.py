@@ -0,0 +1,105 @@
+from types import SimpleNamespace
+
+from books.slow_queries import SlowQueryListener, SlowQueryLog, command_shape, explain_command, summarize_explain
+
+def test_command_shape_redacts_values():
+    """
+    Prueba que la forma conserve campos, operadores y orden, y oculte los valores.
+    """
+    command = {
+        "find": "Book",
+        "filter": {"$or": [{"year": {"$in": [2008, 2009]}}, {"published_date": {"$regex": "^2008"}}]},
+        "sort": {"_id": 1},
+        "lsid": {"id": "sesion"},
+    }
+
+    assert command_shape("find", command) == {
+        "find": "Book",
+        "filter": {"$or": [{"year": {"$in": ["?"]}}, {"published_date": {"$regex": "?"}}]},
+        "sort": {"_id": 1},
+    }
+    assert command_shape("aggregate", {"aggregate": "Book", "pipeline": [{"$match": {"genre": "Fiction"}}, {"$limit": 5}]}) == {
+        "aggregate": "Book", "pipeline": [{"$match": {"genre": "?"}}, {"$limit": "?"}],
+    }
+    assert explain_command("find", command) == {
+        "explain": {"find": "Book", "filter": command["filter"], "sort": {"_id": 1}}, "verbosity": "executionStats",
+    }
+    assert explain_command("insert", {"insert": "Book"}) is None
+
+def test_summarize_explain_detects_collscan():
+    """
+    Prueba que el resumen distinga un recorrido completo de uno por índice.
+    """
+    collscan = {
+        "queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}},
+        "executionStats": {"nReturned": 2, "totalKeysExamined": 0, "totalDocsExamined": 5000, "executionTimeMillis": 12},
+    }
+    ixscan = {"queryPlanner": {"winningPlan": {"queryPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "genre_1__id_1"}}}}}
+
+    assert summarize_explain(collscan) == {
+        "scan": "COLLSCAN", "stages": ["COLLSCAN"], "indexes": [],
+        "keys_examined": 0, "docs_examined": 5000, "returned": 2, "execution_ms": 12,
+    }
+    assert summarize_explain(ixscan)["scan"] == "IXSCAN"
+    assert summarize_explain(ixscan)["indexes"] == ["genre_1__id_1"]
+
+def test_slow_query_log_dedupes_and_rate_limits():
+    """
+    Prueba que cada forma se registre una vez por intervalo, contando las repeticiones, con un límite por minuto.
+    """
+    log = SlowQueryLog(log_interval=60, max_per_minute=2)
+
+    assert log.admit("a", 150, now=100) == (1, 150)
+    assert log.admit("a", 400, now=110) is None
+    assert log.admit("b", 150, now=120) == (1, 150)
+    assert log.admit("c", 150, now=130) is None  # Límite por minuto
+    assert log.admit("a", 200, now=170) == (2, 400)
+
+def test_listener_logs_only_slow_commands_from_watched_modules(caplog):
+    """
+    Prueba que solo se registren los comandos lentos originados en los módulos vigilados.
+    """
+    listener = SlowQueryListener(threshold_ms=100, modules=("books/tests/test_slow_queries.py",), explain_sample_rate=0)
+    command = {"count": "Book", "query": {"author": "Author Name"}}
+
+    def run(duration_micros, request_id):
+        started = SimpleNamespace(connection_id=("db", 27017), request_id=request_id, command_name="count", command=command)
+        finished = SimpleNamespace(
+            connection_id=("db", 27017), request_id=request_id, duration_micros=duration_micros, database_name="BookManagement",
+        )
+        listener.started(started)
+        listener.succeeded(finished)
+
+    run(5_000, 1)
+    run(250_000, 2)
+
+    assert listener.commands == {}
+    assert len(caplog.records) == 1
+    entry = caplog.records[0].slow_query
+    assert entry["namespace"] == "BookManagement.Book"
+    assert entry["shape"] == {"count": "Book", "filter": {"author": "?"}}
+    assert entry["origin"].startswith("books/tests/test_slow_queries.py:")
+    assert "Author Name" not in caplog.text
+
+    listener.modules = ("books/views.py",)
+    run(250_000, 3)
+    assert len(caplog.records) == 1
+
+def test_get_more_is_grouped_by_collection(caplog):
+    """
+    Prueba que los `getMore` de cursores distintos compartan forma y namespace (la colección, no el id del cursor).
+    """
+    listener = SlowQueryListener(threshold_ms=100, modules=("books/tests/test_slow_queries.py",), explain_sample_rate=0)
+
+    for request_id, cursor_id in ((1, 7311), (2, 9942)):
+        command = {"getMore": cursor_id, "collection": "Book", "batchSize": 1000}
+        listener.started(SimpleNamespace(connection_id=("db", 27017), request_id=request_id, command_name="getMore", command=command))
+        listener.succeeded(SimpleNamespace(
+            connection_id=("db", 27017), request_id=request_id, duration_micros=250_000, database_name="BookManagement",
+        ))
+
+    assert command_shape("getMore", {"getMore": 7311, "collection": "Book"}) == {"getMore": "Book"}
+    assert command_shape("ping", {"ping": 1}) == {"ping": None}
+    # El segundo cursor es la misma forma: el registro lo agrupa con el primero
+    assert len(caplog.records) == 1
+    assert caplog.records[0].slow_query["namespace"] == "BookManagement.Book"
@@ -0,0 +1,25 @@
+from books.stats import _group_by_year, get_book_year
+
+def test_get_book_year():
+    """
+    Prueba que el año se deduzca de los primeros cuatro caracteres de la fecha.
+    """
+    assert get_book_year({"published_date": "2008-08-01"}) == 2008
+    assert get_book_year({"published_date": "s/f"}) is None
+    assert get_book_year({}) is None
+
+def test_group_by_year():
+    """
+    Prueba que los libros se agrupen por año con cantidad, suma, mínimo y máximo.
+    """
+    groups = _group_by_year([
+        {"published_date": "2008-08-01", "price": 10.0},
+        {"published_date": "2008-01-01", "price": 30.0},
+        {"published_date": "1999-10-30", "price": 40.0},
+        {"published_date": "sin fecha", "price": 5.0},
+    ])
+
+    assert groups == {
+        2008: {"count": 2, "sum": 40.0, "min": 10.0, "max": 30.0},
+        1999: {"count": 1, "sum": 40.0, "min": 40.0, "max": 40.0},
+    }
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from bson import Decimal128
+from django.test import override_settings
+
+from books.storage import (
+    apply_update, book_update, needs_migration, new_book, storage_update, to_representation, to_storage,
+)
+
+BOOK = {
+    "title": "Clean Code",
+    "author": "Robert C. Martin",
+    "published_date": "2008-08-01",
+    "genre": "Software Engineering",
+    "price": 19.99,
+}
+
+@override_settings(BOOK_STORAGE_MODE='typed')
+def test_typed_storage_roundtrip():
+    """
+    Prueba que un libro tipado se guarde con fecha BSON, año y Decimal128 y se lea igual que antes.
+    """
+    document = to_storage(BOOK)
+
+    assert document["published_date"] == datetime(2008, 8, 1)
+    assert document["year"] == 2008
+    assert document["price"] == Decimal128("19.99")
+    assert not needs_migration(document)
+    assert to_representation(dict(document)) == BOOK
+
+@override_settings(BOOK_STORAGE_MODE='legacy')
+def test_legacy_storage_keeps_api_format():
+    """
+    Prueba que en modo legacy el documento se guarde tal como llega y se elimine un año obsoleto.
+    """
+    assert to_storage(BOOK) == BOOK
+    assert needs_migration(BOOK)
+    assert storage_update(BOOK) == {"$set": BOOK, "$unset": {"year": ""}}
+
+@override_settings(BOOK_STORAGE_MODE='legacy')
+def test_book_update_bumps_version():
+    """
+    Prueba que una actualización incremente la versión y renueve `updated_at`, y que estos campos no se expongan.
+    """
+    previous = new_book(BOOK)
+    update = book_update(dict(BOOK, price=25.0))
+    current = apply_update(previous, update)
+
+    assert previous["version"] == 1
+    assert current["version"] == 2
+    assert current["price"] == 25.0
+    assert current["updated_at"] >= previous["updated_at"]
+    assert to_representation(current) == dict(BOOK, price=25.0)
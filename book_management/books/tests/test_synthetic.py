@@ -0,0 +1,26 @@
+import itertools
+from collections import Counter
+
+from books.serializers import BookSerializer
+from books.synthetic import SyntheticBooks
+
+def test_synthetic_books_are_valid_and_reproducible():
+    """
+    Prueba que los libros sintéticos pasen la validación y se repitan con la misma semilla.
+    """
+    books = list(itertools.islice(SyntheticBooks(seed=42), 200))
+
+    assert books == list(itertools.islice(SyntheticBooks(seed=42), 200))
+    serializer = BookSerializer(data=books, many=True)
+    assert serializer.is_valid(), serializer.errors
+
+def test_synthetic_books_are_skewed():
+    """
+    Prueba que los géneros y autores más frecuentes concentren una parte desproporcionada.
+    """
+    books = list(itertools.islice(SyntheticBooks(seed=7, authors=1000), 5000))
+
+    top_genre = Counter(book["genre"] for book in books).most_common(1)[0][1]
+    top_author = Counter(book["author"] for book in books).most_common(1)[0][1]
+    assert top_genre > len(books) / 20 * 3  # Más del triple que con una distribución uniforme
+    assert top_author > len(books) / 1000 * 20
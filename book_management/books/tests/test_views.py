@@ -1,8 +1,15 @@
+import threading
+from io import StringIO
+
 import pytest
 from rest_framework.test import APIClient
 from django.conf import settings
 from werkzeug.security import generate_password_hash
 from bson import ObjectId
+from django.core.management import call_command
+from django.test import override_settings
+from books import passwords
+from books.indexes import ensure_indexes
 
 # Configuración del cliente de pruebas
 client = APIClient()
@@ -10,17 +17,32 @@ client = APIClient()
 # Colecciones de usuarios y libros en MongoDB
 user_collection = settings.MONGO_DB['User']
 book_collection = settings.MONGO_DB['Book']
+stats_collection = settings.MONGO_DB['BookYearStats']
+counters_collection = settings.MONGO_DB['Counters']
+
+@pytest.fixture(scope="session", autouse=True)
+def indexes():
+    """
+    Crea los índices declarados (el registro depende del índice único de email).
+    """
+    ensure_indexes(settings.MONGO_DB)
 
 @pytest.fixture(autouse=True)
 def cleanup():
     """
-    Limpia las colecciones de prueba antes y después de cada prueba.
+    Limpia las colecciones de prueba y las credenciales del cliente antes y después de cada prueba.
     """
+    client.credentials()
     user_collection.delete_many({})
     book_collection.delete_many({})
+    stats_collection.delete_many({})
+    counters_collection.delete_many({})
     yield
+    client.credentials()
     user_collection.delete_many({})
     book_collection.delete_many({})
+    stats_collection.delete_many({})
+    counters_collection.delete_many({})
 
 @pytest.fixture
 def setup_user():
@@ -87,6 +109,23 @@ def test_create_user_duplicate_email():
     assert response.status_code == 400
     assert response.data["email"][0] == "El correo ya está registrado."
 
+@override_settings(PASSWORD_HASHING={'METHOD': 'pbkdf2:sha256:1000', 'MAX_CONCURRENCY': 1, 'MAX_PENDING': 1, 'QUEUE_TIMEOUT': 0.01})
+def test_create_user_rejects_when_hasher_is_saturated():
+    """
+    Prueba que el registro responda 503 con Retry-After cuando el pool de hashes está lleno.
+    """
+    release = threading.Event()
+    blocked = passwords._submit(release.wait)
+    try:
+        response = client.post('/api/users/', {"email": "busy@example.com", "password": "mypassword"})
+    finally:
+        release.set()
+        blocked.result()
+
+    assert response.status_code == 503
+    assert response["Retry-After"] == "1"
+    assert user_collection.find_one({"email": "busy@example.com"}) is None
+
 def test_login_success(setup_user):
     """
     Prueba que un usuario pueda iniciar sesión correctamente.
@@ -114,6 +153,38 @@ def test_login_invalid_credentials(setup_user):
     assert response.status_code == 401
     assert response.data["error"] == "Credenciales inválidas."
 
+def test_logout_revokes_access_and_refresh_tokens(setup_user):
+    """
+    Prueba que al cerrar sesión se rechacen el access token y el refresh token de la sesión.
+    """
+    response = client.post('/api/login/', {"email": setup_user["email"], "password": "mypassword"})
+    access, refresh = response.data["access"], response.data["refresh"]
+
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+    response = client.post('/api/logout/', {"refresh": refresh}, format='json')
+    assert response.status_code == 204
+
+    response = client.get('/api/books/')
+    assert response.status_code == 401
+
+    client.credentials()
+    response = client.post('/api/token/refresh/', {"refresh": refresh}, format='json')
+    assert response.status_code == 401
+    assert response.data["error"] == "Token revocado"
+    settings.MONGO_DB['RevokedToken'].delete_many({})
+
+@override_settings(TOKEN_REVOCATION={'ENABLED': False})
+def test_revoke_tokens_bumps_user_version(setup_auth_token, setup_user):
+    """
+    Prueba que `revoke_tokens --user` incremente la versión del usuario y rechace sus tokens anteriores.
+    """
+    call_command('revoke_tokens', user=setup_user["email"], stdout=StringIO())
+
+    assert user_collection.find_one({"_id": setup_user["_id"]})["version"] == 1
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {setup_auth_token}')
+    assert client.get('/api/books/').status_code == 401
+    settings.MONGO_DB['RevokedToken'].delete_many({})
+
 def test_create_book_success(setup_auth_token):
     """
     Prueba que se pueda crear un libro correctamente.
@@ -153,4 +224,278 @@ def test_create_book_unauthorized():
 
     # Verificar que se retorna un error de autenticación
     assert response.status_code == 401
-    assert response.data["detail"] == "Authentication credentials were not provided."
\ No newline at end of file
+    assert response.data["detail"] == "Authentication credentials were not provided."
+
+def _insert_books(count):
+    """Inserta `count` libros de prueba y devuelve sus ids en orden de inserción."""
+    books = [
+        {
+            "_id": ObjectId(),
+            "title": f"Book {i:03d}",
+            "author": "Author Name",
+            "published_date": "2020-01-01",
+            "genre": "Fiction",
+            "price": float(i),
+        }
+        for i in range(count)
+    ]
+    book_collection.insert_many(books)
+    return [str(book["_id"]) for book in books]
+
+def test_list_books_page_window(setup_auth_token):
+    """
+    Prueba que la paginación por número de página devuelva solo la ventana solicitada.
+    """
+    ids = _insert_books(25)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {setup_auth_token}')
+    response = client.get('/api/books/', {"page": 3})
+
+    assert response.status_code == 200
+    assert [book["_id"] for book in response.json()] == ids[20:]
+    assert response["X-Total-Count"] == "25"
+
+    response = client.get('/api/books/', {"page": 4})
+    assert response.status_code == 404
+
+def test_list_books_cursor_pagination(setup_auth_token):
+    """
+    Prueba que la paginación por cursor recorra todos los libros sin repetir ni omitir.
+    """
+    _insert_books(25)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {setup_auth_token}')
+
+    seen = []
+    response = client.get('/api/books/', {"cursor": "", "ordering": "-price", "page_size": 10})
+    while True:
+        assert response.status_code == 200
+        seen.extend(book["price"] for book in response.data["results"])
+        if not response.data["next"]:
+            break
+        response = client.get(response.data["next"])
+
+    assert seen == [float(i) for i in range(24, -1, -1)]
+
+    # Volver a la página anterior desde la última
+    response = client.get(response.data["previous"])
+    assert [book["price"] for book in response.data["results"]] == [float(i) for i in range(14, 4, -1)]
+
+def test_list_books_sparse_fields(setup_auth_token):
+    """
+    Prueba que `?fields=` devuelva solo los campos pedidos (y `_id`) y que se rechacen campos desconocidos.
+    """
+    ids = _insert_books(3)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {setup_auth_token}')
+
+    response = client.get('/api/books/', {"fields": "title,price", "cursor": "", "ordering": "-price"})
+    assert response.json()["results"][0] == {"_id": ids[2], "title": "Book 002", "price": 2.0}
+
+    response = client.get(f'/api/books/{ids[0]}/', {"exclude": "author,genre,published_date"})
+    assert response.json() == {"_id": ids[0], "title": "Book 000", "price": 0.0}
+
+    assert client.get('/api/books/', {"fields": "isbn"}).status_code == 400
+
+def test_list_books_filters_and_ordering(setup_auth_token):
+    """
+    Prueba que los filtros se apliquen en la consulta y que se rechace un orden sin índice.
+    """
+    ids = _insert_books(5)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {setup_auth_token}')
+
+    response = client.get('/api/books/', {"genre": "Fiction", "price_min": 1, "price_max": 3, "ordering": "-price"})
+    assert [book["_id"] for book in response.json()] == [ids[3], ids[2], ids[1]]
+    assert response["X-Total-Count"] == "3"
+
+    assert client.get('/api/books/', {"author": "Otro Autor"}).json() == []
+    assert client.get('/api/books/', {"price_min": 1, "ordering": "title"}).status_code == 400
+
+def test_search_books_ranks_by_relevance(setup_auth_token):
+    """
+    Prueba que la búsqueda ordene por relevancia (título antes que autor) y exija `q`.
+    """
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {setup_auth_token}')
+    for book in (
+        {"title": "Otro libro", "author": "Frank Herbert", "published_date": "1965-08-01", "genre": "Dune", "price": 9.99},
+        {"title": "Dune", "author": "Frank Herbert", "published_date": "1965-08-01", "genre": "Ciencia ficción", "price": 19.99},
+    ):
+        client.post('/api/books/', book, format='json')
+
+    response = client.get('/api/books/search/', {"q": "dune", "fields": "title"})
+    assert response.status_code == 200
+    assert [book["title"] for book in response.json()] == ["Dune", "Otro libro"]
+    assert response.json()[0]["score"] > response.json()[1]["score"]
+    assert response["X-Total-Count"] == "2"
+
+    assert client.get('/api/books/search/').status_code == 400
+
+def test_book_stats_facets(setup_auth_token):
+    """
+    Prueba que las estadísticas del catálogo respeten los filtros y las facetas pedidas.
+    """
+    _insert_books(4)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {setup_auth_token}')
+
+    with override_settings(BOOK_STATS={'CACHE_TTL': 0}):
+        response = client.get('/api/books/stats/', {"facets": "summary,by_year,price_histogram", "price_min": 1, "bucket_size": 2})
+    assert response.status_code == 200
+    assert response.data["summary"] == {"count": 3, "average_price": 2.0, "min_price": 1.0, "max_price": 3.0}
+    assert response.data["by_year"] == [{"year": 2020, "count": 3, "average_price": 2.0, "min_price": 1.0, "max_price": 3.0}]
+    assert [bucket["count"] for bucket in response.data["price_histogram"]] == [1, 2]
+    assert "by_genre" not in response.data
+
+    assert client.get('/api/books/stats/', {"facets": "by_isbn"}).status_code == 400
+
+def test_conditional_get_returns_not_modified(setup_auth_token):
+    """
+    Prueba que el detalle y el listado respondan 304 con un ETag vigente y 200 después de una escritura.
+    """
+    book = {"title": "Book Title", "author": "Author Name", "published_date": "2023-01-01", "genre": "Fiction", "price": 19.99}
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {setup_auth_token}')
+    client.post('/api/books/', book, format='json')
+    book_id = str(book_collection.find_one({"title": "Book Title"})["_id"])
+
+    detail = client.get(f'/api/books/{book_id}/')
+    listing = client.get('/api/books/')
+    assert "version" not in detail.data
+    assert client.get(f'/api/books/{book_id}/', HTTP_IF_NONE_MATCH=detail["ETag"]).status_code == 304
+    assert client.get('/api/books/', HTTP_IF_NONE_MATCH=listing["ETag"]).status_code == 304
+
+    client.put(f'/api/books/{book_id}/', dict(book, price=25.0), format='json')
+
+    response = client.get(f'/api/books/{book_id}/', HTTP_IF_NONE_MATCH=detail["ETag"])
+    assert response.status_code == 200
+    assert response.data["price"] == 25.0
+    assert client.get('/api/books/', HTTP_IF_NONE_MATCH=listing["ETag"]).status_code == 200
+
+@override_settings(RESPONSE_CACHE={'BACKEND': 'lru', 'TTL': {'book-list': 60}})
+def test_response_cache_is_invalidated_by_writes(setup_auth_token):
+    """
+    Prueba que el listado se sirva desde la caché hasta que una escritura cambie la generación.
+    """
+    book = {"title": "Book Title", "author": "Author Name", "published_date": "2023-01-01", "genre": "Fiction", "price": 19.99}
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {setup_auth_token}')
+
+    assert client.get('/api/books/')["X-Cache"] == "MISS"
+    response = client.get('/api/books/')
+    assert response["X-Cache"] == "HIT"
+    assert response.data == []
+
+    client.post('/api/books/', book, format='json')
+
+    response = client.get('/api/books/')
+    assert response["X-Cache"] == "MISS"
+    assert [item["title"] for item in response.data] == ["Book Title"]
+
+@override_settings(RESPONSE_CACHE={'BACKEND': 'lru', 'TTL': {'average-price-by-year': 60}})
+def test_rebuild_book_stats_invalidates_cached_responses(setup_auth_token):
+    """
+    Prueba que `rebuild_book_stats` (que reemplaza `BookYearStats` con `$out`) invalide las respuestas cacheadas.
+    """
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {setup_auth_token}')
+    book_collection.insert_one({"title": "A", "author": "Author Name", "published_date": "2007-01-01", "genre": "Fiction", "price": 10.0})
+    call_command('rebuild_book_stats', stdout=StringIO())
+    assert client.get('/api/books/average-price/2007/').data["count"] == 1
+    assert client.get('/api/books/average-price/2007/')["X-Cache"] == "HIT"
+
+    # Escritura fuera de la aplicación, sin `books_changed`
+    book_collection.insert_one({"title": "B", "author": "Author Name", "published_date": "2007-06-01", "genre": "Fiction", "price": 30.0})
+    call_command('rebuild_book_stats', stdout=StringIO())
+
+    response = client.get('/api/books/average-price/2007/')
+    assert response["X-Cache"] == "MISS"
+    assert response.data["count"] == 2
+
+def test_average_price_by_year_is_maintained_incrementally(setup_auth_token):
+    """
+    Prueba que las estadísticas por año se actualicen al crear, actualizar y eliminar libros.
+    """
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {setup_auth_token}')
+    book = {"title": "A", "author": "Author Name", "published_date": "2008-08-01", "genre": "Fiction"}
+    client.post('/api/books/', dict(book, price=10.0))
+    client.post('/api/books/', dict(book, title="B", price=30.0))
+
+    response = client.get('/api/books/average-price/2008/')
+    assert response.status_code == 200
+    assert response.data == {"average_price": 20.0, "count": 2, "min_price": 10.0, "max_price": 30.0}
+
+    # Mover el libro más caro a otro año
+    book_id = str(book_collection.find_one({"title": "B"})["_id"])
+    response = client.put(f'/api/books/{book_id}/', dict(book, title="B", published_date="2009-01-01", price=30.0))
+    assert response.status_code == 200
+    assert client.get('/api/books/average-price/2008/').data["max_price"] == 10.0
+    assert client.get('/api/books/average-price/2009/').data["count"] == 1
+
+    # Eliminar el último libro del año
+    response = client.delete(f'/api/books/{book_id}/')
+    assert response.status_code == 204
+    assert client.get('/api/books/average-price/2009/').status_code == 404
+
+def test_bulk_create_users_reports_failed_rows(setup_auth_token):
+    """
+    Prueba que el alta masiva inserte las filas válidas e informe las fallidas.
+    """
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {setup_auth_token}')
+    response = client.post('/api/users/bulk/', [
+        {"email": "a@example.com", "password": "mypassword"},
+        {"email": "testuser@example.com", "password": "mypassword"},  # Ya existe
+        {"email": "no-es-un-correo", "password": "mypassword"},
+        {"email": "a@example.com", "password": "otherpassword"},  # Repetido en el lote
+    ], format='json')
+
+    assert response.status_code == 207
+    assert response.data["inserted"] == 1
+    assert [failure["row"] for failure in response.data["failed"]] == [1, 2, 3]
+    assert response.data["failed"][0]["errors"]["email"][0] == "El correo ya está registrado."
+
+def test_bulk_book_create_update_delete(setup_auth_token):
+    """
+    Prueba el alta, la modificación y la baja de libros en lote con resultados por elemento.
+    """
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {setup_auth_token}')
+    book = {"author": "Author Name", "published_date": "2008-08-01", "genre": "Fiction", "price": 10.0}
+    response = client.post('/api/books/bulk/', [dict(book, title="A"), dict(book, title="B")], format='json')
+
+    assert response.status_code == 200
+    assert response.data["summary"] == {"created": 2}
+    ids = [result["_id"] for result in response.data["results"]]
+    assert book_collection.count_documents({}) == 2
+
+    missing_id = str(ObjectId())
+    response = client.patch('/api/books/bulk/', [
+        {"_id": ids[0], "price": 30.0},
+        {"_id": missing_id, "price": 30.0},
+    ], format='json')
+    assert [result["status"] for result in response.data["results"]] == ["updated", "not_found"]
+    assert client.get('/api/books/average-price/2008/').data["max_price"] == 30.0
+
+    response = client.delete('/api/books/bulk/', {"ids": ids + [missing_id]}, format='json')
+    assert response.data["summary"] == {"deleted": 2, "not_found": 1}
+    assert book_collection.count_documents({}) == 0
+    assert client.get('/api/books/average-price/2008/').status_code == 404
+
+def test_bulk_book_create_rejects_invalid_items(setup_auth_token):
+    """
+    Prueba que un lote con elementos no válidos devuelva los errores por elemento sin escribir nada.
+    """
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {setup_auth_token}')
+    response = client.post('/api/books/bulk/', [
+        {"title": "A", "author": "Author Name", "published_date": "2008-08-01", "genre": "Fiction", "price": 10.0},
+        {"title": "B"},
+    ], format='json')
+
+    assert response.status_code == 400
+    assert response.data[0] == {}
+    assert "price" in response.data[1]
+    assert book_collection.count_documents({}) == 0
+
+def test_export_books_ndjson(setup_auth_token):
+    """
+    Prueba que la exportación devuelva todos los libros filtrados en NDJSON.
+    """
+    _insert_books(3)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {setup_auth_token}')
+    response = client.get('/api/books/export/', {"output": "ndjson", "year": 2020})
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/x-ndjson"
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    assert len(lines) == 3
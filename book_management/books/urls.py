@@ -1,11 +1,38 @@
+from django.conf import settings
 from django.urls import path
-from .views import BookList, BookDetail, UserLoginView, TokenRefreshView, AveragePriceByYearView, UserCreateView
-
-urlpatterns = [
-    path('books/', BookList.as_view(), name='book-list'),
-    path('books/<str:pk>/', BookDetail.as_view(), name='book-detail'),
-    path('login/', UserLoginView.as_view(), name='user-login'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
-    path('books/average-price/<int:year>/', AveragePriceByYearView.as_view(), name='average-price-by-year'),
-    path('users/', UserCreateView.as_view(), name='create-user'),
-]
\ No newline at end of file
+from .views import BookList, BookDetail, BookBulkView, BookExportView, BookSearchView, BookStatsView, UserLoginView, UserLogoutView, TokenRefreshView, AveragePriceByYearView, UserCreateView, UserBulkCreateView, ResponseCacheStatsView, HealthView
+from .async_views import AsyncBookDetail, AsyncBookExport, AsyncBookList, AsyncTokenRefreshView, AsyncUserLoginView
+
+# Vistas asíncronas que reemplazan a las síncronas con `ASYNC_API` (bajo ASGI)
+ASYNC_VIEWS = {
+    BookList: AsyncBookList,
+    BookDetail: AsyncBookDetail,
+    BookExportView: AsyncBookExport,
+    UserLoginView: AsyncUserLoginView,
+    TokenRefreshView: AsyncTokenRefreshView,
+}
+
+def get_urlpatterns(use_async=False):
+    def view(view_class):
+        if use_async:
+            view_class = ASYNC_VIEWS.get(view_class, view_class)
+        return view_class.as_view()
+
+    return [
+        path('books/', view(BookList), name='book-list'),
+        path('books/bulk/', view(BookBulkView), name='book-bulk'),
+        path('books/export/', view(BookExportView), name='book-export'),
+        path('books/search/', view(BookSearchView), name='book-search'),
+        path('books/stats/', view(BookStatsView), name='book-stats'),
+        path('books/<str:pk>/', view(BookDetail), name='book-detail'),
+        path('login/', view(UserLoginView), name='user-login'),
+        path('logout/', view(UserLogoutView), name='user-logout'),
+        path('token/refresh/', view(TokenRefreshView), name='token-refresh'),
+        path('books/average-price/<int:year>/', view(AveragePriceByYearView), name='average-price-by-year'),
+        path('users/', view(UserCreateView), name='create-user'),
+        path('users/bulk/', view(UserBulkCreateView), name='create-users-bulk'),
+        path('cache/stats/', view(ResponseCacheStatsView), name='response-cache-stats'),
+        path('health/', view(HealthView), name='health'),
+    ]
+
+urlpatterns = get_urlpatterns(use_async=settings.ASYNC_API)
@@ -1,11 +1,20 @@
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.conf import settings
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from .passwords import hash_passwords
+from .serializers import UserSerializer, DUPLICATE_EMAIL_ERRORS
+
+# Claims adicionales que se incluyen en los tokens JWT
+USER_EMAIL_CLAIM = 'email'
+USER_VERSION_CLAIM = 'user_version'
 
 # Clase para representar un usuario de MongoDB
 class MongoDBUser:
-    def __init__(self, email, user_id):
+    def __init__(self, email, user_id, version=0):
         self.email = email
         self.id = str(user_id)  # El atributo `id` es necesario para JWT
+        self.version = version  # Se incrementa al cambiar el usuario para invalidar sus tokens
 
     @property
     def is_authenticated(self):
@@ -17,13 +26,61 @@ def create_tokens_for_mongo_user(email):
     user_collection = settings.MONGO_DB['User']
 
     # Buscar al usuario en MongoDB
-    user = user_collection.find_one({"email": email})
+    user = user_collection.find_one({"email": email}, {"email": 1, "version": 1})
     if not user:
         raise ValueError("El usuario no existe en la base de datos.")
 
+    return create_tokens_for_user(user)
+
+# Genera los tokens a partir de un documento de usuario ya leído (evita una segunda consulta)
+def create_tokens_for_user(user):
     # Crear la instancia de MongoDBUser
-    mongo_user = MongoDBUser(email=email, user_id=user["_id"])
+    mongo_user = MongoDBUser(email=user["email"], user_id=user["_id"], version=user.get("version", 0))
 
     # Generar los tokens JWT
     refresh = RefreshToken.for_user(mongo_user)
-    return refresh, refresh.access_token
\ No newline at end of file
+    # Claims para la autenticación sin estado; se copian al access token
+    refresh[USER_EMAIL_CLAIM] = mongo_user.email
+    refresh[USER_VERSION_CLAIM] = mongo_user.version
+    return refresh, refresh.access_token
+
+
+# Alta masiva de usuarios: una sola inserción no ordenada con errores por fila
+def provision_users(rows):
+    """
+    Valida e inserta `rows` (dicts con `email` y `password`) con `insert_many(ordered=False)`.
+
+    Devuelve `{"inserted": n, "failed": [{"row", "email", "errors"}]}`, donde `row` es
+    el índice de la fila en `rows`.
+    """
+    failed = []
+    valid = []
+    for index, row in enumerate(rows):
+        serializer = UserSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            email = row.get("email") if isinstance(row, dict) else None
+            failed.append({"row": index, "email": email, "errors": serializer.errors})
+
+    if not valid:
+        return {"inserted": 0, "failed": failed}
+
+    hashes = hash_passwords([data["password"] for _, data in valid])
+    documents = [
+        {"_id": ObjectId(), "email": data["email"], "password": password_hash}
+        for (_, data), password_hash in zip(valid, hashes)
+    ]
+
+    user_collection = settings.MONGO_DB['User']
+    try:
+        inserted = len(user_collection.insert_many(documents, ordered=False).inserted_ids)
+    except BulkWriteError as exc:
+        inserted = exc.details["nInserted"]
+        for error in exc.details["writeErrors"]:
+            index, data = valid[error["index"]]
+            errors = DUPLICATE_EMAIL_ERRORS if error["code"] == 11000 else {"error": [error["errmsg"]]}
+            failed.append({"row": index, "email": data["email"], "errors": errors})
+
+    failed.sort(key=lambda failure: failure["row"])
+    return {"inserted": inserted, "failed": failed}
@@ -3,24 +3,62 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.conf import settings
-from .serializers import BookSerializer, UserLoginSerializer, UserSerializer
+from .serializers import BookSerializer, UserLoginSerializer, UserSerializer, DUPLICATE_EMAIL_ERRORS
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.generics import ListAPIView
 from rest_framework_simplejwt.tokens import RefreshToken, TokenError
-from werkzeug.security import check_password_hash
-from .utils import create_tokens_for_mongo_user
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
-from rest_framework.pagination import PageNumberPagination
+from .passwords import PasswordHasherBusy, needs_rehash, rehash_in_background, verify_password
+from .utils import create_tokens_for_user, provision_users
+from .schema import openapi, swagger_auto_schema
+from .signals import books_changed
+from .stats import get_year_stats
+from .storage import apply_update, book_update, new_book, to_representation
+from .conditional import book_validators, is_conditional, list_validators, not_modified, set_validators
+from .revisions import get_revision
+from .response_cache import cache_response, get_response_cache
+from .export import EXPORT_FIELDS, export_query, iter_csv, iter_ndjson
+from django.http import StreamingHttpResponse
+import time
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from .pagination import BookPagination, BookCursorPagination
+from .projections import VALIDATOR_FIELDS, get_field_selection
+from .filters import get_book_query, set_query_warning
+from .search import get_search_backend, get_search_query
+from .analytics import FACETS, BookStatsSerializer, get_catalog_stats
+from .mongo import check_health, get_pool_stats
+from .metrics import HasMetricsToken, registry
+from .renderers import PrometheusRenderer
+from .revocation import is_token_revoked, revoke_token
 
 # Acceso a la colección
 book_collection = settings.MONGO_DB['Book']
 user_collection = settings.MONGO_DB['User']
 
-class BookPagination(PageNumberPagination):
-    page_size = 10  # Tamaño de la página
-    page_size_query_param = 'page_size'  # Permite que el usuario pase el tamaño de la página
-    max_page_size = 100  # Máximo tamaño de página permitido
+# Parámetros de selección de campos de las lecturas de libros
+FIELDS_PARAMETER = openapi.Parameter(
+    'fields', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+    description="Campos a devolver separados por comas (p. ej. `title,price`). `_id` se devuelve siempre.",
+)
+EXCLUDE_PARAMETER = openapi.Parameter(
+    'exclude', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+    description="Campos a omitir separados por comas. No se puede combinar con `fields`.",
+)
+
+# Filtros del listado de libros (ver `books.filters`)
+FILTER_PARAMETERS = [
+    openapi.Parameter('author', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Autor exacto."),
+    openapi.Parameter('genre', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Género exacto."),
+    openapi.Parameter('title', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Título exacto."),
+    openapi.Parameter('price_min', openapi.IN_QUERY, type=openapi.TYPE_NUMBER),
+    openapi.Parameter('price_max', openapi.IN_QUERY, type=openapi.TYPE_NUMBER),
+    openapi.Parameter(
+        'published_after', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Fecha mínima (YYYY-MM-DD), inclusive."
+    ),
+    openapi.Parameter(
+        'published_before', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Fecha máxima (YYYY-MM-DD), inclusive."
+    ),
+]
 
 class UserLoginView(APIView):
     permission_classes = [AllowAny]
@@ -40,6 +78,7 @@ class UserLoginView(APIView):
             ),
             400: "Errores de validación",
             401: "Credenciales inválidas",
+            503: "Demasiados inicios de sesión simultáneos",
         },
     )
     def post(self, request):
@@ -48,13 +87,25 @@ class UserLoginView(APIView):
             email = serializer.validated_data['email']
             password = serializer.validated_data['password']
 
-            # Buscar usuario en MongoDB
-            user_collection = settings.MONGO_DB['User']
-            user = user_collection.find_one({"email": email})
+            # Buscar usuario en MongoDB (una sola consulta, solo los campos necesarios)
+            user = user_collection.find_one({"email": email}, {"email": 1, "password": 1, "version": 1})
+
+            try:
+                valid = bool(user) and verify_password(user["password"], password)
+            except PasswordHasherBusy:
+                return Response(
+                    {"error": "Demasiados inicios de sesión simultáneos. Inténtalo nuevamente."},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={"Retry-After": "1"},
+                )
+
+            if valid:
+                # Actualizar hashes con un método o costo anterior
+                if needs_rehash(user["password"]):
+                    rehash_in_background(user_collection, user["_id"], user["password"], password)
 
-            if user and check_password_hash(user["password"], password):
                 # Generar tokens JWT
-                refresh, access_token = create_tokens_for_mongo_user(email)
+                refresh, access_token = create_tokens_for_user(user)
 
                 return Response({
                     "refresh": str(refresh),
@@ -70,7 +121,26 @@ class BookList(ListAPIView):
     """Listar y crear libros"""
     @swagger_auto_schema(
         operation_summary="Listar libros",
-        operation_description="Devuelve una lista de todos los libros disponibles.",
+        operation_description=(
+            "Devuelve una página de libros. Por defecto pagina por número de página "
+            "(`page`, `page_size`). Si se envía `cursor` (vacío para la primera página) "
+            "pagina por clave y devuelve enlaces `next`/`previous` con tokens opacos. "
+            "Los filtros y el orden deben poder resolverse con un índice: si no, la petición "
+            "se rechaza con 400 indicando los órdenes disponibles (o, según `BOOK_QUERY_POLICY`, "
+            "se responde con la cabecera `X-Query-Warning`)."
+        ),
+        manual_parameters=[
+            openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter(
+                'ordering', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                description="Campo de orden, con `-` para orden descendente (p. ej. `-price`).",
+            ),
+            *FILTER_PARAMETERS,
+            FIELDS_PARAMETER,
+            EXCLUDE_PARAMETER,
+        ],
         responses={
             200: openapi.Response(
                 description="Lista de libros",
@@ -87,16 +157,40 @@ class BookList(ListAPIView):
                     ]
                 }
             ),
+            304: "Sin cambios desde la revisión indicada en If-None-Match",
+            400: "Filtros u orden no válidos, o sin un índice que los resuelva",
             403: "No autorizado",
         },
     )
+    @cache_response('book-list')
     def get(self, request):
-        paginator = BookPagination()
-        books = list(book_collection.find())
-        for book in books:
-            book['_id'] = str(book['_id'])  # Convertir ObjectId a string
-        result_page = paginator.paginate_queryset(books, request)
-        return Response(result_page)
+        selection = get_field_selection(request)
+        book_query = get_book_query(request)
+        # La revisión se lee antes que la página: si una escritura ocurre en medio, la respuesta
+        # queda asociada a la revisión anterior y el cliente la recibirá completa en la próxima consulta
+        validators = list_validators(request, get_revision())
+        response = not_modified(request, *validators)
+        if response is not None:
+            return response
+
+        if 'cursor' in request.query_params:
+            paginator = BookCursorPagination()
+            books = paginator.paginate_collection(
+                book_collection, request, query=book_query.query,
+                projection=selection.projection(), ordering=book_query.ordering,
+            )
+            for book in books:
+                selection.trim(to_representation(book))
+            response = paginator.get_paginated_response(books)
+        else:
+            paginator = BookPagination()
+            books = paginator.paginate_collection(
+                book_collection, request, query=book_query.query, sort=book_query.sort, projection=selection.projection()
+            )
+            for book in books:
+                selection.trim(to_representation(book))
+            response = Response(books, headers=paginator.get_headers())
+        return set_query_warning(set_validators(response, *validators), book_query)
     
     @swagger_auto_schema(
         operation_summary="Crear un libro",
@@ -110,7 +204,9 @@ class BookList(ListAPIView):
     def post(self, request):
         serializer = BookSerializer(data=request.data)
         if serializer.is_valid():
-            book_collection.insert_one(serializer.data)
+            book = new_book(serializer.data)
+            book_collection.insert_one(book)
+            books_changed.send(sender=self.__class__, removed=[], added=[book])
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -129,7 +225,7 @@ class TokenRefreshView(APIView):
                 examples={"application/json": {"access": "string"}}
             ),
             400: "Refresh token requerido",
-            401: "Token inválido o expirado",
+            401: "Token inválido, expirado o revocado",
         },
     )
     def post(self, request):
@@ -139,17 +235,55 @@ class TokenRefreshView(APIView):
 
         try:
             refresh = RefreshToken(refresh_token)
-            access_token = refresh.access_token
-            return Response({"access": str(access_token)}, status=status.HTTP_200_OK)
         except TokenError:
             return Response({"error": "Token inválido o expirado"}, status=status.HTTP_401_UNAUTHORIZED)
 
+        # Lista de revocación en memoria del proceso (`books.revocation`), sin consultar MongoDB
+        if is_token_revoked(refresh):
+            return Response({"error": "Token revocado"}, status=status.HTTP_401_UNAUTHORIZED)
+        return Response({"access": str(refresh.access_token)}, status=status.HTTP_200_OK)
+
+class UserLogoutView(APIView):
+    permission_classes = [IsAuthenticated]
+    @swagger_auto_schema(
+        operation_summary="Cerrar sesión",
+        operation_description=(
+            "Revoca el access token usado en la petición y, si se envía, el refresh token de la sesión. "
+            "Los demás workers dejan de aceptarlos tras su siguiente refresco de la lista de revocación."
+        ),
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={"refresh": openapi.Schema(type=openapi.TYPE_STRING)},
+        ),
+        responses={
+            204: "Sesión cerrada",
+            400: "Refresh token inválido o de otro usuario",
+            401: "No autenticado",
+        },
+    )
+    def post(self, request):
+        refresh = None
+        refresh_token = request.data.get("refresh")
+        if refresh_token:
+            try:
+                refresh = RefreshToken(refresh_token)
+            except TokenError:
+                return Response({"error": "Token inválido o expirado"}, status=status.HTTP_400_BAD_REQUEST)
+            if str(refresh.get("user_id")) != request.user.id:
+                return Response({"error": "El refresh token no pertenece al usuario"}, status=status.HTTP_400_BAD_REQUEST)
+
+        revoke_token(request.auth)
+        if refresh is not None:
+            revoke_token(refresh)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 class BookDetail(APIView):
     permission_classes = [IsAuthenticated]
     """Leer, actualizar y eliminar un libro"""
     @swagger_auto_schema(
         operation_summary="Obtener detalles de un libro",
         operation_description="Devuelve los detalles de un libro específico usando su ID.",
+        manual_parameters=[FIELDS_PARAMETER, EXCLUDE_PARAMETER],
         responses={
             200: openapi.Response(
                 description="Detalles del libro",
@@ -164,20 +298,30 @@ class BookDetail(APIView):
                     }
                 }
             ),
+            304: "Sin cambios (ETag o Last-Modified vigentes)",
             400: "Formato de ID no válido",
             404: "Libro no encontrado",
         },
     )
+    @cache_response('book-detail')
     def get(self, request, pk):
+        selection = get_field_selection(request)
         try:
             if not ObjectId.is_valid(pk):
                 return Response({"error": "Invalid ID format"}, status=status.HTTP_400_BAD_REQUEST)
+            if is_conditional(request):
+                # Leer solo los validadores: si el cliente ya tiene la versión actual no se transfiere el libro
+                current = book_collection.find_one({"_id": ObjectId(pk)}, {field: 1 for field in VALIDATOR_FIELDS})
+                response = not_modified(request, *book_validators(request, current)) if current else None
+                if response is not None:
+                    return response
             # Convertir el ID de string a ObjectId
-            book = book_collection.find_one({"_id": ObjectId(pk)})
+            book = book_collection.find_one({"_id": ObjectId(pk)}, selection.projection(extra=VALIDATOR_FIELDS))
             if not book:
                 return Response({"error": "Book not found"}, status=status.HTTP_404_NOT_FOUND)
-            book['_id'] = str(book['_id'])  # Convertir ObjectId a string para la respuesta
-            return Response(book)
+            validators = book_validators(request, book)
+            selection.trim(to_representation(book))
+            return set_validators(Response(book), *validators)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -197,7 +341,13 @@ class BookDetail(APIView):
                 return Response({"error": "Invalid ID format"}, status=status.HTTP_400_BAD_REQUEST)
             serializer = BookSerializer(data=request.data)
             if serializer.is_valid():
-                book_collection.update_one({"_id": ObjectId(pk)}, {"$set": serializer.data})
+                update = book_update(serializer.data)
+                previous = book_collection.find_one_and_update(
+                    {"_id": ObjectId(pk)}, update, return_document=ReturnDocument.BEFORE
+                )
+                if not previous:
+                    return Response({"error": "Book not found"}, status=status.HTTP_404_NOT_FOUND)
+                books_changed.send(sender=self.__class__, removed=[previous], added=[apply_update(previous, update)])
                 return Response(serializer.data)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
@@ -216,13 +366,286 @@ class BookDetail(APIView):
         try:
             if not ObjectId.is_valid(pk):
                 return Response({"error": "Invalid ID format"}, status=status.HTTP_400_BAD_REQUEST)
-            result = book_collection.delete_one({"_id": ObjectId(pk)})
-            if result.deleted_count == 0:
+            book = book_collection.find_one_and_delete({"_id": ObjectId(pk)})
+            if not book:
                 return Response({"error": "Book not found"}, status=status.HTTP_404_NOT_FOUND)
+            books_changed.send(sender=self.__class__, removed=[book], added=[])
             return Response({"message": "Book deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
+class BookBulkView(APIView):
+    permission_classes = [IsAuthenticated]
+    """
+    Crear, actualizar y eliminar libros en lote con un solo `bulk_write` no ordenado.
+    """
+    max_items = 10000
+
+    bulk_response = openapi.Response(
+        description="Resultado por elemento y rendimiento del lote",
+        examples={"application/json": {
+            "results": [{"index": 0, "_id": "string", "status": "created"}],
+            "summary": {"created": 1},
+            "elapsed_ms": 12.5,
+            "items_per_second": 80.0,
+        }},
+    )
+
+    def get_items(self, request):
+        if not isinstance(request.data, list) or not request.data:
+            return None, Response({"error": "Se espera una lista no vacía."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(request.data) > self.max_items:
+            return None, Response(
+                {"error": f"Se permiten como máximo {self.max_items} elementos por solicitud."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return request.data, None
+
+    def execute(self, operations, results, started, removed=(), added=()):
+        """
+        Ejecuta las operaciones en un solo `bulk_write` y marca como error las que fallaron.
+
+        `operations` es una lista de `(índice en results, operación)`. `removed` y `added`
+        son listas paralelas a `operations` con los documentos para `books_changed`.
+        """
+        failed = set()
+        if operations:
+            try:
+                book_collection.bulk_write([operation for _, operation in operations], ordered=False)
+            except BulkWriteError as exc:
+                for error in exc.details["writeErrors"]:
+                    failed.add(error["index"])
+                    result = results[operations[error["index"]][0]]
+                    result["status"] = "error"
+                    result["error"] = error["errmsg"]
+
+        succeeded = [position for position in range(len(operations)) if position not in failed]
+        books_changed.send(
+            sender=self.__class__,
+            removed=[removed[position] for position in succeeded if removed and removed[position]],
+            added=[added[position] for position in succeeded if added and added[position]],
+        )
+
+        summary = {}
+        for result in results:
+            summary[result["status"]] = summary.get(result["status"], 0) + 1
+        elapsed = time.perf_counter() - started
+        return Response({
+            "results": results,
+            "summary": summary,
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "items_per_second": round(len(results) / elapsed, 1) if elapsed else None,
+        })
+
+    def find_existing(self, ids):
+        """Lee en una sola consulta los documentos actuales de los ids válidos."""
+        object_ids = [ObjectId(pk) for pk in ids if isinstance(pk, str) and ObjectId.is_valid(pk)]
+        return {str(book["_id"]): book for book in book_collection.find({"_id": {"$in": object_ids}})}
+
+    @swagger_auto_schema(
+        operation_summary="Crear libros en lote",
+        operation_description="Valida la lista con `BookSerializer(many=True)` y la inserta con un solo `bulk_write`.",
+        request_body=BookSerializer(many=True),
+        responses={200: bulk_response, 400: "Errores de validación por elemento"},
+    )
+    def post(self, request):
+        started = time.perf_counter()
+        items, error = self.get_items(request)
+        if error:
+            return error
+        serializer = BookSerializer(data=items, many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        results, operations, added = [], [], []
+        for index, data in enumerate(serializer.validated_data):
+            book = new_book(data)
+            book["_id"] = ObjectId()
+            results.append({"index": index, "_id": str(book["_id"]), "status": "created"})
+            operations.append((index, InsertOne(book)))
+            added.append(book)
+        return self.execute(operations, results, started, added=added)
+
+    @swagger_auto_schema(
+        operation_summary="Actualizar libros en lote",
+        operation_description=(
+            "Recibe una lista de objetos con `_id` y los campos a modificar. "
+            "Los campos se validan con `BookSerializer(many=True, partial=True)`."
+        ),
+        request_body=openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+        responses={200: bulk_response, 400: "Errores de validación por elemento"},
+    )
+    def patch(self, request):
+        started = time.perf_counter()
+        items, error = self.get_items(request)
+        if error:
+            return error
+        if not all(isinstance(item, dict) for item in items):
+            return Response({"error": "Cada elemento debe ser un objeto."}, status=status.HTTP_400_BAD_REQUEST)
+        fields = [{key: value for key, value in item.items() if key != "_id"} for item in items]
+        serializer = BookSerializer(data=fields, many=True, partial=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        existing = self.find_existing([item.get("_id") for item in items])
+        results, operations, removed, added = [], [], [], []
+        seen = set()
+        for index, (item, data) in enumerate(zip(items, serializer.validated_data)):
+            pk = item.get("_id")
+            result = {"index": index, "_id": pk, "status": "updated"}
+            results.append(result)
+            if pk not in existing:
+                result["status"] = "not_found"
+                continue
+            if pk in seen:
+                result["status"] = "error"
+                result["error"] = "Id repetido en el lote."
+                continue
+            seen.add(pk)
+            if not data:
+                result["status"] = "unchanged"
+                continue
+            update = book_update(data)
+            previous = existing[pk]
+            operations.append((index, UpdateOne({"_id": previous["_id"]}, update)))
+            removed.append(previous)
+            added.append(apply_update(previous, update))
+        return self.execute(operations, results, started, removed=removed, added=added)
+
+    @swagger_auto_schema(
+        operation_summary="Eliminar libros en lote",
+        operation_description="Elimina los libros cuyos ids se envían en `ids`.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={"ids": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING))},
+        ),
+        responses={200: bulk_response, 400: "Lista de ids no válida"},
+    )
+    def delete(self, request):
+        started = time.perf_counter()
+        ids = request.data.get("ids") if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not ids:
+            return Response({"error": "Se espera una lista no vacía en 'ids'."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > self.max_items:
+            return Response(
+                {"error": f"Se permiten como máximo {self.max_items} elementos por solicitud."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        existing = self.find_existing(ids)
+        results, operations, removed = [], [], []
+        for index, pk in enumerate(ids):
+            result = {"index": index, "_id": pk, "status": "deleted"}
+            results.append(result)
+            if pk not in existing:
+                result["status"] = "not_found"
+                continue
+            existing_book = existing.pop(pk)  # Un id repetido se elimina una sola vez
+            operations.append((index, DeleteOne({"_id": existing_book["_id"]})))
+            removed.append(existing_book)
+        return self.execute(operations, results, started, removed=removed)
+
+class BookExportView(APIView):
+    permission_classes = [IsAuthenticated]
+    """
+    Exportar todo el catálogo (opcionalmente filtrado) en streaming.
+    """
+    formats = {
+        'ndjson': ('application/x-ndjson', iter_ndjson),
+        'csv': ('text/csv', iter_csv),
+    }
+
+    @swagger_auto_schema(
+        operation_summary="Exportar libros",
+        operation_description=(
+            "Devuelve todos los libros que cumplen los filtros como NDJSON (una línea JSON por libro) "
+            "o CSV, en streaming sobre un cursor por lotes."
+        ),
+        manual_parameters=[
+            openapi.Parameter('output', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['ndjson', 'csv']),
+            openapi.Parameter('author', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter('genre', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter('year', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: "Archivo NDJSON o CSV", 400: "Parámetros no válidos"},
+    )
+    def get(self, request):
+        # `format` lo reserva DRF para la negociación de contenido
+        output = request.query_params.get('output', 'ndjson')
+        if output not in self.formats:
+            return Response({"error": "Formato no válido. Use 'ndjson' o 'csv'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            query = export_query(request.query_params)
+        except ValueError:
+            return Response({"error": "El año debe ser un número."}, status=status.HTTP_400_BAD_REQUEST)
+
+        batch_size = getattr(settings, 'BOOK_EXPORT_BATCH_SIZE', 1000)
+        projection = {field: 1 for field in EXPORT_FIELDS}
+        cursor = book_collection.find(query, projection, batch_size=batch_size)
+
+        content_type, generator = self.formats[output]
+        response = StreamingHttpResponse(generator(cursor, chunk_size=batch_size), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="books.{output}"'
+        return response
+
+class BookSearchView(APIView):
+    permission_classes = [IsAuthenticated]
+    """
+    Búsqueda de texto completo por título, autor y género.
+    """
+    @swagger_auto_schema(
+        operation_summary="Buscar libros",
+        operation_description=(
+            "Devuelve los libros que contienen alguno de los términos de `q` en el título, el autor "
+            "o el género, de mayor a menor relevancia (`score`; el título pesa más que el autor y "
+            "este más que el género). Pagina por número de página, con el total en `X-Total-Count`."
+        ),
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            FIELDS_PARAMETER,
+            EXCLUDE_PARAMETER,
+        ],
+        responses={
+            200: openapi.Response(
+                description="Libros encontrados",
+                examples={
+                    "application/json": [
+                        {
+                            "_id": "string",
+                            "title": "string",
+                            "author": "string",
+                            "published_date": "YYYY-MM-DD",
+                            "genre": "string",
+                            "price": 0.0,
+                            "score": 0.0
+                        }
+                    ]
+                }
+            ),
+            304: "Sin cambios desde la revisión indicada en If-None-Match",
+            400: "Falta `q` o los campos no son válidos",
+            403: "No autorizado",
+        },
+    )
+    @cache_response('book-search')
+    def get(self, request):
+        q = get_search_query(request)
+        selection = get_field_selection(request)
+        validators = list_validators(request, get_revision())
+        response = not_modified(request, *validators)
+        if response is not None:
+            return response
+
+        paginator = BookPagination()
+        books = get_search_backend().search(book_collection, request, q, paginator, projection=selection.projection())
+        for book in books:
+            score = book.pop("score")
+            selection.trim(to_representation(book))["score"] = score
+        return set_validators(Response(books, headers=paginator.get_headers()), *validators)
+
 class AveragePriceByYearView(APIView):
     permission_classes = [IsAuthenticated]
     """
@@ -230,36 +653,87 @@ class AveragePriceByYearView(APIView):
     """
     @swagger_auto_schema(
         operation_summary="Obtener precio promedio por año",
-        operation_description="Calcula el precio promedio de los libros publicados en un año específico.",
+        operation_description=(
+            "Devuelve el precio promedio, la cantidad y los precios mínimo y máximo de los libros "
+            "publicados en un año específico, leídos de las estadísticas materializadas por año."
+        ),
         responses={
             200: openapi.Response(
                 description="Precio promedio calculado",
-                examples={"application/json": {"average_price": 25.0}},
+                examples={"application/json": {
+                    "average_price": 25.0, "count": 4, "min_price": 10.0, "max_price": 40.0
+                }},
             ),
             404: "No se encontraron libros para el año dado",
             400: "Errores en el formato de la solicitud",
         },
     )
+    @cache_response('average-price-by-year')
     def get(self, request, year):
         try:
-            # Usar el aggregation pipeline de MongoDB
-            pipeline = [
-                {"$match": {"published_date": {"$regex": f"^{year}"}}},  # Filtrar por año
-                {"$group": {"_id": None, "average_price": {"$avg": "$price"}}}  # Calcular promedio
-            ]
-
-            result = list(book_collection.aggregate(pipeline))
+            # Lectura puntual de las estadísticas materializadas del año
+            result = get_year_stats(year)
 
             # Verificar si hay resultados
             if not result:
                 return Response({"error": "No books found for the given year."}, status=status.HTTP_404_NOT_FOUND)
 
-            # Devolver el precio promedio
-            return Response({"average_price": result[0]["average_price"]}, status=status.HTTP_200_OK)
+            return Response(result, status=status.HTTP_200_OK)
 
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
+class BookStatsView(APIView):
+    permission_classes = [IsAuthenticated]
+    """
+    Estadísticas del catálogo para tableros, en una sola agregación.
+    """
+    @swagger_auto_schema(
+        operation_summary="Estadísticas del catálogo",
+        operation_description=(
+            "Calcula en una sola agregación `$facet` las facetas pedidas sobre los libros que cumplen "
+            "los filtros (los mismos que el listado): resumen de precios, precios por género, por año y "
+            "por autor (los `top` autores con más libros), los `top` autores por cantidad de libros y un "
+            "histograma de precios con intervalos de `bucket_size`. Los resultados se guardan en una "
+            "caché de corta duración (`BOOK_STATS_CACHE_TTL`)."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                'facets', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                description=f"Facetas separadas por comas (por defecto todas): {', '.join(FACETS)}.",
+            ),
+            openapi.Parameter('top', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Autores a devolver (1-100)."),
+            openapi.Parameter('bucket_size', openapi.IN_QUERY, type=openapi.TYPE_NUMBER, description="Ancho de los intervalos del histograma (como máximo `BOOK_STATS_MAX_BUCKETS` intervalos)."),
+            *FILTER_PARAMETERS,
+        ],
+        responses={
+            200: openapi.Response(
+                description="Estadísticas por faceta",
+                examples={"application/json": {
+                    "summary": {"count": 4, "average_price": 25.0, "min_price": 10.0, "max_price": 40.0},
+                    "by_genre": [{"genre": "Fiction", "count": 4, "average_price": 25.0, "min_price": 10.0, "max_price": 40.0}],
+                    "top_authors": [{"author": "Author Name", "count": 4}],
+                    "price_histogram": [{"price_from": 10.0, "price_to": 20.0, "count": 1}],
+                }},
+            ),
+            400: "Facetas, opciones o filtros no válidos, o `bucket_size` demasiado pequeño para el rango de precios",
+            403: "No autorizado",
+        },
+    )
+    def get(self, request):
+        book_query = get_book_query(request, ordered=False)
+        serializer = BookStatsSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        options = serializer.validated_data
+
+        result, hit = get_catalog_stats(
+            book_collection, book_query.query, facets=options.get('facets') or FACETS,
+            top=options['top'], bucket_size=options['bucket_size'],
+        )
+        response = Response(result)
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return set_query_warning(response, book_query)
+
 class UserCreateView(APIView):
     permission_classes = [AllowAny]
     """
@@ -272,22 +746,143 @@ class UserCreateView(APIView):
         responses={
             201: "Usuario creado exitosamente",
             400: "Errores de validación o correo ya registrado",
+            503: "Demasiadas contraseñas procesándose a la vez",
         },
     )
     def post(self, request):
         serializer = UserSerializer(data=request.data)
         if serializer.is_valid():
-            email = serializer.validated_data['email']
-
-            # Verificar si el correo ya existe
-            if user_collection.find_one({"email": email}):
-                return Response({"error": "El correo ya está registrado."}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Guardar usuario en MongoDB
-            user_data = serializer.save()
+            try:
+                user_data = serializer.save()
+            except PasswordHasherBusy:
+                return Response(
+                    {"error": "Demasiadas solicitudes simultáneas. Inténtalo nuevamente."},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={"Retry-After": "1"},
+                )
+            # Guardar usuario en MongoDB; el índice único de email rechaza los duplicados
             user_data['_id'] = ObjectId()  # Generar un ObjectId único
-            user_collection.insert_one(user_data)
+            try:
+                user_collection.insert_one(user_data)
+            except DuplicateKeyError:
+                return Response(DUPLICATE_EMAIL_ERRORS, status=status.HTTP_400_BAD_REQUEST)
 
             return Response({"message": "Usuario creado exitosamente."}, status=status.HTTP_201_CREATED)
 
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+class UserBulkCreateView(APIView):
+    permission_classes = [IsAuthenticated]
+    """
+    Endpoint para dar de alta muchos usuarios en una sola inserción.
+    """
+    # Cada hash tarda decenas de milisegundos: los lotes grandes van por `manage.py provision_users`
+    max_rows = 100
+
+    @swagger_auto_schema(
+        operation_summary="Crear usuarios en lote",
+        operation_description=(
+            "Crea hasta 100 usuarios con una sola inserción no ordenada. Devuelve la cantidad "
+            "insertada y los errores por fila (índice en la lista enviada). Para lotes más grandes "
+            "use `manage.py provision_users`."
+        ),
+        request_body=UserSerializer(many=True),
+        responses={
+            201: openapi.Response(
+                description="Todos los usuarios fueron creados",
+                examples={"application/json": {"inserted": 2, "failed": []}},
+            ),
+            207: openapi.Response(
+                description="Algunas filas fallaron",
+                examples={"application/json": {
+                    "inserted": 1,
+                    "failed": [{"row": 1, "email": "user@example.com", "errors": DUPLICATE_EMAIL_ERRORS}],
+                }},
+            ),
+            400: "El cuerpo debe ser una lista de usuarios",
+        },
+    )
+    def post(self, request):
+        rows = request.data
+        if not isinstance(rows, list) or not rows:
+            return Response({"error": "Se espera una lista de usuarios."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > self.max_rows:
+            return Response(
+                {"error": f"Se permiten como máximo {self.max_rows} usuarios por solicitud."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        report = provision_users(rows)
+        response_status = status.HTTP_201_CREATED if not report["failed"] else status.HTTP_207_MULTI_STATUS
+        return Response(report, status=response_status)
+
+class ResponseCacheStatsView(APIView):
+    permission_classes = [IsAuthenticated]
+    """
+    Estadísticas de la caché de respuestas de este proceso.
+    """
+    @swagger_auto_schema(
+        operation_summary="Estadísticas de la caché de respuestas",
+        operation_description=(
+            "Aciertos, fallos y tasa de aciertos por endpoint de la caché de respuestas de este "
+            "proceso (`RESPONSE_CACHE`), más las estadísticas del backend en memoria."
+        ),
+        responses={
+            200: openapi.Response(
+                description="Estadísticas de la caché",
+                examples={"application/json": {
+                    "enabled": True,
+                    "endpoints": {"book-list": {"hits": 90, "misses": 10, "hit_ratio": 0.9}},
+                    "backend": {"size": 10, "max_size": 2048, "hits": 90, "misses": 10},
+                }},
+            ),
+        },
+    )
+    def get(self, request):
+        cache = get_response_cache()
+        if cache is None:
+            return Response({"enabled": False})
+        return Response(dict(cache.stats(), enabled=True))
+
+class HealthView(APIView):
+    # Sin autenticación: lo consultan el balanceador y el orquestador
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    """
+    Estado de la conexión a MongoDB y uso del pool de este proceso.
+    """
+    @swagger_auto_schema(
+        operation_summary="Estado del servicio",
+        operation_description=(
+            "Hace `ping` a MongoDB con el cliente de este proceso y devuelve la latencia junto con el "
+            "uso del pool de conexiones (conexiones abiertas y en uso, esperas y fallos al obtener una)."
+        ),
+        responses={
+            200: openapi.Response(
+                description="MongoDB disponible",
+                examples={"application/json": {
+                    "status": "ok",
+                    "mongo": {"ping_ms": 0.8},
+                    "pool": {"pid": 12, "sync": {"open": 4, "in_use": 1, "max_pool_size": 100, "utilization": 0.01}},
+                }},
+            ),
+            503: "MongoDB no disponible",
+        },
+    )
+    def get(self, request):
+        ok, detail = check_health()
+        return Response(
+            {"status": "ok" if ok else "unavailable", "mongo": detail, "pool": get_pool_stats()},
+            status=status.HTTP_200_OK if ok else status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+
+class MetricsView(APIView):
+    authentication_classes = []
+    permission_classes = [HasMetricsToken]
+    renderer_classes = [PrometheusRenderer]
+    swagger_schema = None
+    """
+    Métricas de este proceso en formato de texto de Prometheus.
+    """
+    def get(self, request):
+        return Response(registry.expose())